@@ -0,0 +1,76 @@
+"""
+Benchmark the post-processing of the print page.
+
+Compares the previous approach, where the lazy loading and `//` link fixes were
+whole-document passes over the rendered print page, with the current approach,
+where images are fixed per page during the rewrite and links only in the theme <head>.
+
+Run with:
+
+```bash
+uv run python benchmarks/bench_postprocessing.py
+```
+"""
+
+import re
+import time
+
+from mkdocs_print_site_plugin.urls import fix_protocol_relative_urls, remove_lazy_loading
+
+N_PAGES = 2000
+
+
+def make_page(i):
+    """
+    A page with a long (minified) line containing several images, as generated by f.e. tables or galleries.
+
+    Every tenth page also has a lazy loaded image.
+    """
+    images = "".join(f'<td><img alt="img {j}" src="img/{i}-{j}.png"> cell {j}</td>' for j in range(50))
+    lazy_image = f'\n<p><img alt="lazy" loading="lazy" src="img/{i}.png"></p>' if i % 10 == 0 else ""
+    return f'<h1 id="page-{i}">Page {i}</h1><table><tr>{images}</tr></table>{lazy_image}\n'
+
+
+def old_postprocessing(html):
+    """
+    Whole document passes, as done previously in on_post_build.
+    """
+    html = re.sub(r"(\<img.+)(loading=\"lazy\")", r"\1", html)
+    htmls = html.split("</head>")
+    htmls[0] = htmls[0].replace('href="//', 'href="../')
+    htmls[0] = htmls[0].replace('src="//', 'src="../')
+    return "</head>".join(htmls)
+
+
+def new_postprocessing(head, pages):
+    """
+    Images are fixed per page, links only in the theme head.
+    """
+    pages = [remove_lazy_loading(page) for page in pages]
+    head = fix_protocol_relative_urls(remove_lazy_loading(head), "../")
+    return head, pages
+
+
+def timeit(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    head = '<html><head><link href="//assets/a.css"></head><body>'
+    pages = [make_page(i) for i in range(N_PAGES)]
+    html = head + "".join(pages) + "</body></html>"
+
+    # Both approaches give the same result (apart from whitespace left behind by the old regex)
+    new_head, new_pages = new_postprocessing(head, pages)
+    assert 'loading="lazy"' not in "".join(new_pages)
+    assert 'loading="lazy"' not in old_postprocessing(html)
+
+    size = len(html) / 1024 / 1024
+    print(f"Print page of {N_PAGES} pages ({size:.1f} MB)")
+    print(f"Whole-document passes: {timeit(old_postprocessing, html):.3f}s")
+    print(f"Per-page passes:       {timeit(new_postprocessing, head, pages):.3f}s")
@@ -0,0 +1,87 @@
+"""
+Benchmark the startup cost of the plugin.
+
+Measures, in fresh processes:
+
+- the time to import the plugin module (what MkDocs does for every installed plugin in the config)
+- the time of `mkdocs build` on a small site without the plugin, with the plugin disabled,
+  and with the plugin enabled
+
+A disabled plugin should cost (close to) nothing.
+
+Run with:
+
+```bash
+uv run python benchmarks/bench_startup.py
+```
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+N_RUNS = 5
+N_PAGES = 20
+
+CONFIGS = {
+    "no plugin": "plugins: []\n",
+    "disabled": "plugins:\n  - print-site:\n      enabled: false\n",
+    "enabled": "plugins:\n  - print-site\n",
+}
+
+
+def make_site(path, plugins):
+    """
+    A small site with some pages.
+    """
+    docs_dir = os.path.join(path, "docs")
+    os.makedirs(docs_dir, exist_ok=True)
+    for i in range(N_PAGES):
+        with open(os.path.join(docs_dir, f"page-{i}.md"), "w") as f:
+            f.write(f"# Page {i}\n\n## Section\n\nSome text.\n")
+    with open(os.path.join(path, "mkdocs.yml"), "w") as f:
+        f.write("site_name: Startup benchmark\n")
+        f.write(plugins)
+    return os.path.join(path, "mkdocs.yml")
+
+
+def median_runtime(cmd):
+    runtimes = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, capture_output=True)
+        runtimes.append(time.perf_counter() - start)
+    return statistics.median(runtimes)
+
+
+def import_time(module):
+    """
+    Cumulative import time of a module (in seconds), excluding the MkDocs modules every plugin needs.
+    """
+    setup = "import mkdocs.plugins, mkdocs.config.config_options, mkdocs.utils, mkdocs.exceptions"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{setup}; import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise ValueError(f"Module {module} not found in importtime output")
+
+
+if __name__ == "__main__":
+    imports = [import_time("mkdocs_print_site_plugin.plugin") for _ in range(N_RUNS)]
+    print(f"Import of the plugin:   {statistics.median(imports) * 1000:.1f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, plugins in CONFIGS.items():
+            config_file = make_site(os.path.join(tmp, name.replace(" ", "_")), plugins)
+            cmd = [sys.executable, "-m", "mkdocs", "build", "-q", "-f", config_file]
+            print(f"mkdocs build ({name + '):':<11} {median_runtime(cmd):.3f}s")
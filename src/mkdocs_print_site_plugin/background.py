@@ -0,0 +1,313 @@
+"""
+Regenerate the print pages in the background during `mkdocs serve`.
+
+For large sites, assembling and writing the print pages takes a noticeable part of every rebuild,
+and `mkdocs serve` only reloads the browser once the build is done. With 'build_in_background',
+the previous version of every print page is written with a banner that marks it as stale,
+and the print pages are regenerated in a worker thread after the build.
+Rapid saves are debounced, and a regeneration that is superseded by a newer build is cancelled.
+
+MkDocs creates a new plugin instance for every rebuild, so the worker is kept per site directory.
+"""
+
+import atexit
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("mkdocs.plugins")
+
+# Wait this many seconds without new builds, before regenerating the print pages
+DEBOUNCE_DELAY = 0.5
+
+BODY_REGEX = re.compile(rb"<body\b[^>]*>", flags=re.IGNORECASE)
+
+# Shown at the top of a stale print page. Reloads the page once the regenerated version is written,
+# which removes the marker file next to the print page.
+STALE_BANNER = """
+<div class="print-site-stale-banner" style="position: sticky; top: 0; z-index: 1000; padding: 0.5rem 1rem;
+    background: #fff3cd; color: #664d03; border-bottom: 1px solid #ffe69c; font-family: sans-serif;">
+    This print page is being updated with your latest changes. It reloads automatically when it is ready.
+</div>
+<script type="text/javascript">
+(function () {
+    function check() {
+        fetch("%s", {cache: "no-store"}).then(function (response) {
+            if (response.status === 404) {
+                location.reload();
+            } else {
+                setTimeout(check, 1000);
+            }
+        }).catch(function () {
+            setTimeout(check, 1000);
+        });
+    }
+    setTimeout(check, 1000);
+})();
+</script>
+"""
+
+
+class Cancelled(Exception):
+    """
+    Raised in a background job that was superseded by a newer build.
+    """
+
+
+class Job:
+    """
+    A single regeneration of the print pages, that can be cancelled.
+    """
+
+    def __init__(self, builder: "BackgroundBuilder", generation: int):
+        """
+        Inits the class.
+
+        Args:
+            builder (BackgroundBuilder): The builder running the job
+            generation (int): Number of the job, the job is cancelled when a newer job is submitted
+        """
+        self.builder = builder
+        self.generation = generation
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Whether a newer build started since the job was submitted.
+        """
+        return self.builder._generation != self.generation
+
+    def check(self) -> None:
+        """
+        Stop the job when it was cancelled.
+        """
+        if self.cancelled:
+            raise Cancelled()
+
+    @contextlib.contextmanager
+    def writing(self) -> Iterator[None]:
+        """
+        Write files to the site directory, unless the job was cancelled.
+
+        Cancelling waits for writes that already started, so a superseded job never writes
+        to the site directory while a newer build cleans it.
+        """
+        with self.builder._write_lock:
+            self.check()
+            yield
+
+
+class BackgroundBuilder:
+    """
+    Runs the latest submitted job in a worker thread, once no new jobs were submitted for a while.
+
+    Also keeps a copy of every print page that was written, to show while it is being regenerated.
+    """
+
+    def __init__(self, delay: float = DEBOUNCE_DELAY):
+        """
+        Inits the class.
+
+        Args:
+            delay (float): Seconds to wait without new jobs before running the latest job
+        """
+        self.delay = delay
+        self.copies_dir = tempfile.mkdtemp(prefix="print-site-")
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._generation = 0
+        self._pending: Optional[Callable[[Job], None]] = None
+        self._submitted_at = 0.0
+        self._running = False
+        self._closed = False
+        # Files that belong to each print page, see `keep()`
+        self._side_files: Dict[str, List[str]] = {}
+        self._thread = threading.Thread(target=self._run, name="print-site-background", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, fn: Callable[[Job], None]) -> None:
+        """
+        Run a function in the background, replacing any job that did not start yet.
+
+        The function gets the `Job`, to check whether it was cancelled.
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = fn
+            self._submitted_at = time.monotonic()
+            self._condition.notify_all()
+
+    def cancel(self) -> None:
+        """
+        Cancel the pending and running job, and wait for any files it is writing.
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            self._condition.notify_all()
+        with self._write_lock:
+            pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until there is no pending or running job.
+
+        Returns:
+            done (bool): False when the timeout expired first
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending is None and not self._running, timeout)
+
+    def close(self) -> None:
+        """
+        Cancel any job, stop the worker thread and remove the copies of the print pages.
+        """
+        self.cancel()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        shutil.rmtree(self.copies_dir, ignore_errors=True)
+        with BACKGROUND_BUILDERS_LOCK:
+            for site_dir, builder in list(BACKGROUND_BUILDERS.items()):
+                if builder is self:
+                    del BACKGROUND_BUILDERS[site_dir]
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                # Debounce, a newer job replaces the pending one and restarts the delay
+                while self._pending is not None and not self._closed:
+                    remaining = self._submitted_at + self.delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+                if self._pending is None:
+                    continue
+                fn, job = self._pending, Job(self, self._generation)
+                self._pending = None
+                self._running = True
+
+            try:
+                start = time.monotonic()
+                fn(job)
+                logger.info(f"[mkdocs-print-site] Print pages regenerated in {time.monotonic() - start:.2f} seconds")
+            except Cancelled:
+                logger.debug("[mkdocs-print-site] Regenerating the print pages was cancelled by a newer build")
+            except Exception as error:
+                logger.error(f"[mkdocs-print-site] Could not regenerate the print pages: {error}", exc_info=True)
+            finally:
+                with self._condition:
+                    self._running = False
+                    self._condition.notify_all()
+
+    def _get_copy_path(self, path: str) -> str:
+        return os.path.join(self.copies_dir, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".html")
+
+    def keep(self, path: str, side_files: List[str] = ()) -> None:
+        """
+        Keep a copy of a print page that was written, and mark it as up to date.
+
+        Args:
+            path (str): Path of the print page
+            side_files (list): Paths of files that belong to the print page (f.e. its search index),
+                restored together with the print page while it is stale (optional)
+        """
+        shutil.copyfile(path, self._get_copy_path(path))
+        kept = []
+        for side_file in side_files:
+            if not os.path.exists(side_file):
+                continue
+            # Compressed copies are written again from the stale print page
+            if side_file not in (path + ".gz", path + ".br"):
+                shutil.copyfile(side_file, self._get_copy_path(side_file))
+            kept.append(side_file)
+        self._side_files[path] = kept
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(get_stale_marker_path(path))
+
+    def mark_stale(self, paths: List[str]) -> bool:
+        """
+        Write the previous version of print pages, with a banner that marks them as stale.
+
+        The site directory was cleaned by the new build, so the files that belong to the print pages
+        (f.e. their search index) are written again as well.
+
+        Args:
+            paths (list): Paths of the print pages in the site directory
+
+        Returns:
+            found (bool): Whether a previous version of any of the print pages was found
+        """
+        from mkdocs_print_site_plugin.writer import CompressingFile, get_brotli
+
+        found = False
+        for path in paths:
+            try:
+                with open(self._get_copy_path(path), "rb") as f:
+                    html = f.read()
+            except FileNotFoundError:
+                continue
+            m = BODY_REGEX.search(html)
+            if not m:
+                continue
+            marker_path = get_stale_marker_path(path)
+            banner = (STALE_BANNER % os.path.basename(marker_path)).encode("utf-8")
+            side_files = self._side_files.get(path, [])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The stale print page is only shown briefly, so compress it quickly
+            gzip_level = 1 if path + ".gz" in side_files else None
+            brotli_level = 1 if path + ".br" in side_files and get_brotli() is not None else None
+            with CompressingFile(path, gzip_level=gzip_level, brotli_level=brotli_level) as f:
+                f.write(html[: m.end()] + banner + html[m.end() :])
+            for side_file in side_files:
+                copy_path = self._get_copy_path(side_file)
+                if not os.path.exists(side_file) and os.path.exists(copy_path):
+                    os.makedirs(os.path.dirname(side_file), exist_ok=True)
+                    shutil.copyfile(copy_path, side_file)
+            with open(marker_path, "wb"):
+                pass
+            found = True
+        return found
+
+
+def get_stale_marker_path(path: str) -> str:
+    """
+    Path of the file that exists while a print page is stale.
+
+    Examples
+        get_stale_marker_path('site/print_page/index.html') --> 'site/print_page/index.html.stale'
+    """
+    return path + ".stale"
+
+
+# The background builders of the `mkdocs serve` commands in this process, per site directory
+BACKGROUND_BUILDERS: Dict[str, BackgroundBuilder] = {}
+BACKGROUND_BUILDERS_LOCK = threading.Lock()
+
+
+def get_background_builder(site_dir: str, create: bool = False) -> Optional[BackgroundBuilder]:
+    """
+    The background builder for a site directory.
+
+    Args:
+        site_dir (str): The site directory of the build
+        create (bool): Create a background builder when there is none yet
+
+    Returns:
+        builder (BackgroundBuilder): The background builder, or None when there is none
+    """
+    with BACKGROUND_BUILDERS_LOCK:
+        if create and site_dir not in BACKGROUND_BUILDERS:
+            BACKGROUND_BUILDERS[site_dir] = BackgroundBuilder()
+        return BACKGROUND_BUILDERS.get(site_dir)
@@ -0,0 +1,65 @@
+"""
+State of a single MkDocs build.
+
+The plugin keeps everything it collects during a build (the print pages, their renderers,
+the template context, etc) in a `BuildContext`. A new one is created in the `on_config` event,
+so nothing is carried over from a previous build by the same plugin instance (f.e. with `mkdocs serve`),
+and nothing is shared between builds running concurrently in the same process.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+class BuildContext:
+    """
+    Per-build state of the print-site plugin.
+    """
+
+    def __init__(self):
+        """
+        Inits the class.
+        """
+        # Derived from the configuration
+        self.theme_name: str = ""
+        self.cover_page_template_path: str = ""
+        self.banner_template_path: str = ""
+        self.enum_css_files: List[str] = []
+        self.gzip_level: Optional[int] = None
+        self.brotli_level: Optional[int] = None
+        self.cache_dir: str = ""
+        # Write a manifest next to the print pages, with 'add_manifest' or 'track_changes'
+        self.write_manifest: bool = False
+        # Purges unused rules from the stylesheets of the print pages, with 'purge_css'
+        self.css_purger = None
+
+        # The print page of the site, and any additional print pages as (Renderer, Page) tuples
+        self.print_page = None
+        self.renderer = None
+        self.profile_print_pages: List[Tuple] = []
+        self.section_print_pages: List[Tuple] = []
+        # Files written together with each print page (f.e. its search index), by path of the print page
+        self.side_files: Dict[str, List[str]] = {}
+
+        # Template context of the theme, applied to the print pages as well
+        self.template_context: Dict = {}
+
+        # Results of page transforms for other plugins, shared by the print pages
+        self.transform_cache: Dict = {}
+
+        # Regenerates the print pages after the build, during `mkdocs serve` with 'build_in_background'
+        self.background = None
+
+    @property
+    def print_file(self):
+        """
+        The mkdocs File of the print page.
+        """
+        return self.print_page.file
+
+    @property
+    def print_page_paths(self) -> List[str]:
+        """
+        Paths of all print pages in the site directory.
+        """
+        print_pages = [self.print_page] + [page for _, page in self.profile_print_pages + self.section_print_pages]
+        return [page.file.abs_dest_path for page in print_pages]
@@ -0,0 +1,100 @@
+"""
+Keep track of what changed in the print page since the previous build.
+
+Every page and section in the print page gets a digest of its HTML (including its children).
+The digests are saved in a cache directory (outside the site directory, which MkDocs cleans on every build)
+and compared with the digests of the previous build. The resulting list of changed top-level sections,
+together with their byte offsets in the manifest, allows downstream tools (f.e. PDF generation)
+to only re-render the sections that changed.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+
+
+def get_cache_path(cache_dir: str, print_page_src_uri: str) -> str:
+    """
+    Path of the saved digests of a print page.
+
+    Examples
+        get_cache_path('.cache/plugin/print-site', 'print_page.md') --> '.cache/plugin/print-site/print_page.json'
+    """
+    return os.path.join(cache_dir, os.path.splitext(print_page_src_uri)[0] + ".json")
+
+
+def get_digests(document: PrintDocument) -> Dict[PrintSection, str]:
+    """
+    Digest of every node in the print page.
+
+    The digest of a node covers its HTML and the HTML of all its children,
+    so a section changes whenever any of its pages changes.
+    """
+    digests = {}
+
+    def add_digest(node: PrintSection) -> str:
+        sha256 = hashlib.sha256(node.html.encode("utf-8", errors="xmlcharrefreplace"))
+        for child in node.children:
+            sha256.update(add_digest(child).encode("utf-8"))
+        sha256.update(node.closing_html.encode("utf-8"))
+        digests[node] = f"sha256:{sha256.hexdigest()}"
+        return digests[node]
+
+    for section in document.sections:
+        add_digest(section)
+    return digests
+
+
+def load_digests(path: str) -> Optional[Dict]:
+    """
+    Load the digests saved by the previous build, or None if there is no (readable) previous build.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        return {"sections": list(previous["sections"]), "digests": dict(previous["digests"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_digests(document: PrintDocument, digests: Dict[PrintSection, str], path: str) -> None:
+    """
+    Save the digests of all nodes, and the keys of the top-level sections, for the next build.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "sections": [node.key for node in document.sections],
+                "digests": {node.key: digests[node] for node in document.walk()},
+            },
+            f,
+            indent=1,
+        )
+
+
+def get_changes(document: PrintDocument, digests: Dict[PrintSection, str], previous: Optional[Dict]) -> Dict:
+    """
+    Compare the print page with the previous build.
+
+    Args:
+        document (PrintDocument): The content of the print page
+        digests (dict): Digest per node, see `get_digests()`
+        previous (dict): Saved digests of the previous build, see `load_digests()`, or None when there is none
+
+    Returns:
+        changes (dict): JSON serializable, with the keys of the top-level sections and the pages
+            that are new or changed (in document order), and the keys of the top-level sections that were removed
+    """
+    previous_digests = previous["digests"] if previous else {}
+    previous_sections = previous["sections"] if previous else []
+    section_keys = {node.key for node in document.sections}
+    return {
+        "previous_build": previous is not None,
+        "changed_sections": [node.key for node in document.sections if previous_digests.get(node.key) != digests[node]],
+        "removed_sections": [key for key in previous_sections if key not in section_keys],
+        "changed_pages": [node.key for node in document.pages() if previous_digests.get(node.key) != digests[node]],
+    }
@@ -0,0 +1,178 @@
+"""
+Deduplicate repeated content in the print page.
+
+Sites often include the same content in many pages, f.e. legal notices or prerequisites
+included with pymdownx snippets. In the print page, every copy is repeated.
+This replaces repeated blocks (top-level elements of a page, like paragraphs, tables and admonitions)
+with a short reference to the first occurrence.
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Tuple
+
+from mkdocs_print_site_plugin.document import ANCHOR_REGEX, PrintDocument, PrintSection
+
+# Elements that are deduplicated when they are repeated as a whole
+BLOCK_TAGS = {"blockquote", "details", "div", "dl", "figure", "ol", "p", "pre", "table", "ul"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+RAW_TEXT_TAGS = {"script", "style"}
+
+TAG_REGEX = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9-]*)\b[^>]*?(/?)>", flags=re.DOTALL)
+RAW_TEXT_END_REGEX = {tag: re.compile(rf"</{tag}\b", flags=re.IGNORECASE) for tag in RAW_TEXT_TAGS}
+
+DUPLICATE_HTML = '<p class="print-site-duplicate">See <a href="#{anchor}">{label}</a>.</p>'
+
+
+def get_blocks(page_html: str) -> List[Tuple[int, int, str]]:
+    """
+    The top-level elements of a page in the print page.
+
+    A page in the print page is wrapped in a <section>, so these are the elements directly inside it.
+
+    Examples
+        get_blocks('<section><h1>A</h1><p>b</p></section>') --> [(9, 19, 'h1'), (19, 27, 'p')]
+
+    Returns:
+        blocks (list): (start, end, tag) of every element, in document order
+    """
+    blocks = []
+    stack: List[Tuple[str, int]] = []
+    position = 0
+    while True:
+        m = TAG_REGEX.search(page_html, position)
+        if not m:
+            break
+        position = m.end()
+        is_closing, tag, is_self_closing = m.group(1), (m.group(2) or "").lower(), m.group(3)
+        if not tag or tag in VOID_TAGS or is_self_closing:
+            continue
+
+        if not is_closing:
+            if tag in RAW_TEXT_TAGS:
+                # Skip the content, which can contain anything that looks like a tag
+                end = RAW_TEXT_END_REGEX[tag].search(page_html, position)
+                position = end.start() if end else len(page_html)
+            stack.append((tag, m.start()))
+            continue
+
+        # Close the element, and any unclosed elements inside it
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == tag:
+                if i == 1:
+                    blocks.append((stack[i][1], m.end(), tag))
+                del stack[i:]
+                break
+
+    return blocks
+
+
+def deduplicate(document: PrintDocument, min_size: int = 200, enumerate_headings: bool = True) -> Tuple[int, int]:
+    """
+    Replace repeated blocks in the pages of the print page with a reference to their first occurrence.
+
+    Only blocks of at least `min_size` characters are deduplicated, and never blocks with an id or name
+    attribute, as other content can link to them. Consecutive repeated blocks that were also consecutive
+    the first time are replaced by a single reference. The first occurrence gets an id to link to.
+
+    Args:
+        document (PrintDocument): The content of the print page, updated in place
+        min_size (int): Minimum size of a block to deduplicate
+        enumerate_headings (bool): Whether to refer to the section number of the first occurrence
+
+    Returns:
+        blocks (int): Number of blocks that were replaced
+        bytes_saved (int): Number of bytes saved in the print page
+    """
+    pages = document.pages()
+    size_before = sum(len(node.html.encode("utf-8")) for node in pages)
+
+    # First occurrence of every block
+    first: Dict[bytes, Tuple[PrintSection, int, int, str]] = {}
+    # Per page the [start, end, first occurrence of the first block, first occurrence of the last block]
+    # of every run of repeated blocks
+    duplicates: Dict[PrintSection, List[List]] = {}
+    # Blocks that are referred to, and their new ids
+    anchors: Dict[Tuple, str] = {}
+    n_blocks = 0
+
+    for node in pages:
+        for index, (start, end, tag) in enumerate(get_blocks(node.html)):
+            block = node.html[start:end]
+            if tag not in BLOCK_TAGS or end - start < min_size or ANCHOR_REGEX.search(block):
+                continue
+            digest = hashlib.sha256(block.encode("utf-8", errors="xmlcharrefreplace")).digest()
+            if digest not in first:
+                first[digest] = (node, index, start, tag)
+                continue
+
+            original = first[digest]
+            n_blocks += 1
+            previous = duplicates.get(node, [])[-1:]
+            if previous and _is_next(node.html, previous[0], start, original):
+                # Part of the previous reference
+                previous[0][1] = end
+                previous[0][3] = original
+                continue
+            duplicates.setdefault(node, []).append([start, end, original, original])
+            anchors.setdefault(original, "")
+
+    if not duplicates:
+        return 0, 0
+
+    # Give the referred blocks an id, in document order
+    page_index = {node: i for i, node in enumerate(pages)}
+    for i, original in enumerate(sorted(anchors, key=lambda o: (page_index[o[0]], o[1]))):
+        anchors[original] = f"print-site-block-{i + 1}"
+
+    edits: Dict[PrintSection, List[Tuple[int, int, str]]] = {}
+    for original, anchor in anchors.items():
+        node, _, start, tag = original
+        position = start + 1 + len(tag)
+        edits.setdefault(node, []).append((position, position, f' id="{anchor}"'))
+    for node, node_duplicates in duplicates.items():
+        for start, end, original, _ in node_duplicates:
+            label = _get_label(original[0], enumerate_headings)
+            edits.setdefault(node, []).append((start, end, DUPLICATE_HTML.format(anchor=anchors[original], label=label)))
+
+    for node, node_edits in edits.items():
+        node.html = _apply_edits(node.html, node_edits)
+
+    size_after = sum(len(node.html.encode("utf-8")) for node in pages)
+    return n_blocks, size_before - size_after
+
+
+def _is_next(page_html: str, previous: List, start: int, original: Tuple) -> bool:
+    """
+    Whether a repeated block directly follows the previous repeated block,
+    and its first occurrence directly follows the first occurrence of the previous block.
+    """
+    _, previous_end, _, previous_original = previous
+    return (
+        page_html[previous_end:start].strip() == ""
+        and original[0] is previous_original[0]
+        and original[1] == previous_original[1] + 1
+    )
+
+
+def _get_label(node: PrintSection, enumerate_headings: bool) -> str:
+    """
+    Text of the link to the page of a first occurrence.
+    """
+    if enumerate_headings:
+        return f"section {node.heading_number} {node.title}"
+    return node.title
+
+
+def _apply_edits(html: str, edits: List[Tuple[int, int, str]]) -> str:
+    """
+    Replace the (start, end) slices of the HTML, which do not overlap.
+    """
+    parts = []
+    position = 0
+    for start, end, replacement in sorted(edits):
+        parts.append(html[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(html[position:])
+    return "".join(parts)
@@ -0,0 +1,261 @@
+"""
+Structured representation of the print page.
+
+The renderer builds a `PrintDocument`: an ordered tree of `PrintSection` nodes,
+one for every page and every section in the navigation. Each node holds the
+(rewritten) HTML fragment of that page, so post-processing stages can work on
+individual fragments instead of re-parsing the entire print page.
+The final HTML is serialized only once.
+"""
+
+import re
+from typing import Callable, Iterator, List, Optional, Set, Tuple
+
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.purge import Vocabulary
+
+ANCHOR_REGEX = re.compile(r"\s(?:id|name)=[\"']([^\"']+)[\"']", flags=re.IGNORECASE)
+LINK_REGEX = re.compile(r"<a\s[^>]*?href=[\"']([^\"']*)[\"']", flags=re.IGNORECASE)
+
+
+class PrintSection:
+    """
+    A page or a section of the navigation, as part of the print page.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        key: str,
+        heading_number: str,
+        title: str,
+        level: int,
+        html: str = "",
+        src_path: Optional[str] = None,
+        url: Optional[str] = None,
+    ):
+        """
+        Inits the class.
+
+        Args:
+            kind (str): Either 'page' or 'section'
+            key (str): The id of the node in the print page
+            heading_number (str): The number of the node in the navigation, f.e. '3.2.1'
+            title (str): Title of the page or section
+            level (int): Depth in the navigation, starting at 0
+            html (str): For pages the HTML of the page, for sections the opening HTML (including the h1 title)
+            src_path (str): For pages, the source path of the markdown file
+            url (str): For pages, the MkDocs url of the page
+        """
+        assert kind in ("page", "section")
+        self.kind = kind
+        self.key = key
+        self.heading_number = heading_number
+        self.title = title
+        self.level = level
+        self.src_path = src_path
+        self.url = url
+        self.children: List["PrintSection"] = []
+        self.html = html
+
+    @property
+    def is_page(self) -> bool:
+        return self.kind == "page"
+
+    @property
+    def is_section(self) -> bool:
+        return self.kind == "section"
+
+    @property
+    def html(self) -> str:
+        return self._html
+
+    @html.setter
+    def html(self, value: str):
+        self._html = value
+        # Invalidate anything derived from the HTML
+        self._anchors = None
+        self._links = None
+        self._vocabulary = None
+
+    @property
+    def closing_html(self) -> str:
+        """
+        HTML that closes the node, after the HTML of any children.
+        """
+        return "</section>" if self.is_section else ""
+
+    @property
+    def anchors(self) -> Set[str]:
+        """
+        All id and name attributes in the HTML of this node (excluding children).
+        """
+        if self._anchors is None:
+            self._anchors = set(ANCHOR_REGEX.findall(self._html))
+        return self._anchors
+
+    @property
+    def links(self) -> List[str]:
+        """
+        All outgoing href links in the HTML of this node (excluding children).
+        """
+        if self._links is None:
+            self._links = LINK_REGEX.findall(self._html)
+        return self._links
+
+    @property
+    def vocabulary(self) -> "Vocabulary":
+        """
+        All tags, classes and ids in the HTML of this node (excluding children).
+        """
+        if self._vocabulary is None:
+            self._vocabulary = Vocabulary(self._html)
+        return self._vocabulary
+
+    def copy(self) -> "PrintSection":
+        """
+        Shallow copy of this node, without children.
+        """
+        copy = PrintSection(
+            self.kind,
+            key=self.key,
+            heading_number=self.heading_number,
+            title=self.title,
+            level=self.level,
+            src_path=self.src_path,
+            url=self.url,
+        )
+        copy._html = self._html
+        copy._anchors = self._anchors
+        copy._links = self._links
+        copy._vocabulary = self._vocabulary
+        return copy
+
+    def walk(self) -> Iterator["PrintSection"]:
+        """
+        Yields this node and all its descendants, in document order.
+        """
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Yields the HTML of this node and all its descendants, in document order.
+        """
+        for _, chunk, _ in self.iter_events():
+            yield chunk
+
+    def iter_events(self) -> Iterator[Tuple["PrintSection", str, bool]]:
+        """
+        Yields (node, html, is_closing) for this node and all its descendants, in document order.
+
+        Useful to keep track of where each node starts and ends in the print page.
+        """
+        yield self, self._html, False
+        for child in self.children:
+            yield from child.iter_events()
+        yield self, self.closing_html, True
+
+
+class PrintDocument:
+    """
+    The content of the print page.
+
+    Consists of some HTML before the pages (cover page, table of contents, etc),
+    the pages and sections in the navigation, and some HTML after the pages.
+    """
+
+    def __init__(
+        self,
+        sections: List[PrintSection],
+        toc: TableOfContents,
+        header_html: str = "",
+        footer_html: str = "",
+    ):
+        """
+        Inits the class.
+        """
+        self.sections = sections
+        self.toc = toc
+        self.header_html = header_html
+        self.footer_html = footer_html
+
+    def walk(self) -> Iterator[PrintSection]:
+        """
+        Yields all nodes in document order.
+        """
+        for section in self.sections:
+            yield from section.walk()
+
+    def pages(self) -> List[PrintSection]:
+        """
+        All page nodes in document order.
+        """
+        return [node for node in self.walk() if node.is_page]
+
+    @property
+    def anchors(self) -> Set[str]:
+        """
+        All anchors available in the print page content.
+        """
+        anchors = set(ANCHOR_REGEX.findall(self.header_html))
+        for node in self.walk():
+            anchors.update(node.anchors)
+        return anchors
+
+    def apply(self, transform: Callable[[str, PrintSection], str]) -> None:
+        """
+        Apply a post-processing stage to the HTML of every page.
+
+        Args:
+            transform (Callable): Function that takes the HTML of a page and the page node, and returns the new HTML.
+        """
+        for node in self.pages():
+            node.html = transform(node.html, node)
+
+    def iter_html(self) -> Iterator[str]:
+        """
+        Yields the HTML of the print page content in chunks, in document order.
+        """
+        for _, chunk, _ in self.iter_events():
+            yield chunk
+
+    def iter_events(self) -> Iterator[Tuple[Optional[PrintSection], str, bool]]:
+        """
+        Yields (node, html, is_closing) in document order.
+
+        The node is None for the HTML before and after the pages.
+        """
+        yield None, self.header_html, False
+        for section in self.sections:
+            yield from section.iter_events()
+        yield None, self.footer_html, True
+
+    def to_html(self) -> str:
+        """
+        Serializes the print page content.
+        """
+        return "".join(self.iter_html())
+
+
+class ContentPlaceholder(str):
+    """
+    Stand-in for the content of the print page, when rendering the theme template.
+
+    This allows rendering the theme once, without the (large) content of the print page,
+    and then writing out the content in between. Themes can check the content,
+    f.e. mkdocs-material only adds a title when `"<h1" not in page.content`,
+    so membership checks are done against the actual content.
+    """
+
+    MARKER = "<!-- print-site-plugin-content -->"
+
+    def __new__(cls, document: PrintDocument):
+        placeholder = super().__new__(cls, cls.MARKER)
+        placeholder.document = document
+        return placeholder
+
+    def __contains__(self, item) -> bool:
+        return any(item in chunk for chunk in self.document.iter_html())
@@ -0,0 +1,549 @@
+"""
+Export the print page as an EPUB e-book.
+
+Every page and section of the print page becomes its own XHTML chapter, so e-readers only
+have to lay out one chapter at a time. The HTML of the pages is converted to well-formed XHTML
+(void elements are closed, entities are resolved, scripts are dropped), links to anchors on the
+print page are rewritten to the chapter that contains the anchor, and images from the site
+directory are packaged once. The table of contents of the print page is the navigation document.
+
+The EPUB is a zip file, written one chapter (and its images) at a time, so memory use is bounded
+by the largest page instead of the entire print page.
+"""
+
+import hashlib
+import html
+import mimetypes
+import os
+import re
+import shutil
+import time
+import uuid
+import zipfile
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlparse
+
+from mkdocs.structure.toc import AnchorLink
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.urls import is_base64_image, is_external
+
+# Fixed timestamp of the files in the zip, so unchanged content gives the same file
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+VOID_TAGS = {
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+}
+
+# The HTML parser lowercases all names, but names in SVG are case sensitive
+SVG_NAMES = {
+    name.lower(): name
+    for name in [
+        "attributeName",
+        "baseFrequency",
+        "clipPath",
+        "clipPathUnits",
+        "feGaussianBlur",
+        "filterUnits",
+        "foreignObject",
+        "gradientTransform",
+        "gradientUnits",
+        "lengthAdjust",
+        "linearGradient",
+        "markerHeight",
+        "markerUnits",
+        "markerWidth",
+        "maskUnits",
+        "numOctaves",
+        "pathLength",
+        "patternTransform",
+        "patternUnits",
+        "preserveAspectRatio",
+        "primitiveUnits",
+        "radialGradient",
+        "refX",
+        "refY",
+        "spreadMethod",
+        "startOffset",
+        "stdDeviation",
+        "textLength",
+        "textPath",
+        "viewBox",
+    ]
+}
+
+# Elements that need their namespace in XHTML, and the manifest property of chapters that contain them
+NAMESPACES = {
+    "svg": ("http://www.w3.org/2000/svg", "svg"),
+    "math": ("http://www.w3.org/1998/Math/MathML", "mathml"),
+}
+XLINK_NAMESPACE = "http://www.w3.org/1999/xlink"
+
+XML_NAME_REGEX = re.compile(r"^(?:xlink:|xml:|epub:)?[A-Za-z_][A-Za-z0-9_.-]*$")
+# Characters that are not allowed in XML documents
+INVALID_XML_CHARS_REGEX = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# Image types that are not known to every Python version
+MEDIA_TYPES = {".svg": "image/svg+xml", ".webp": "image/webp", ".avif": "image/avif"}
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="EPUB/package.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+# E-readers apply their own styles, these only cover the elements that need some help
+STYLESHEET = """
+img, svg { max-width: 100%; height: auto; }
+pre { white-space: pre-wrap; word-wrap: break-word; font-size: 0.8em; }
+code { font-family: monospace; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #ccc; padding: 0.2em 0.4em; }
+.admonition, details { border-left: 0.2em solid #448aff; margin: 1em 0; padding: 0 0.6em; }
+.admonition-title, summary { font-weight: bold; }
+.headerlink, .print-site-plugin-ignore { display: none; }
+"""
+
+XHTML_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops"
+      xml:lang="{language}" lang="{language}">
+<head>
+<meta charset="utf-8"/>
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="style.css"/>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def get_epub_path(print_page_path: str) -> str:
+    """
+    Path of the EPUB of a print page.
+
+    Examples
+        get_epub_path('site/print_page/index.html') --> 'site/print_page/index.epub'
+    """
+    return os.path.splitext(print_page_path)[0] + ".epub"
+
+
+def _escape(text: str, quote: bool = False) -> str:
+    return html.escape(INVALID_XML_CHARS_REGEX.sub("", text), quote=quote)
+
+
+class XhtmlConverter(HTMLParser):
+    """
+    Converts a HTML fragment to well-formed XHTML.
+
+    Unclosed elements are closed, stray end tags are dropped, and boolean attributes get a value.
+    Scripts and comments are removed. Links and image sources are passed through the given functions.
+
+    Usage:
+        converter = XhtmlConverter()
+        xhtml = converter.convert('<p>a<br>b')  # '<p>a<br/>b</p>'
+    """
+
+    def __init__(
+        self,
+        rewrite_link: Optional[Callable[[str], str]] = None,
+        rewrite_image: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        """
+        Inits the class.
+
+        Args:
+            rewrite_link (Callable): Function that returns the new href of a link (optional)
+            rewrite_image (Callable): Function that returns the new src of an image,
+                or None when the image should be replaced by a link to its source (optional)
+        """
+        super().__init__(convert_charrefs=True)
+        self.rewrite_link = rewrite_link or (lambda href: href)
+        self.rewrite_image = rewrite_image or (lambda src: src)
+        # Manifest properties of the chapter, f.e. 'svg'
+        self.properties = set()
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        self._in_script = False
+        self._heading_counters = [0] * 7
+
+    def convert(self, html: str) -> str:
+        """
+        Returns the XHTML of a HTML fragment.
+        """
+        self._parts, self._stack = [], []
+        self.feed(html)
+        self.close()
+        while self._stack:
+            self._parts.append(f"</{self._stack.pop()}>")
+        return "".join(self._parts)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def _start(self, tag: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool) -> None:
+        if self._in_script:
+            return
+        if tag == "script":
+            self._in_script = not self_closing
+            return
+        if not XML_NAME_REGEX.match(tag):
+            return
+
+        attributes: Dict[str, str] = {}
+        for name, value in attrs:
+            name = SVG_NAMES.get(name, name)
+            if XML_NAME_REGEX.match(name) and name not in attributes:
+                # Boolean attributes, f.e. <input checked>
+                attributes[name] = name if value is None else value
+
+        if tag == "img":
+            src = self.rewrite_image(attributes.get("src", ""))
+            if src is None:
+                # Not packaged, link to the image instead
+                href = _escape(self.rewrite_link(attributes.get("src", "")), quote=True)
+                self._parts.append(f'<a href="{href}">{_escape(attributes.get("alt") or href)}</a>')
+                return
+            attributes["src"] = src
+            attributes.setdefault("alt", "")
+            # Other sources of the image are not packaged
+            attributes.pop("srcset", None)
+            attributes.pop("sizes", None)
+        elif tag == "a" and "href" in attributes:
+            attributes["href"] = self.rewrite_link(attributes["href"])
+
+        tag = SVG_NAMES.get(tag, tag)
+        if tag in NAMESPACES:
+            namespace, manifest_property = NAMESPACES[tag]
+            attributes.setdefault("xmlns", namespace)
+            if tag == "svg":
+                attributes.setdefault("xmlns:xlink", XLINK_NAMESPACE)
+            self.properties.add(manifest_property)
+
+        # Headings enumerated with CSS counters (see headings.py) get their number as text.
+        # 'heading-number' is not a valid attribute in XHTML, it is kept as a data attribute.
+        heading_number = attributes.pop("heading-number", None)
+        if heading_number is not None:
+            attributes["data-heading-number"] = heading_number
+
+        attributes_html = "".join(f' {name}="{_escape(value, quote=True)}"' for name, value in attributes.items())
+        if tag in VOID_TAGS or self_closing:
+            self._parts.append(f"<{tag}{attributes_html}/>")
+            return
+        self._parts.append(f"<{tag}{attributes_html}>")
+        self._stack.append(tag)
+        if heading_number is not None and re.fullmatch(r"h[1-6]", tag):
+            number = self._number_heading(tag, heading_number)
+            self._parts.append(f'<span class="print-site-heading-number">{number} </span>')
+
+    def _number_heading(self, tag: str, heading_number: str) -> str:
+        # The same numbering as the CSS counters of css/print-site-enum-headings.css
+        level = int(tag[1])
+        if level == 1:
+            self._heading_counters = [0] * 7
+            return heading_number
+        self._heading_counters[level] += 1
+        for deeper in range(level + 1, 7):
+            self._heading_counters[deeper] = 0
+        return ".".join([heading_number] + [str(c) for c in self._heading_counters[2 : level + 1]])
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_script = False
+            return
+        tag = SVG_NAMES.get(tag, tag)
+        if self._in_script or tag not in self._stack:
+            return
+        # Close elements that were left open, up to the element that ends
+        while self._stack:
+            open_tag = self._stack.pop()
+            self._parts.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self._in_script:
+            self._parts.append(_escape(data))
+
+
+class EpubWriter:
+    """
+    Writes the content of a print page to an EPUB file.
+
+    Usage:
+        with EpubWriter('site/print_page/index.epub', 'My docs', base_dir='site/print_page') as epub:
+            epub.write_document(document)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        title: str,
+        base_dir: str,
+        language: str = "en",
+        author: str = "",
+        description: str = "",
+        base_url: str = "",
+        site_dir: str = "",
+        site_url: str = "",
+        modified: Optional[float] = None,
+    ):
+        """
+        Inits the class.
+
+        Args:
+            path (str): Path of the EPUB file
+            title (str): Title of the book
+            base_dir (str): Directory of the print page, that image sources are relative to
+            language (str): Language code of the book
+            author (str): Author of the book (optional)
+            description (str): Description of the book (optional)
+            base_url (str): Absolute URL of the print page, that relative links to other files are resolved against.
+                When empty, these links are kept as they are.
+            site_dir (str): The site directory, only images in this directory are packaged. Defaults to base_dir.
+            site_url (str): The URL of the site, root-relative image sources are resolved against its path (optional)
+            modified (float): Timestamp of the last change of the content, f.e. the newest modification time
+                of the pages. Defaults to the fixed timestamp of the files in the zip.
+                The SOURCE_DATE_EPOCH environment variable takes precedence.
+        """
+        self.path = path
+        self.title = title
+        self.base_dir = base_dir
+        self.language = language or "en"
+        self.author = author
+        self.description = description
+        self.base_url = base_url
+        self.site_dir = os.path.abspath(site_dir or base_dir)
+        self.site_path = urlparse(site_url).path.rstrip("/") + "/"
+        self.modified = modified
+        # Manifest items: (id, href, media type, properties)
+        self.items: List[Tuple[str, str, str, str]] = []
+        self.spine: List[str] = []
+        # Packaged images: path on disk -> (manifest id, href in the EPUB)
+        self.images: Dict[str, Tuple[str, str]] = {}
+        self._zip: Optional[zipfile.ZipFile] = None
+
+    def __enter__(self) -> "EpubWriter":
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._zip = zipfile.ZipFile(self.path, "w")
+        # The mimetype must be the first file, and not compressed
+        self._write("mimetype", "application/epub+zip", compress=False)
+        self._write("META-INF/container.xml", CONTAINER_XML)
+        self._write("EPUB/style.css", STYLESHEET)
+        self.items.append(("style", "style.css", "text/css", ""))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None:
+                self._write("EPUB/package.opf", self._build_package())
+        finally:
+            self._zip.close()
+            self._zip = None
+
+    def _write(self, name: str, data: str, compress: bool = True) -> None:
+        self._zip.writestr(self._get_zip_info(name, compress), data.encode("utf-8"))
+
+    def _get_zip_info(self, name: str, compress: bool = True) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def write_document(self, document: PrintDocument) -> int:
+        """
+        Write every page and section of a print page as a chapter, and the navigation document.
+
+        The cover page and table of contents of the print page are left out,
+        the navigation document of the EPUB replaces them.
+
+        Returns:
+            n_chapters (int): Number of chapters written
+        """
+        nodes = [node for node in document.walk() if node.html]
+        chapter_files = {node: f"chapter-{i:04d}.xhtml" for i, node in enumerate(nodes, start=1)}
+
+        # Links to anchors on the print page point to the chapter that contains the anchor
+        anchor_files = {}
+        for node, chapter_file in chapter_files.items():
+            anchor_files.setdefault(node.key, chapter_file)
+            for anchor in node.anchors:
+                anchor_files.setdefault(anchor, chapter_file)
+
+        for node, chapter_file in chapter_files.items():
+            self._write_chapter(node, chapter_file, anchor_files)
+
+        self._write_navigation(document.toc or [], anchor_files)
+        return len(nodes)
+
+    def _write_chapter(self, node: PrintSection, chapter_file: str, anchor_files: Dict[str, str]) -> None:
+        new_images = []
+
+        def rewrite_link(href: str) -> str:
+            if href.startswith("#"):
+                chapter = anchor_files.get(unquote(href[1:]))
+                return f"{chapter}{href}" if chapter else href
+            if is_external(href) or urlparse(href).scheme or href.startswith("//") or not self.base_url:
+                return href
+            return urljoin(self.base_url, href)
+
+        def rewrite_image(src: str) -> Optional[str]:
+            if is_base64_image(src):
+                return src
+            if is_external(src) or urlparse(src).scheme or src.startswith("//"):
+                # Images have to be part of the EPUB
+                return None
+            image_path = self._get_image_path(src)
+            if image_path is None:
+                return None
+            if image_path not in self.images:
+                extension = os.path.splitext(image_path)[1].lower()
+                name = hashlib.sha1(image_path.encode("utf-8")).hexdigest()[:16]
+                self.images[image_path] = (f"image-{len(self.images) + 1}", f"images/{name}{extension}")
+                new_images.append(image_path)
+            return self.images[image_path][1]
+
+        converter = XhtmlConverter(rewrite_link=rewrite_link, rewrite_image=rewrite_image)
+        body = converter.convert(node.html + node.closing_html)
+        chapter = XHTML_TEMPLATE.format(
+            language=_escape(self.language, quote=True),
+            title=_escape(node.title),
+            body=body,
+        )
+        with self._zip.open(self._get_zip_info(f"EPUB/{chapter_file}"), "w") as f:
+            f.write(chapter.encode("utf-8"))
+        item_id = os.path.splitext(chapter_file)[0]
+        self.items.append((item_id, chapter_file, "application/xhtml+xml", " ".join(sorted(converter.properties))))
+        self.spine.append(item_id)
+
+        # Package the images of the chapter, once
+        for image_path in new_images:
+            item_id, href = self.images[image_path]
+            with open(image_path, "rb") as source, self._zip.open(self._get_zip_info(f"EPUB/{href}"), "w") as f:
+                shutil.copyfileobj(source, f)
+            extension = os.path.splitext(image_path)[1].lower()
+            media_type = MEDIA_TYPES.get(extension) or mimetypes.guess_type(image_path)[0] or "application/octet-stream"
+            self.items.append((item_id, href, media_type, ""))
+
+    def _get_image_path(self, src: str) -> Optional[str]:
+        """
+        Path of a local image on disk, or None when it is not a file in the site directory.
+
+        Root-relative sources (f.e. '/docs/img.png') are resolved against the site directory,
+        without the path of the site url.
+        """
+        src_path = unquote(urlparse(src).path)
+        if src_path.startswith("/"):
+            if not src_path.startswith(self.site_path):
+                return None
+            image_path = os.path.join(self.site_dir, src_path[len(self.site_path) :])
+        else:
+            image_path = os.path.join(self.base_dir, src_path)
+        image_path = os.path.abspath(image_path)
+        try:
+            if os.path.commonpath([image_path, self.site_dir]) != self.site_dir:
+                return None
+        except ValueError:
+            # On different drives
+            return None
+        return image_path if os.path.isfile(image_path) else None
+
+    def _write_navigation(self, toc: List[AnchorLink], anchor_files: Dict[str, str]) -> None:
+        def nav_list(anchor_links: List[AnchorLink]) -> str:
+            items = []
+            for anchor_link in anchor_links:
+                chapter = anchor_files.get(anchor_link.id)
+                if chapter is None:
+                    continue
+                children = nav_list(anchor_link.children) if anchor_link.children else ""
+                href = _escape(f"{chapter}#{anchor_link.id}", quote=True)
+                items.append(f'<li><a href="{href}">{_escape(anchor_link.title)}</a>{children}</li>')
+            return f"<ol>{''.join(items)}</ol>" if items else ""
+
+        nav = nav_list(list(toc))
+        if not nav:
+            # A navigation document needs at least one entry
+            first_chapter = f"{self.spine[0]}.xhtml" if self.spine else "nav.xhtml"
+            nav = f'<ol><li><a href="{first_chapter}">{_escape(self.title)}</a></li></ol>'
+        body = f'<nav epub:type="toc" id="toc"><h1>{_escape(self.title)}</h1>{nav}</nav>'
+        xhtml = XHTML_TEMPLATE.format(
+            language=_escape(self.language, quote=True), title=_escape(self.title), body=body
+        )
+        self._write("EPUB/nav.xhtml", xhtml)
+        self.items.insert(0, ("nav", "nav.xhtml", "application/xhtml+xml", "nav"))
+
+    def _build_package(self) -> str:
+        identifier = uuid.uuid5(uuid.NAMESPACE_URL, self.base_url or self.title)
+        # The same content gives the same file, reproducible builds can set the date with SOURCE_DATE_EPOCH
+        if os.environ.get("SOURCE_DATE_EPOCH"):
+            modified = time.gmtime(int(os.environ["SOURCE_DATE_EPOCH"]))
+        elif self.modified is not None:
+            modified = time.gmtime(int(self.modified))
+        else:
+            modified = time.struct_time(ZIP_DATE_TIME + (0, 1, 0))
+        modified = time.strftime("%Y-%m-%dT%H:%M:%SZ", modified)
+        metadata = [
+            f'<dc:identifier id="book-id">urn:uuid:{identifier}</dc:identifier>',
+            f"<dc:title>{_escape(self.title)}</dc:title>",
+            f"<dc:language>{_escape(self.language)}</dc:language>",
+            f'<meta property="dcterms:modified">{modified}</meta>',
+        ]
+        if self.author:
+            metadata.append(f"<dc:creator>{_escape(self.author)}</dc:creator>")
+        if self.description:
+            metadata.append(f"<dc:description>{_escape(self.description)}</dc:description>")
+
+        manifest = []
+        for item_id, href, media_type, properties in self.items:
+            properties = f' properties="{properties}"' if properties else ""
+            href = _escape(href, quote=True)
+            manifest.append(f'<item id="{item_id}" href="{href}" media-type="{media_type}"{properties}/>')
+        spine = [f'<itemref idref="{item_id}"/>' for item_id in self.spine]
+
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" '
+            f'xml:lang="{_escape(self.language, quote=True)}">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n' + "\n".join(metadata) + "\n</metadata>\n"
+            "<manifest>\n" + "\n".join(manifest) + "\n</manifest>\n"
+            "<spine>\n" + "\n".join(spine) + "\n</spine>\n"
+            "</package>\n"
+        )
+
+
+def write_epub(document: PrintDocument, path: str, title: str, base_dir: str, **kwargs) -> int:
+    """
+    Write the content of a print page to an EPUB file.
+
+    Args:
+        document (PrintDocument): The content of the print page
+        path (str): Path of the EPUB file
+        title (str): Title of the book
+        base_dir (str): Directory of the print page, that image sources are relative to
+        kwargs: Other arguments of `EpubWriter`
+
+    Returns:
+        n_chapters (int): Number of chapters written
+    """
+    with EpubWriter(path, title, base_dir, **kwargs) as epub:
+        return epub.write_document(document)
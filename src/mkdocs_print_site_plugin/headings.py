@@ -0,0 +1,112 @@
+"""
+Enumerate headings on the print page.
+
+The numbering of the print page is determined by the navigation. A page with
+number 3.2.1 gets a h1 "3.2.1", and its inner headings are numbered 3.2.1.1, 3.2.1.2, etc.
+
+Instead of generating CSS rules for every page, we tag the headings with a
+`heading-number` attribute holding the number of the page they belong to.
+A small, generic stylesheet (`css/print-site-enum-headings.css`) then uses
+`attr(heading-number)` together with CSS counters to display the numbers.
+
+Alternatively (option `enumerate_in_html`), the numbers are inserted as text into the headings
+and figure captions, in which case no CSS counters are needed.
+"""
+
+import re
+from typing import Tuple
+
+HEADING_OPEN_TAG = re.compile(r"<h([1-6])(?=[\s>])", flags=re.IGNORECASE)
+HEADING_FULL_OPEN_TAG = re.compile(r"<h([1-6])(?:\s[^>]*)?>", flags=re.IGNORECASE)
+FIGCAPTION_OPEN_TAG = re.compile(r"<figcaption(?:\s[^>]*)?>", flags=re.IGNORECASE)
+
+
+def add_heading_numbers(page_html: str, heading_number: str, max_level: int) -> str:
+    """
+    Add a `heading-number` attribute to headings of a page.
+
+    h1 headings get the number of the page, h2 up to and including h{max_level}
+    get the same number as a prefix for the CSS counters. Deeper headings are not tagged
+    and therefore not enumerated.
+
+    Examples
+        add_heading_numbers('<h1 id="a">A</h1>', '1.2', 2) --> '<h1 heading-number="1.2" id="a">A</h1>'
+
+    Args:
+        page_html (str): HTML of the page
+        heading_number (str): The number of the page in the navigation, f.e. '3.2.1'
+        max_level (int): The deepest heading level to enumerate
+
+    Returns:
+        html (str): HTML with tagged headings
+    """
+
+    def tag_heading(m):
+        if int(m.group(1)) > max_level:
+            return m.group()
+        return f'{m.group()} heading-number="{heading_number}"'
+
+    return HEADING_OPEN_TAG.sub(tag_heading, page_html)
+
+
+def insert_heading_numbers(page_html: str, heading_number: str, max_level: int) -> str:
+    """
+    Insert the enumeration numbers as text into the headings of a page.
+
+    Alternative to `add_heading_numbers()` that does not rely on CSS counters:
+    the numbers end up in the DOM, so they are searchable and no layout time is spent on them.
+    Inner headings are numbered the same way as the CSS counters would do it.
+
+    Examples
+        insert_heading_numbers('<h1>A</h1><h2>B</h2>', '1.2', 2)
+        --> '<h1><span class="print-site-heading-number">1.2 </span>A</h1><h2><span ...>1.2.1 </span>B</h2>'
+
+    Args:
+        page_html (str): HTML of the page
+        heading_number (str): The number of the page in the navigation, f.e. '3.2.1'
+        max_level (int): The deepest heading level to enumerate
+
+    Returns:
+        html (str): HTML with numbered headings
+    """
+    counters = [0] * 7
+
+    def number_heading(m):
+        level = int(m.group(1))
+        if level > max_level:
+            return m.group()
+        if level == 1:
+            number = heading_number
+        else:
+            counters[level] += 1
+            for deeper in range(level + 1, 7):
+                counters[deeper] = 0
+            number = ".".join([heading_number] + [str(c) for c in counters[2 : level + 1]])
+        return f'{m.group()}<span class="print-site-heading-number">{number} </span>'
+
+    return HEADING_FULL_OPEN_TAG.sub(number_heading, page_html)
+
+
+def insert_figure_numbers(page_html: str, start: int = 0) -> Tuple[str, int]:
+    """
+    Insert the enumeration numbers as text into figure captions.
+
+    Figures are numbered across the entire print page, so the count of previous figures is passed along.
+
+    Args:
+        page_html (str): HTML of the page
+        start (int): Number of figures before this page
+
+    Returns:
+        html (str): HTML with numbered figure captions
+        count (int): Number of figures up to and including this page
+    """
+    count = start
+
+    def number_figure(m):
+        nonlocal count
+        count += 1
+        return f'{m.group()}<span class="print-site-figure-number">Figure {count}: </span>'
+
+    page_html = FIGCAPTION_OPEN_TAG.sub(number_figure, page_html)
+    return page_html, count
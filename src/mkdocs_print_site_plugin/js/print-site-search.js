@@ -0,0 +1,130 @@
+/*
+Search the print page.
+
+Only included in the print page when print-site-plugin option 'add_search_index' is set to true.
+The search index is generated by the plugin, and only downloaded once the reader starts searching.
+*/
+(function () {
+  const MAX_RESULTS = 50;
+  const indexUrl = document.currentScript.getAttribute("data-index");
+  var searchIndex = null;
+
+  // Download the search index (once)
+  function load_search_index() {
+    if (searchIndex === null) {
+      searchIndex = fetch(indexUrl)
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+          // Sorted words, to find all words starting with a prefix
+          data.words = Object.keys(data.index).sort();
+          // Positions are stored as the difference with the previous position
+          data.words.forEach(function (word) {
+            const ids = data.index[word];
+            for (var i = 1; i < ids.length; i++) {
+              ids[i] += ids[i - 1];
+            }
+          });
+          return data;
+        });
+    }
+    return searchIndex;
+  }
+
+  // Keep in sync with TOKEN_REGEX in search.py
+  function tokenize(text) {
+    return text.toLowerCase().match(/[\p{L}\p{M}\p{N}_]{2,}/gu) || [];
+  }
+
+  // Positions of the results containing any word that starts with the prefix
+  function find_prefix(data, prefix) {
+    var low = 0, high = data.words.length;
+    while (low < high) {
+      const middle = (low + high) >> 1;
+      if (data.words[middle] < prefix) { low = middle + 1; } else { high = middle; }
+    }
+    const ids = new Set();
+    for (var i = low; i < data.words.length && data.words[i].startsWith(prefix); i++) {
+      data.index[data.words[i]].forEach(function (id) { ids.add(id); });
+    }
+    return ids;
+  }
+
+  // Results that contain all words of the query, the last word may be incomplete
+  function search(data, query) {
+    const tokens = tokenize(query);
+    if (tokens.length === 0) {
+      return [];
+    }
+    var results = null;
+    tokens.forEach(function (token, i) {
+      const ids = i === tokens.length - 1 ? find_prefix(data, token) : new Set(data.index[token] || []);
+      results = results === null ? ids : new Set(Array.from(results).filter(function (id) { return ids.has(id); }));
+    });
+    return Array.from(results)
+      .sort(function (a, b) { return a - b; })
+      .slice(0, MAX_RESULTS)
+      .map(function (id) { return data.docs[id]; });
+  }
+
+  function show_results(list, results) {
+    list.textContent = "";
+    results.forEach(function (result) {
+      const link = document.createElement("a");
+      link.href = "#" + result[0];
+      link.textContent = result[1];
+      const item = document.createElement("li");
+      item.appendChild(link);
+      list.appendChild(item);
+    });
+  }
+
+  function add_search_box() {
+    const style = document.createElement("style");
+    style.textContent = `
+      #print-site-search { position: fixed; right: 1rem; bottom: 1rem; z-index: 1000; width: 20rem;
+        display: flex; flex-direction: column-reverse; font-size: 0.8rem; }
+      #print-site-search input { padding: 0.4rem; border: 1px solid #ccc; border-radius: 0.2rem; }
+      #print-site-search ol { max-height: 50vh; overflow-y: auto; margin: 0 0 0.2rem 0; padding: 0;
+        list-style: none; background: white; box-shadow: 0 0.1rem 0.4rem rgba(0, 0, 0, 0.2); }
+      #print-site-search ol:empty { display: none; }
+      #print-site-search li { margin: 0; padding: 0.2rem 0.4rem; }
+      @media print { #print-site-search { display: none; } }
+    `;
+    document.head.appendChild(style);
+
+    const box = document.createElement("div");
+    box.id = "print-site-search";
+    const input = document.createElement("input");
+    input.type = "search";
+    input.placeholder = "Search";
+    input.setAttribute("aria-label", "Search the print page");
+    const list = document.createElement("ol");
+    box.appendChild(input);
+    box.appendChild(list);
+    document.body.appendChild(box);
+
+    input.addEventListener("focus", load_search_index);
+    input.addEventListener("input", function () {
+      const query = input.value;
+      load_search_index().then(function (data) {
+        // Ignore results of an outdated query
+        if (query === input.value) {
+          show_results(list, search(data, query));
+        }
+      });
+    });
+    input.addEventListener("keydown", function (event) {
+      // Jump to the first result
+      const first = list.querySelector("a");
+      if (event.key === "Enter" && first) {
+        window.location.hash = first.getAttribute("href");
+      }
+      if (event.key === "Escape") {
+        input.value = "";
+        list.textContent = "";
+      }
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", add_search_box);
+})();
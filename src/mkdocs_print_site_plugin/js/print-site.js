@@ -18,6 +18,10 @@ function generate_toc() {
 }
 
 
+/*
+With the 'slim_theme_context' option, these elements are already removed by the plugin.
+Keep in sync with THEME_NAVIGATION_CLASSES in plugin.py
+*/
 function remove_material_navigation() {
   // Remove left sidebar on print page
   remove_element_by_classname("md-sidebar--primary")
@@ -40,3 +44,33 @@ function remove_element_by_classname(class_name) {
     el[0].style.display = "none"
   }
 }
+
+
+/*
+With the 'eager_images' option disabled, images in the print page are lazy loaded, like in the rest of the site,
+so opening the print page does not download every image at once. The remaining images start loading when printing,
+but browsers do not wait for them, so images that are not loaded in time are missing from the printout.
+Add '?eager_images' to the url of the print page to load all images right away,
+f.e. when generating a PDF with a headless browser.
+*/
+function load_images_when_printing() {
+  window.addEventListener("beforeprint", load_lazy_images);
+  if (new URLSearchParams(window.location.search).has("eager_images")) {
+    // Can be awaited by scripts that print the page
+    window.print_site_images_loaded = load_lazy_images();
+  }
+}
+
+/*
+Load all lazy loaded images.
+Returns a promise that resolves when all images are loaded and decoded (or failed to load).
+*/
+function load_lazy_images() {
+  var images = Array.from(document.querySelectorAll('img[loading="lazy"]'));
+  images.forEach(function (img) {
+    img.loading = "eager";
+  });
+  return Promise.all(images.map(function (img) {
+    return img.decode().catch(function () {});
+  }));
+}
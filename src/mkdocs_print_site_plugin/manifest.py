@@ -0,0 +1,124 @@
+"""
+Machine-readable manifest of the print page.
+
+Lists every page and section in the print page, with the byte offsets where they start
+and end in the print page HTML file. Downstream tools (PDF generation, search indexing)
+can use this to seek directly to a slice of the (large) print page instead of parsing it.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.urls import get_page_key
+
+# (start, end of own html, end including children) in bytes
+Span = Tuple[int, int, int]
+
+
+def get_manifest_path(print_page_path: str) -> str:
+    """
+    Path of the manifest, next to the print page.
+
+    Examples
+        get_manifest_path('site/print_page.html') --> 'site/print_page.manifest.json'
+        get_manifest_path('site/print_page/index.html') --> 'site/print_page/index.manifest.json'
+    """
+    return os.path.splitext(print_page_path)[0] + ".manifest.json"
+
+
+def toc_to_list(toc: TableOfContents) -> List[Dict]:
+    """
+    Convert a table of contents to plain python objects.
+    """
+
+    def anchor_to_dict(anchor) -> Dict:
+        return {
+            "title": anchor.title,
+            "id": anchor.id,
+            "level": anchor.level,
+            "children": [anchor_to_dict(child) for child in anchor.children],
+        }
+
+    return [anchor_to_dict(anchor) for anchor in toc]
+
+
+def build_manifest(
+    document: PrintDocument,
+    spans: Optional[Dict[PrintSection, Span]],
+    print_page_url: str,
+    content_span: Optional[Tuple[int, int]] = None,
+    digest: Optional[str] = None,
+    digests: Optional[Dict[PrintSection, str]] = None,
+    changes: Optional[Dict] = None,
+) -> Dict:
+    """
+    Build the manifest of the print page.
+
+    Args:
+        document (PrintDocument): The content of the print page
+        spans (dict): Byte offsets of each node in the written print page, or None if unknown
+        print_page_url (str): URL of the print page, relative to the site root
+        content_span (tuple): Byte offsets of the print page content (all pages), or None if unknown
+        digest (str): Digest of the print page, or None if unknown
+        digests (dict): Digest of each node, or None if changes are not tracked
+        changes (dict): Changes since the previous build, or None if changes are not tracked
+
+    Returns:
+        manifest (dict): JSON serializable manifest
+    """
+    sections = []
+
+    def add_nodes(nodes: List[PrintSection], parent: Optional[str]):
+        for node in nodes:
+            span = spans.get(node) if spans else None
+            sections.append(
+                {
+                    "key": node.key,
+                    "kind": node.kind,
+                    "parent": parent,
+                    "level": node.level,
+                    "heading_number": node.heading_number,
+                    "title": node.title,
+                    "src_path": node.src_path,
+                    "url": node.url,
+                    # The key of a page is shorter with 'compact_anchors', this is the full form
+                    "page_key": get_page_key(node.url) if node.url is not None else None,
+                    "start": span[0] if span else None,
+                    "html_end": span[1] if span else None,
+                    "end": span[2] if span else None,
+                    "anchors": sorted(node.anchors),
+                }
+            )
+            if digests:
+                sections[-1]["digest"] = digests[node]
+            add_nodes(node.children, node.key)
+
+    add_nodes(document.sections, None)
+
+    manifest = {
+        "print_page": print_page_url,
+        "encoding": "utf-8",
+        "digest": digest,
+        "content": {
+            "start": content_span[0] if content_span else None,
+            "end": content_span[1] if content_span else None,
+        },
+        "sections": sections,
+        "toc": toc_to_list(document.toc),
+    }
+    if changes is not None:
+        manifest["changes"] = changes
+    return manifest
+
+
+def write_manifest(manifest: Dict, path: str) -> None:
+    """
+    Write the manifest as JSON.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
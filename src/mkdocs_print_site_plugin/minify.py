@@ -0,0 +1,150 @@
+"""
+Minify the HTML of the print page.
+
+The print page is assembled from pretty-printed templates and theme HTML, with a lot of
+indentation, comments and permalinks ('headerlink' anchors) that serve no purpose in print.
+The `Minifier` removes these in a single pass, one chunk (page) at a time, so it never needs
+the entire print page in memory. The content of <pre>, <code>, <textarea>, <script> and <style>
+elements is never changed, and tags themselves are kept as they are.
+"""
+
+import re
+from typing import List
+
+from mkdocs_print_site_plugin.document import PrintDocument
+
+# Elements whose content is kept exactly as it is
+RAW_TAGS = {"pre", "code", "textarea", "script", "style"}
+
+TOKEN_REGEX = re.compile(r"<!--(?:.*?-->|.*)|<(/?)([a-zA-Z][a-zA-Z0-9-]*)\b[^>]*>|[^<]+|<", flags=re.DOTALL)
+RAW_END_REGEX = {tag: re.compile(rf"</{tag}\s*>", flags=re.IGNORECASE) for tag in RAW_TAGS}
+# A comment that continues in the next chunk is kept as it is
+RAW_END_REGEX["!--"] = re.compile(r"-->")
+ANCHOR_END_REGEX = re.compile(r"</a\s*>", flags=re.IGNORECASE)
+HEADERLINK_REGEX = re.compile(r"""\sclass=["'](?:[^"']*\s)?headerlink(?:\s[^"']*)?["']""", flags=re.IGNORECASE)
+# Only HTML whitespace, not f.e. non-breaking spaces
+WHITESPACE_REGEX = re.compile(r"[ \t\r\n\f]+")
+
+
+def _collapse_whitespace(m: re.Match) -> str:
+    return "\n" if "\n" in m.group() else " "
+
+
+class Minifier:
+    """
+    Streaming HTML minifier.
+
+    Removes comments (except conditional comments), collapses runs of whitespace to a single
+    space or newline, and optionally removes 'headerlink' anchors. Feed the HTML in document order,
+    an element (like <pre>) can start in one chunk and end in another. Comments that span chunks are kept.
+
+    Usage:
+        minifier = Minifier()
+        for chunk in chunks:
+            f.write(minifier.feed(chunk))
+    """
+
+    def __init__(self, remove_headerlinks: bool = False):
+        """
+        Inits the class.
+
+        Args:
+            remove_headerlinks (bool): Whether to remove the permalinks of headings
+        """
+        self.remove_headerlinks = remove_headerlinks
+        # The element whose content is kept as it is ('a' for a headerlink that is removed,
+        # '!--' for a comment that spans chunks), if any
+        self._raw_tag = None
+        # Whether the output ends with collapsed whitespace, which can be followed by more whitespace
+        # after a removed comment, or in the next chunk
+        self._after_whitespace = False
+        self.size_before = 0
+        self.size_after = 0
+
+    def feed(self, html: str) -> str:
+        """
+        Returns the minified HTML of the next chunk of the page.
+        """
+        parts: List[str] = []
+        position = 0
+        while position < len(html):
+            if self._raw_tag is not None:
+                position = self._skip_raw(html, position, parts)
+                continue
+
+            m = TOKEN_REGEX.match(html, position)
+            position = m.end()
+            token = m.group()
+            is_closing, tag = m.group(1), (m.group(2) or "").lower()
+            if token.startswith("<!--") and not token.endswith("-->"):
+                # The comment ends in a next chunk, possibly after the closing tags of nodes
+                parts.append(token)
+                self._after_whitespace = False
+                self._raw_tag = "!--"
+            elif token.startswith("<!--"):
+                # Keep conditional comments, which can include content for some browsers
+                if token.startswith(("<!--[", "<!--<!")):
+                    parts.append(token)
+            elif not tag:
+                text = WHITESPACE_REGEX.sub(_collapse_whitespace, token)
+                if self._after_whitespace and text[0] in " \n":
+                    text = text[1:]
+                if text:
+                    parts.append(text)
+                    self._after_whitespace = text[-1] in " \n"
+            elif tag == "a" and not is_closing and self.remove_headerlinks and HEADERLINK_REGEX.search(token):
+                self._raw_tag = "a"
+            else:
+                parts.append(token)
+                self._after_whitespace = False
+                if tag in RAW_TAGS and not is_closing and not token.endswith("/>"):
+                    self._raw_tag = tag
+
+        result = "".join(parts)
+        self.size_before += len(html.encode("utf-8", errors="xmlcharrefreplace"))
+        self.size_after += len(result.encode("utf-8", errors="xmlcharrefreplace"))
+        return result
+
+    def _skip_raw(self, html: str, position: int, parts: List[str]) -> int:
+        """
+        Keep the content of a raw element (or drop the content of a headerlink) up to its end tag.
+
+        Returns:
+            position (int): Position after the end tag, or the end of the chunk
+        """
+        is_headerlink = self._raw_tag == "a"
+        end = (ANCHOR_END_REGEX if is_headerlink else RAW_END_REGEX[self._raw_tag]).search(html, position)
+        stop = end.end() if end else len(html)
+        if not is_headerlink and stop > position:
+            parts.append(html[position:stop])
+            self._after_whitespace = False
+        if end:
+            self._raw_tag = None
+        return stop
+
+
+def minify_document(document: PrintDocument, minifier: Minifier) -> None:
+    """
+    Minify the content of the print page in place, one node at a time, in document order.
+
+    All chunks of the print page are fed to the minifier, so its state carries over from one node to the next.
+    The closing HTML of a node is a single end tag, that is kept as it is.
+    """
+    for node, html, is_closing in list(document.iter_events()):
+        minified = minifier.feed(html)
+        if node is not None and not is_closing:
+            node.html = minified
+        elif node is None and is_closing:
+            document.footer_html = minified
+        elif node is None:
+            document.header_html = minified
+
+
+def minify(html: str, remove_headerlinks: bool = False) -> str:
+    """
+    Minify a complete HTML document or fragment.
+
+    Examples
+        minify('<p>a  <!-- b -->\\n  c</p>') --> '<p>a c</p>'
+    """
+    return Minifier(remove_headerlinks=remove_headerlinks).feed(html)
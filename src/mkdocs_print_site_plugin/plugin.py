@@ -1,26 +1,32 @@
+import contextlib
 import logging
 import os
-import re
 import sys
-import functools
-import re as regex_module
-
+from urllib.parse import urljoin
 
 from mkdocs.config import config_options
 from mkdocs.exceptions import PluginError
 from mkdocs.plugins import BasePlugin
-from mkdocs.structure.files import File
-from mkdocs.structure.pages import Page
-from mkdocs.utils import copy_file, get_relative_url, write_file
+from mkdocs.utils import get_relative_url
 
-from mkdocs_print_site_plugin.renderer import Renderer
-from mkdocs_print_site_plugin.urls import is_external
-from mkdocs_print_site_plugin.utils import get_theme_name
+# Note: the rest of the plugin (the renderer, the document model, etc) is imported
+# in the events where it is used. This keeps `mkdocs build` and `mkdocs serve` fast
+# for sites that have the plugin installed but not enabled (f.e. 'enabled: !ENV ...').
 
 logger = logging.getLogger("mkdocs.plugins")
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 
+# Options that can be set per print page in the 'profiles' option
+PROFILE_OPTIONS = ("exclude", "print_page_title", "print_page_basename", "add_cover_page", "cover_page_template")
+
+# Classes of the navigation elements per theme, that are not shown on the print page.
+# Keep in sync with js/print-site.js
+THEME_NAVIGATION_CLASSES = {
+    "material": ["md-sidebar--primary", "md-tabs", "md-search"],
+    "mkdocs": ["navbar"],
+}
+
 
 class PrintSitePlugin(BasePlugin):
     """
@@ -38,6 +44,7 @@ class PrintSitePlugin(BasePlugin):
         ("enumerate_headings", config_options.Type(bool, default=True)),
         ("enumerate_headings_depth", config_options.Type(int, default=6)),
         ("enumerate_figures", config_options.Type(bool, default=True)),
+        ("enumerate_in_html", config_options.Type(bool, default=False)),
         ("add_cover_page", config_options.Type(bool, default=False)),
         ("cover_page_template", config_options.Type(str, default="")),
         ("add_print_site_banner", config_options.Type(bool, default=False)),
@@ -46,6 +53,28 @@ class PrintSitePlugin(BasePlugin):
         ("include_css", config_options.Type(bool, default=True)),
         ("enabled", config_options.Type(bool, default=True)),
         ("exclude", config_options.Type(list, default=[])),
+        ("add_manifest", config_options.Type(bool, default=False)),
+        ("add_section_print_pages", config_options.Type(bool, default=False)),
+        ("profiles", config_options.Type(list, default=[])),
+        ("precompress_print_page", config_options.Type(bool, default=False)),
+        ("gzip_compression_level", config_options.Type(int, default=9)),
+        ("brotli_compression_level", config_options.Type(int, default=11)),
+        ("track_changes", config_options.Type(bool, default=False)),
+        ("cache_dir", config_options.Type(str, default=".cache/plugin/print-site")),
+        ("add_search_index", config_options.Type(bool, default=False)),
+        ("large_page_threshold", config_options.Type(int, default=5_000_000)),
+        ("large_page_mode", config_options.Type(str, default="inline")),
+        ("deduplicate_blocks", config_options.Type(bool, default=False)),
+        ("deduplicate_min_size", config_options.Type(int, default=200)),
+        ("slim_theme_context", config_options.Type(bool, default=False)),
+        ("build_in_background", config_options.Type(bool, default=False)),
+        ("compact_anchors", config_options.Type(bool, default=False)),
+        ("minify_print_page", config_options.Type(bool, default=False)),
+        ("minify_remove_headerlinks", config_options.Type(bool, default=False)),
+        ("eager_images", config_options.Type(bool, default=True)),
+        ("add_epub", config_options.Type(bool, default=False)),
+        ("purge_css", config_options.Type(bool, default=False)),
+        ("purge_css_safelist", config_options.Type(list, default=[])),
     )
 
     def on_config(self, config, **kwargs):
@@ -56,11 +85,34 @@ class PrintSitePlugin(BasePlugin):
         """
         if not self.config.get("enabled"):
             return config
+
+        from mkdocs_print_site_plugin.build_context import BuildContext
+        from mkdocs_print_site_plugin.renderer import Renderer
+        from mkdocs_print_site_plugin.utils import get_css_files, get_theme_name
+
+        # Everything collected during this build.
+        # Replaces the state of any previous build by this plugin instance.
+        self.build = BuildContext()
+
+        # During `mkdocs serve` with 'build_in_background', stop regenerating the print pages
+        # of the previous build before MkDocs cleans the site directory
+        if self.config.get("build_in_background"):
+            from mkdocs_print_site_plugin.background import get_background_builder
+
+            self.build.background = get_background_builder(config["site_dir"])
+            if self.build.background is not None:
+                self.build.background.cancel()
+
         # Check valid table of contents depth
         assert self.config.get("toc_depth") >= 1
         assert self.config.get("toc_depth") <= 6
         assert self.config.get("enumerate_headings_depth") >= 1
         assert self.config.get("enumerate_headings_depth") <= 6
+        assert 0 <= self.config.get("gzip_compression_level") <= 9
+        assert 0 <= self.config.get("brotli_compression_level") <= 11
+        assert self.config.get("large_page_threshold") >= 0
+        assert self.config.get("large_page_mode") in ("inline", "link")
+        assert self.config.get("deduplicate_min_size") >= 1
 
         # If the user does not specify a value for the item
         if self.config.get("toc_title") is None:
@@ -92,85 +144,91 @@ class PrintSitePlugin(BasePlugin):
             logger.warning(msg)
 
         # Get abs path to cover_page_template
-        self.cover_page_template_path = ""
-        if self.config.get("add_cover_page"):
-            if self.config.get("cover_page_template") == "":
-                self.cover_page_template_path = os.path.join(HERE, "templates", "cover_page.tpl")
-            else:
-                self.cover_page_template_path = os.path.join(
-                    os.path.dirname(config.get("config_file_path")),
-                    self.config.get("cover_page_template"),
-                )
-            if not os.path.exists(self.cover_page_template_path):
-                msg = "[print-site-plugin]: Path specified in 'cover_page_template' not found."
-                msg += "\nMake sure to use the URL relative to your mkdocs.yml file."
-                logger.warning(msg)
-                raise FileNotFoundError("File not found: %s" % self.cover_page_template_path)
+        self.build.cover_page_template_path = self._get_cover_page_template_path(self.config, config)
 
         # Get abs path to print_site_banner_template
-        self.banner_template_path = ""
         if self.config.get("add_print_site_banner"):
             if self.config.get("print_site_banner_template") == "":
-                self.banner_template_path = os.path.join(HERE, "templates", "print_site_banner.tpl")
+                self.build.banner_template_path = os.path.join(HERE, "templates", "print_site_banner.tpl")
             else:
-                self.banner_template_path = os.path.join(
+                self.build.banner_template_path = os.path.join(
                     os.path.dirname(config.get("config_file_path")),
                     self.config.get("print_site_banner_template"),
                 )
-            if not os.path.exists(self.banner_template_path):
+            if not os.path.exists(self.build.banner_template_path):
                 msg = "[print-site-plugin]: Path specified in 'print_site_banner_template' not found."
                 msg += "\nMake sure to use the URL relative to your mkdocs.yml file."
                 logger.warning(msg)
-                raise FileNotFoundError("File not found: %s" % self.banner_template_path)
+                raise FileNotFoundError("File not found: %s" % self.build.banner_template_path)
 
         # Add pointer to print-site javascript
         config["extra_javascript"] = ["js/print-site.js"] + config["extra_javascript"]
 
         # Add pointer to theme specific css files
+        self.build.theme_name = get_theme_name(config)
         if self.config.get("include_css"):
-            file = "print-site-%s.css" % get_theme_name(config)
-            if file in os.listdir(os.path.join(HERE, "css")):
+            file = "print-site-%s.css" % self.build.theme_name
+            if file in get_css_files():
                 config["extra_css"] = ["css/%s" % file] + config["extra_css"]
             else:
-                msg = f"[mkdocs-print-site] Theme '{get_theme_name(config)}' not yet supported\n"
+                msg = f"[mkdocs-print-site] Theme '{self.build.theme_name}' not yet supported\n"
                 msg += "which means print margins and page breaks might be off. Feel free to open an issue!"
                 logger.warning(msg)
 
             # Add pointer to print-site css files
             config["extra_css"] = ["css/print-site.css"] + config["extra_css"]
 
-            # Enumeration CSS files
-            self.enum_css_files = []
+        # Enumeration CSS files
+        # Headings are enumerated with generic CSS counter rules,
+        # so this is also required when 'include_css' is disabled
+        if self.config.get("enumerate_headings") and not self.config.get("enumerate_in_html"):
+            self.build.enum_css_files.append("css/print-site-enum-headings.css")
 
-            config["extra_css"] = self.enum_css_files + config["extra_css"]
+        config["extra_css"] = self.build.enum_css_files + config["extra_css"]
+
+        # Compressed copies of the print pages, written alongside the HTML
+        if self.config.get("precompress_print_page"):
+            from mkdocs_print_site_plugin.writer import get_brotli
+
+            self.build.gzip_level = self.config.get("gzip_compression_level")
+            if get_brotli() is not None:
+                self.build.brotli_level = self.config.get("brotli_compression_level")
+            else:
+                msg = "[mkdocs-print-site] Brotli is not installed, so the print page is only compressed with gzip. "
+                msg += "Install it with 'pip install mkdocs-print-site-plugin[brotli]'."
+                logger.info(msg)
+
+        # Keep track of changes between builds.
+        # The changes are part of the manifest, together with the location of each section
+        self.build.cache_dir = os.path.join(os.path.dirname(config.get("config_file_path")), self.config.get("cache_dir"))
+        self.build.write_manifest = bool(self.config.get("add_manifest") or self.config.get("track_changes"))
+
+        # Stylesheets of the print pages without the rules they do not use.
+        # Purged stylesheets are cached, by the hash of the CSS and the vocabulary of the print page
+        if self.config.get("purge_css"):
+            from mkdocs_print_site_plugin.purge import SAFELIST, CssPurger
+
+            self.build.css_purger = CssPurger(
+                safelist=SAFELIST + self.config.get("purge_css_safelist"), cache_dir=self.build.cache_dir
+            )
 
         # Create MkDocs Page and File instances
-        self.print_file = File(
-            path=self.config.get("print_page_basename") + ".md",
-            src_dir="",
-            dest_dir=config["site_dir"],
-            use_directory_urls=config.get("use_directory_urls"),
+        self.build.print_page = self._create_print_page(
+            self.config.get("print_page_basename"), self.config.get("print_page_title"), config
         )
-        self.print_page = Page(
-            title=self.config.get("print_page_title"),
-            file=self.print_file,
-            config=config,
-        )
-        self.print_page.edit_url = None
 
         # Save instance of the print page renderer
-        self.renderer = Renderer(
+        self.build.renderer = Renderer(
             plugin_config=self.config,
             mkdocs_config=config,
-            cover_page_template_path=self.cover_page_template_path,
-            banner_template_path=self.banner_template_path,
-            print_page=self.print_page,
+            cover_page_template_path=self.build.cover_page_template_path,
+            banner_template_path=self.build.banner_template_path,
+            print_page=self.build.print_page,
         )
 
-        # Tracker
-        # to see if context has been extracted from
-        # template context
-        self.context = {}
+        # Additional print pages for other audiences
+        # (additional print pages per section in the navigation are created in the on_nav event)
+        self.build.profile_print_pages = self._create_profile_print_pages(config)
 
         return config
 
@@ -185,15 +243,201 @@ class PrintSitePlugin(BasePlugin):
             return nav
 
         # Save the (order of) pages and sections in the navigation before adding the print page
-        self.renderer.items = nav.items
+        self.build.renderer.items = nav.items
+        for renderer, _ in self.build.profile_print_pages:
+            renderer.items = nav.items
+
+        # Optionally create a separate print page for every top-level section,
+        # f.e. for sub-sites or languages
+        if self.config.get("add_section_print_pages"):
+            self.build.section_print_pages = self._create_section_print_pages(nav.items, config)
+
+        # Optionally use short page keys in the ids and links of the print pages,
+        # the same for all print pages so they can share rewritten pages
+        if self.config.get("compact_anchors"):
+            from mkdocs_print_site_plugin.urls import get_compact_page_keys
+
+            page_keys = get_compact_page_keys([file.url for file in files.documentation_pages()])
+            print_pages = self.build.profile_print_pages + self.build.section_print_pages
+            for renderer in [self.build.renderer] + [renderer for renderer, _ in print_pages]:
+                renderer.page_keys = page_keys
+
+        # Links from the print page of a section to pages in other sections
+        # point to the print page of the entire site
+        for renderer, print_page in self.build.section_print_pages:
+            renderer.page_hrefs = self._get_section_page_hrefs(renderer, print_page, nav)
 
         # Optionally add the print page to the site navigation
         if self.config.get("add_to_navigation"):
-            nav.items.append(self.print_page)
-            nav.pages.append(self.print_page)
+            nav.items.append(self.build.print_page)
+            nav.pages.append(self.build.print_page)
 
         return nav
 
+    def _get_cover_page_template_path(self, plugin_config, config):
+        """
+        Get the absolute path to the cover page template, or "" when there is no cover page.
+        """
+        cover_page_template_path = ""
+        if plugin_config.get("add_cover_page"):
+            if plugin_config.get("cover_page_template") == "":
+                cover_page_template_path = os.path.join(HERE, "templates", "cover_page.tpl")
+            else:
+                cover_page_template_path = os.path.join(
+                    os.path.dirname(config.get("config_file_path")),
+                    plugin_config.get("cover_page_template"),
+                )
+            if not os.path.exists(cover_page_template_path):
+                msg = "[print-site-plugin]: Path specified in 'cover_page_template' not found."
+                msg += "\nMake sure to use the URL relative to your mkdocs.yml file."
+                logger.warning(msg)
+                raise FileNotFoundError("File not found: %s" % cover_page_template_path)
+        return cover_page_template_path
+
+    def _create_profile_print_pages(self, config):
+        """
+        Create a print page for every profile in the 'profiles' option.
+
+        A profile is a variant of the print page, f.e. for a different audience,
+        that can override some of the options of the print page.
+
+        Returns:
+            print_pages (list): List of (Renderer, Page) tuples
+        """
+        from markdown.extensions.toc import slugify
+
+        from mkdocs_print_site_plugin.renderer import Renderer
+
+        print_pages = []
+        basenames = {self.config.get("print_page_basename")}
+        for profile in self.config.get("profiles"):
+            if not isinstance(profile, dict) or not profile.get("name"):
+                raise PluginError("[mkdocs-print-site] Every item in 'profiles' needs a 'name'.")
+            unknown_options = set(profile) - {"name", *PROFILE_OPTIONS}
+            if unknown_options:
+                msg = f"[mkdocs-print-site] Profile '{profile['name']}' has unknown options {sorted(unknown_options)}. "
+                msg += f"Supported are: {', '.join(PROFILE_OPTIONS)}"
+                raise PluginError(msg)
+
+            profile_config = dict(self.config)
+            profile_config["print_page_basename"] = (
+                f"{self.config.get('print_page_basename')}_{slugify(str(profile['name']), '-')}"
+            )
+            profile_config.update({k: v for k, v in profile.items() if k in PROFILE_OPTIONS})
+            if profile_config["print_page_basename"] in basenames:
+                msg = f"[mkdocs-print-site] Profile '{profile['name']}' has the same print page basename "
+                msg += f"'{profile_config['print_page_basename']}' as another print page."
+                raise PluginError(msg)
+            basenames.add(profile_config["print_page_basename"])
+
+            print_page = self._create_print_page(
+                profile_config["print_page_basename"], profile_config["print_page_title"], config
+            )
+            renderer = Renderer(
+                plugin_config=profile_config,
+                mkdocs_config=config,
+                cover_page_template_path=self._get_cover_page_template_path(profile_config, config),
+                banner_template_path=self.build.banner_template_path,
+                print_page=print_page,
+            )
+            print_pages.append((renderer, print_page))
+
+        return print_pages
+
+    def _create_print_page(self, basename, title, config):
+        """
+        Create a MkDocs Page (and File) instance for a print page.
+
+        Print pages are always located at the root of the site.
+        """
+        from mkdocs.structure.files import File
+        from mkdocs.structure.pages import Page
+
+        print_file = File(
+            path=basename + ".md",
+            src_dir="",
+            dest_dir=config["site_dir"],
+            use_directory_urls=config.get("use_directory_urls"),
+        )
+        print_page = Page(
+            title=title,
+            file=print_file,
+            config=config,
+        )
+        print_page.edit_url = None
+        return print_page
+
+    def _create_section_print_pages(self, items, config):
+        """
+        Create a print page for every top-level section in the navigation.
+
+        The print page of a section is named '<print_page_basename>_<section title>'.
+
+        Returns:
+            print_pages (list): List of (Renderer, Page) tuples
+        """
+        from markdown.extensions.toc import slugify
+
+        from mkdocs_print_site_plugin.renderer import Renderer
+
+        print_pages = []
+        basenames = set()
+        for item in items:
+            if not item.is_section:
+                continue
+            basename = f"{self.config.get('print_page_basename')}_{slugify(item.title, '-') or 'section'}"
+            # Make sure every section gets its own print page
+            unique_basename, i = basename, 1
+            while unique_basename in basenames:
+                i += 1
+                unique_basename = f"{basename}-{i}"
+            basenames.add(unique_basename)
+
+            print_page = self._create_print_page(unique_basename, item.title, config)
+            renderer = Renderer(
+                plugin_config=self.config,
+                mkdocs_config=config,
+                cover_page_template_path=self.build.cover_page_template_path,
+                banner_template_path=self.build.banner_template_path,
+                print_page=print_page,
+            )
+            renderer.items = item.children
+            print_pages.append((renderer, print_page))
+
+        return print_pages
+
+    def _get_section_page_hrefs(self, renderer, print_page, nav):
+        """
+        Where the print page of a section links to, for pages outside of the section.
+
+        Pages in the print page of the site are linked there, other pages (f.e. excluded pages) on the site itself.
+
+        Returns:
+            page_hrefs (dict): (href, is_print_page) tuples per page key, see `get_print_page_href()`
+        """
+        from mkdocs_print_site_plugin.exclude import exclude
+        from mkdocs_print_site_plugin.urls import get_page_key
+
+        def get_pages(items):
+            for item in items:
+                if item.is_page:
+                    yield item
+                elif item.is_section:
+                    yield from get_pages(item.children)
+
+        section_pages = list(get_pages(renderer.items))
+        print_page_href = get_relative_url(self.build.print_page.url, print_page.url)
+        page_hrefs = {}
+        for page in nav.pages:
+            if page in section_pages or page == self.build.print_page:
+                continue
+            page_key = get_page_key(page.url, renderer.page_keys)
+            if exclude(page.file.src_path, self.config.get("exclude", [])):
+                page_hrefs[page_key] = (get_relative_url(page.url, print_page.url), False)
+            else:
+                page_hrefs[page_key] = (print_page_href, True)
+        return page_hrefs
+
     def on_page_content(self, html, page, config, files, **kwargs):
         """
         The page_content event is called after the Markdown text is rendered to HTML.
@@ -205,11 +449,13 @@ class PrintSitePlugin(BasePlugin):
             return html
 
         # Save each page HTML *before* a template is applied inside the page class
-        if page != self.print_page:
+        if page != self.build.print_page:
             page.html = html
 
         # Link to the PDF version of the entire site on a page.
         if self.config.get("path_to_pdf") != "":
+            from mkdocs_print_site_plugin.urls import is_external
+
             pdf_url = self.config.get("path_to_pdf")
             if is_external(pdf_url):
                 page.url_to_pdf = pdf_url
@@ -230,7 +476,7 @@ class PrintSitePlugin(BasePlugin):
 
         # Save relative link to print page
         # This can be used to customize a theme and add a print button to each page
-        page.url_to_print_page = self.print_file.url_relative_to(page.file)
+        page.url_to_print_page = self.build.print_file.url_relative_to(page.file)
 
     def on_template_context(self, context, template_name, config, **kwargs):
         """
@@ -255,15 +501,16 @@ class PrintSitePlugin(BasePlugin):
         # we're assuming here all templates have a 404.html template
         # print(f"\nName: {template_name}\nContext: {context.get('extra_css')}")
         if template_name == "404.html":
-            self.context = context
+            # Copy, so the 404 page itself is not affected
+            self.build.template_context = dict(context)
             # Make sure paths are OK
             if config.get("extra_css"):
-                self.context["extra_css"] = [
-                    get_relative_url(f, self.print_page.file.url) for f in config.get("extra_css")
+                self.build.template_context["extra_css"] = [
+                    get_relative_url(f, self.build.print_page.file.url) for f in config.get("extra_css")
                 ]
             if config.get("extra_javascript"):
-                self.context["extra_javascript"] = [
-                    get_relative_url(str(f), self.print_page.file.url) for f in config.get("extra_javascript")
+                self.build.template_context["extra_javascript"] = [
+                    get_relative_url(str(f), self.build.print_page.file.url) for f in config.get("extra_javascript")
                 ]
 
     def on_post_build(self, config, **kwargs):
@@ -275,161 +522,204 @@ class PrintSitePlugin(BasePlugin):
         if not self.config.get("enabled"):
             return
 
-        if len(self.context) == 0:
+        if len(self.build.template_context) == 0:
             msg = "Could not find a template context.\n"
             msg += "Report an issue at https://github.com/timvink/mkdocs-print-site-plugin\n"
-            msg += f"And mention the template you're using: {get_theme_name(config)}"
+            msg += f"And mention the template you're using: {self.build.theme_name}"
             raise PluginError(msg)
 
-        # Add print-site.js
-        js_output_base_path = os.path.join(config["site_dir"], "js")
-        js_file_path = os.path.join(js_output_base_path, "print-site.js")
-        copy_file(os.path.join(os.path.join(HERE, "js"), "print-site.js"), js_file_path)
-
-        if self.config.get("include_css"):
-            # Add print-site.css
-            css_output_base_path = os.path.join(config["site_dir"], "css")
-            css_file_path = os.path.join(css_output_base_path, "print-site.css")
-            copy_file(os.path.join(os.path.join(HERE, "css"), "print-site.css"), css_file_path)
+        from mkdocs_print_site_plugin.utils import get_css_files
+        from mkdocs_print_site_plugin.writer import Writer
+
+        # All output files are written in the background,
+        # overlapping with rendering the print pages
+        with Writer() as writer:
+            # Add print-site.js
+            js_output_base_path = os.path.join(config["site_dir"], "js")
+            js_file_path = os.path.join(js_output_base_path, "print-site.js")
+            writer.copy(os.path.join(os.path.join(HERE, "js"), "print-site.js"), js_file_path)
+
+            if self.config.get("include_css"):
+                # Add print-site.css
+                css_output_base_path = os.path.join(config["site_dir"], "css")
+                css_file_path = os.path.join(css_output_base_path, "print-site.css")
+                writer.copy(os.path.join(os.path.join(HERE, "css"), "print-site.css"), css_file_path)
+
+                # Add theme CSS file
+                css_file = "print-site-%s.css" % self.build.theme_name
+                if css_file in get_css_files():
+                    css_file_path = os.path.join(css_output_base_path, css_file)
+                    writer.copy(os.path.join(os.path.join(HERE, "css"), css_file), css_file_path)
 
             # Add enumeration css
-            for f in self.enum_css_files:
+            for f in self.build.enum_css_files:
                 f = f.replace("/", os.sep)
                 css_file_path = os.path.join(config["site_dir"], f)
-                copy_file(os.path.join(HERE, f), css_file_path)
+                writer.copy(os.path.join(HERE, f), css_file_path)
+
+            # Add search script
+            if self.config.get("add_search_index"):
+                js_file_path = os.path.join(js_output_base_path, "print-site-search.js")
+                writer.copy(os.path.join(os.path.join(HERE, "js"), "print-site-search.js"), js_file_path)
+
+            # During `mkdocs serve`, the previous print pages are shown as stale while they are regenerated
+            background = self.build.background
+            if background is not None and background.mark_stale(self.build.print_page_paths):
+                background.submit(lambda job: self._build_print_pages(config, job=job))
+                return
+
+            self._build_print_pages(config, writer)
+
+    def on_serve(self, server, config, builder, **kwargs):
+        """
+        Event trigger when `mkdocs serve` starts, after the first build.
+
+        With 'build_in_background', later builds regenerate the print pages in the background.
+
+        See https://www.mkdocs.org/user-guide/plugins/#on_serve.
+        """
+        if not self.config.get("enabled") or not self.config.get("build_in_background"):
+            return server
+
+        from mkdocs_print_site_plugin.background import get_background_builder
+
+        background = get_background_builder(config["site_dir"], create=True)
+        for path in self.build.print_page_paths:
+            if os.path.exists(path):
+                background.keep(path, self.build.side_files.get(path, []))
+        return server
+
+    def _build_print_pages(self, config, writer=None, job=None):
+        """
+        Build and write all print pages.
+
+        Args:
+            config: The MkDocs config
+            writer (Writer): Writes the print pages in the background (optional)
+            job (Job): When regenerating the print pages in the background, stops when cancelled (optional)
+        """
+        from mkdocs_print_site_plugin.exclude import exclude
+
+        if writer is None:
+            from mkdocs_print_site_plugin.writer import Writer
+
+            with Writer() as writer:
+                return self._build_print_pages(config, writer, job)
+
+        # The print page and the print pages of the profiles share the same pages,
+        # so every page is rewritten only once
+        sections = None
+        if self.build.profile_print_pages:
+            print_pages = [(self.build.renderer, self.build.print_page)] + self.build.profile_print_pages
+            excluded_pages = [renderer.plugin_config.get("exclude", []) for renderer, _ in print_pages]
+            sections = self.build.renderer.build_sections(
+                is_excluded=lambda src_path: all(exclude(src_path, patterns) for patterns in excluded_pages)
+            )
 
-            # Add theme CSS file
-            css_file = "print-site-%s.css" % get_theme_name(config)
-            if css_file in os.listdir(os.path.join(HERE, "css")):
-                css_file_path = os.path.join(css_output_base_path, css_file)
-                copy_file(os.path.join(os.path.join(HERE, "css"), css_file), css_file_path)
+        # All print pages share the static assets and the template context
+        print_pages = [(self.build.renderer, self.build.print_page, sections)]
+        print_pages += [(renderer, print_page, sections) for renderer, print_page in self.build.profile_print_pages]
+        print_pages += [(renderer, print_page, None) for renderer, print_page in self.build.section_print_pages]
+        # The print pages are built one by one: page transforms call into other plugins,
+        # which are not known to be thread-safe. Writing the files is done in the background by the writer.
+        for renderer, print_page, sections in print_pages:
+            self._build_print_page(renderer, print_page, config, sections, writer, job)
+
+    def _build_print_page(self, renderer, print_page, config, sections=None, writer=None, job=None):
+        """
+        Combine the pages, apply the theme and write a print page.
+
+        Args:
+            renderer (Renderer): Renderer with the navigation items of the print page
+            print_page (Page): The MkDocs page of the print page
+            config: The MkDocs config
+            sections (list): Already rewritten pages, shared with other print pages (optional)
+            writer (Writer): Writes the print page in the background (optional)
+            job (Job): When regenerating the print page in the background, stops when cancelled (optional)
+        """
+        from mkdocs.structure.nav import Navigation
+
+        from mkdocs_print_site_plugin.changes import get_cache_path, get_changes, get_digests, load_digests, save_digests
+        from mkdocs_print_site_plugin.document import ContentPlaceholder
+        from mkdocs_print_site_plugin.epub import get_epub_path, write_epub
+        from mkdocs_print_site_plugin.manifest import build_manifest, get_manifest_path, write_manifest
+        from mkdocs_print_site_plugin.minify import Minifier, minify_document
+        from mkdocs_print_site_plugin.purge import get_document_vocabulary
+        from mkdocs_print_site_plugin.search import build_search_index, get_search_index_path, search_index_to_json
+        from mkdocs_print_site_plugin.transforms import apply_page_transforms, get_page_transforms
+        from mkdocs_print_site_plugin.urls import fix_protocol_relative_urls, remove_lazy_loading
+        from mkdocs_print_site_plugin.utils import remove_elements_by_class
+        from mkdocs_print_site_plugin.writer import DIGEST_META, get_digest, write_file
 
         # Combine the HTML of all pages present in the navigation
-        self.print_page.content, self.print_page.toc = self.renderer.write_combined()
+        document = renderer.build_document(sections)
+        print_page.toc = document.toc
+        if job is not None:
+            job.check()
+
+        # Compatibility with other plugins, that change pages in events that are not run for the print page
+        transforms = get_page_transforms(document, print_page, config)
+        apply_page_transforms(document, transforms, cache=self.build.transform_cache)
 
         # Get the info for MkDocs to be able to apply a theme template on our print page
         env = config["theme"].get_env()
         # env.list_templates()
         template = env.get_template("main.html")
-        self.context["page"] = self.print_page
-        # Render the theme template for the print page
-        html = template.render(self.context)
-
-        # Remove lazy loading attributes from images
-        # https://regex101.com/r/HVpKPs/1
-        html = re.sub(r"(\<img.+)(loading=\"lazy\")", r"\1", html)
-
-        # Compatiblity with mkdocs-chart-plugin
-        # As this plugin adds some javascript to every page
-        # It should be included in the print site also
-        if config.get("plugins", {}).get("charts"):
-            html = config.get("plugins", {}).get("charts").add_javascript_variables(html, self.print_page, config)
-
-        # Compatibility with mkdocs-drawio
-        # As this plugin adds renderer html for every drawio diagram
-        # referenced in your markdown files. This rendering happens
-        # in the on_post_page event, which is skipped by this plugin
-        # therefore we need to manual execute the drawio plugin renderer here.
-        if config.get("plugins", {}).get("drawio"):
-            html = config.get("plugins", {}).get("drawio").render_drawio_diagrams(html, self.print_page)
-
-        # Compatibility with mkdocs-autorefs
-        # As this plugin processes cross-references in the on_env event, 
-        # which happens after the print page is generated, it's necessary to 
-        # manually execute the autorefs fix_refs function here.
-        autorefs_plugin = config.get("plugins", {}).get("mkdocs-autorefs") or config.get("plugins", {}).get("autorefs")
-        if autorefs_plugin:
-            from mkdocs_autorefs._internal.references import fix_refs
-            
-            # First, extract all available anchors from the HTML
-            anchor_pattern = r'(?:id="([^"]+)"|name="([^"]+)")'
-            anchor_matches = regex_module.findall(anchor_pattern, html, regex_module.IGNORECASE)
-            available_anchors = set()
-            for match in anchor_matches:
-                # Each match is a tuple (id_value, name_value), one is empty
-                anchor = match[0] or match[1]
-                if anchor:
-                    available_anchors.add(anchor)
-            
-            # Create custom url_mapper that converts cross-references to internal anchors
-            def print_page_url_mapper(identifier, from_url=None):
-                """
-                Custom URL mapper for print page that converts all cross-references 
-                to internal anchors in the same page instead of external URLs.
-                """
-                try:
-                    # Get the original URL from autorefs
-                    original_url, title = autorefs_plugin.get_item_url(identifier, from_url)
-                    
-                    # Check if identifier directly exists as anchor
-                    if identifier in available_anchors:
-                        return f"#{identifier}", title
-                    
-                    # Extract anchor part from URL if it exists
-                    if '#' in original_url:
-                        anchor = original_url.split('#')[-1]
-                        
-                        # Check if this anchor actually exists in the HTML
-                        if anchor in available_anchors:
-                            return f"#{anchor}", title
-                        else:
-                            # Try to find a similar anchor (case-insensitive, partial match)
-                            anchor_lower = anchor.lower()
-                            for available_anchor in available_anchors:
-                                if (available_anchor.lower() == anchor_lower or 
-                                    anchor_lower in available_anchor.lower() or 
-                                    available_anchor.lower() in anchor_lower):
-                                    return f"#{available_anchor}", title
-                            
-                            return f"#{anchor}", title  # Return original anchor anyway
-                    else:
-                        # If no anchor in original URL, try fuzzy matching with identifier
-                        identifier_lower = identifier.lower()
-                        for available_anchor in available_anchors:
-                            if (available_anchor.lower() == identifier_lower or 
-                                identifier_lower in available_anchor.lower() or 
-                                available_anchor.lower() in identifier_lower):
-                                return f"#{available_anchor}", title
-                        
-                        return f"#{identifier}", title  # Return anyway, might work
-                        
-                except Exception as e:
-                    # Fallback: check if identifier exists as anchor or find fuzzy match
-                    if identifier in available_anchors:
-                        return f"#{identifier}", identifier
-                    else:
-                        # Try fuzzy matching as fallback
-                        identifier_lower = identifier.lower()
-                        for available_anchor in available_anchors:
-                            if (available_anchor.lower() == identifier_lower or 
-                                identifier_lower in available_anchor.lower()):
-                                return f"#{available_anchor}", identifier
-                        return f"#{identifier}", identifier  # Return anyway as last fallback
-            
-            # Apply cross-references to the HTML
-            html, unmapped = fix_refs(
-                html,
-                print_page_url_mapper,
-                link_titles=autorefs_plugin._link_titles,
-                strip_title_tags=autorefs_plugin._strip_title_tags,
-                _legacy_refs=autorefs_plugin.legacy_refs,
+        context = dict(self.build.template_context, page=print_page)
+        if self.config.get("slim_theme_context"):
+            # The print page does not show the site navigation, so do not render it.
+            # Keep the homepage, which themes link to from the logo.
+            homepage = getattr(context.get("nav"), "homepage", None)
+            context["nav"] = Navigation([], [homepage] if homepage else [])
+            context["pages"] = []
+
+        # Render the theme template for the print page around a placeholder,
+        # so that the (large) content is never part of operations on the theme HTML
+        print_page.content = ContentPlaceholder(document)
+        html = template.render(context)
+        if html.count(ContentPlaceholder.MARKER) == 1:
+            head, tail = html.split(ContentPlaceholder.MARKER)
+            content = list(document.iter_html())
+        else:
+            # The theme did something else with the page content than including it once
+            logger.warning(
+                f"[mkdocs-print-site] The theme does not include the content of print page '{print_page.file.src_uri}' "
+                "exactly once. The print page is rendered without the placeholder, so the manifest has no byte offsets "
+                "and the content is not minified."
             )
-            if unmapped:
-                logger.warning(f"[mkdocs-print-site] Unmapped autorefs: {[ref for ref, _ in unmapped]}")
+            print_page.content = document.to_html()
+            head, tail = template.render(context).split("</head>", 1)
+            head, tail = head + "</head>", tail
+            content = []
+
+        # Remove lazy loading attributes from images in the theme
+        # (the content was already done when rewriting the pages).
+        # With 'eager_images' disabled, print-site.js starts loading the remaining images when printing.
+        if self.config.get("eager_images"):
+            head = remove_lazy_loading(head)
+            tail = remove_lazy_loading(tail)
+
+        # Remove the navigation elements of the theme
+        # (print-site.js hides them as well, for when the theme is not rendered with a slim context)
+        if self.config.get("slim_theme_context"):
+            head = remove_elements_by_class(head, THEME_NAVIGATION_CLASSES.get(self.build.theme_name, []))
+
+        # Changes of other plugins to the theme HTML (f.e. scripts)
+        for transform in transforms:
+            head, tail = transform.finalize(head, tail)
 
         # Compatibility with https://github.com/g-provost/lightgallery-markdown
         # This plugin insert link hrefs with double dashes, f.e.
         # <link href="//assets/css/somecss.css">
         # Details https://github.com/timvink/mkdocs-print-site-plugin/issues/68
-        htmls = html.split("</head>")
         base_url = "../" if config.get("use_directory_urls") else ""
-        htmls[0] = htmls[0].replace('href="//', f'href="{base_url}')
-        htmls[0] = htmls[0].replace('src="//', f'src="{base_url}')
-        html = "</head>".join(htmls)
+        head = fix_protocol_relative_urls(head, base_url)
 
         # Determine calls to required javascript functions
         js_calls = "remove_material_navigation();"
         js_calls += "remove_mkdocs_theme_navigation();"
+        if not self.config.get("eager_images"):
+            js_calls += "load_images_when_printing();"
         if self.config.get("add_table_of_contents"):
             js_calls += "generate_toc();"
 
@@ -444,7 +734,188 @@ class PrintSitePlugin(BasePlugin):
         """
             % js_calls
         )
-        html = html.replace("</head>", print_site_js + "</head>")
+        head = head.replace("</head>", print_site_js + "</head>")
+
+        # Add search, with a search index of the print page
+        path = print_page.file.abs_dest_path
+        search_index = None
+        if self.config.get("add_search_index"):
+            search_index_path = get_search_index_path(path)
+            search_index = search_index_to_json(build_search_index(document))
+
+            search_js = '<script src="%s" data-index="%s" defer></script>' % (
+                get_relative_url("js/print-site-search.js", print_page.file.url),
+                os.path.basename(search_index_path),
+            )
+            head = head.replace("</head>", search_js + "</head>", 1)
+
+        # Optionally link copies of the stylesheets without the rules the print page does not use.
+        # The stylesheets of the plugin itself are small and written in the background, so they are kept.
+        purged_css_files = []
+        if self.build.css_purger is not None:
+            own_css_files = ["css/print-site.css", f"css/print-site-{self.build.theme_name}.css"]
+            own_css_files += self.build.enum_css_files
+            head, purged_css_files = self.build.css_purger.purge_links(
+                head,
+                get_document_vocabulary(document, head, tail),
+                base_dir=os.path.dirname(path),
+                site_dir=config["site_dir"],
+                keep=[os.path.join(config["site_dir"], f.replace("/", os.sep)) for f in own_css_files],
+            )
+
+        # Optionally minify the print page, one page at a time
+        if self.config.get("minify_print_page"):
+            minifier = Minifier(remove_headerlinks=self.config.get("minify_remove_headerlinks"))
+            head = minifier.feed(head)
+            if content:
+                minify_document(document, minifier)
+                content = list(document.iter_html())
+            tail = minifier.feed(tail)
+            reduction = 100 * (1 - minifier.size_after / minifier.size_before) if minifier.size_before else 0
+            logger.info(
+                f"[mkdocs-print-site] Minified print page '{print_page.file.src_uri}' "
+                f"from {minifier.size_before / 1e3:.1f} kB to {minifier.size_after / 1e3:.1f} kB ({reduction:.0f}% smaller)"
+            )
+
+        # Add a digest of the print page, so downstream tools (f.e. PDF generation)
+        # can skip print pages that did not change.
+        # It covers the entire print page, except the meta tag itself.
+        digest, size = get_digest([head, *content, tail])
+        digest_meta = DIGEST_META.format(digest)
+        head = head.replace("</head>", digest_meta + "</head>", 1)
+        size += len(digest_meta.encode("utf-8"))
 
-        # Write the print_page file to the output folder
-        write_file(html.encode("utf-8", errors="xmlcharrefreplace"), self.print_page.file.abs_dest_path)
+        # Write the print_page file and its side files to the output folder
+
+        def write_files():
+            with job.writing() if job is not None else contextlib.nullcontext():
+                _write_files()
+
+        def _write_files():
+            if search_index is not None:
+                write_file(search_index_path, search_index)
+
+            # Purged stylesheets are named by their digest, so existing files are up to date
+            for css_path, css in purged_css_files:
+                if not os.path.exists(css_path):
+                    write_file(css_path, css)
+
+            spans, content_span = self._write_print_page(head, document if content else None, tail, path, size)
+
+            digests = changes = None
+            if self.config.get("track_changes"):
+                digests = get_digests(document)
+                cache_path = get_cache_path(self.build.cache_dir, print_page.file.src_uri)
+                changes = get_changes(document, digests, load_digests(cache_path))
+
+            if self.build.write_manifest:
+                manifest = build_manifest(
+                    document, spans, print_page.file.url, content_span, digest, digests=digests, changes=changes
+                )
+                write_manifest(manifest, get_manifest_path(path))
+
+            if digests is not None:
+                save_digests(document, digests, cache_path)
+
+            if self.config.get("add_epub"):
+                write_print_page_epub()
+
+            # The print page and its side files are shown while the print page is regenerated,
+            # during `mkdocs serve` with 'build_in_background'
+            side_files = []
+            if search_index is not None:
+                side_files.append(search_index_path)
+            if self.build.write_manifest:
+                side_files.append(get_manifest_path(path))
+            if self.config.get("add_epub"):
+                side_files.append(get_epub_path(path))
+            if self.build.gzip_level is not None:
+                side_files.append(path + ".gz")
+            if self.build.brotli_level is not None:
+                side_files.append(path + ".br")
+            side_files.extend(css_path for css_path, _ in purged_css_files)
+            self.build.side_files[path] = side_files
+            if self.build.background is not None:
+                self.build.background.keep(path, self.build.side_files[path])
+
+        def write_print_page_epub():
+            title = config.get("site_name")
+            if print_page is not self.build.print_page:
+                title = f"{title} - {print_page.title}"
+            locale = getattr(config["theme"], "locale", None) or config["theme"].get("language") or "en"
+            # The e-book was last modified when its newest page was
+            mtimes = []
+            for page_node in document.pages():
+                page_path = os.path.join(config["docs_dir"], page_node.src_path or "")
+                if os.path.isfile(page_path):
+                    mtimes.append(os.path.getmtime(page_path))
+            n_chapters = write_epub(
+                document,
+                get_epub_path(path),
+                title,
+                base_dir=os.path.dirname(path),
+                language=str(locale).replace("_", "-"),
+                author=config.get("site_author") or "",
+                description=config.get("site_description") or "",
+                base_url=urljoin(config["site_url"], print_page.url) if config.get("site_url") else "",
+                site_dir=config["site_dir"],
+                site_url=config.get("site_url") or "",
+                modified=max(mtimes, default=None),
+            )
+            logger.info(
+                f"[mkdocs-print-site] Wrote EPUB of print page '{print_page.file.src_uri}' with {n_chapters} chapters"
+            )
+
+        if writer is None:
+            write_files()
+        else:
+            writer.submit(write_files)
+
+    def _write_print_page(self, head, document, tail, path, size=None):
+        """
+        Write the print page file to the output folder.
+
+        The content is encoded and written one page at a time,
+        while keeping track of where each page starts and ends in the file.
+        With 'precompress_print_page', compressed copies are written at the same time.
+        When the file is already up to date (same size and digest), nothing is written.
+
+        Args:
+            head (str): The theme HTML before the content
+            document (PrintDocument): The content, or None when the content is already part of head
+            tail (str): The theme HTML after the content
+            path (str): Path of the output file
+            size (int): Expected size of the output file in bytes, used to detect an up to date file (optional)
+
+        Returns:
+            spans (dict): Byte offsets (start, end of own html, end including children) per node
+            content_span (tuple): Byte offsets of the content
+        """
+        from mkdocs_print_site_plugin.writer import CompressingFile, DiscardingFile, is_unchanged
+
+        head = head.encode("utf-8", errors="xmlcharrefreplace")
+        copies = [path + ".gz"] if self.build.gzip_level is not None else []
+        copies += [path + ".br"] if self.build.brotli_level is not None else []
+        if size is not None and is_unchanged(path, head, size) and all(os.path.exists(p) for p in copies):
+            logger.debug(f"[mkdocs-print-site] {path} is up to date")
+            output = DiscardingFile()
+        else:
+            output = CompressingFile(path, gzip_level=self.build.gzip_level, brotli_level=self.build.brotli_level)
+
+        spans = {}
+        content_span = None
+        with output as f:
+            offset = f.write(head)
+            if document is not None:
+                content_start = offset
+                for node, chunk, is_closing in document.iter_events():
+                    end = offset + f.write(chunk.encode("utf-8", errors="xmlcharrefreplace"))
+                    if node is not None and not is_closing:
+                        spans[node] = (offset, end, end)
+                    elif node is not None:
+                        spans[node] = (spans[node][0], spans[node][1], end)
+                    offset = end
+                content_span = (content_start, offset)
+            f.write(tail.encode("utf-8", errors="xmlcharrefreplace"))
+
+        return spans or None, content_span
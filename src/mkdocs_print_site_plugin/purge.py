@@ -0,0 +1,371 @@
+"""
+Remove unused rules from the stylesheets of the print page.
+
+The print page links the full CSS of the theme, and browsers (and headless PDF engines) match every
+selector against the very large DOM of the print page. The `CssPurger` writes a copy of every local
+stylesheet, without the style rules whose selectors need a tag, class or id that is not in the print page.
+
+The vocabulary of tags, classes and ids is collected per page (see `PrintSection.vocabulary`), so pages
+shared between print pages are only scanned once. The parsed stylesheets are cached by the hash of the CSS,
+and the purged stylesheets are cached in the cache directory, by the hash of the CSS and the vocabulary.
+
+Purging is conservative: selectors that cannot be checked (attribute values, :not(), :is(), escaped
+names, etc) are considered used, and custom elements (often created by scripts) are never required.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from mkdocs_print_site_plugin.urls import is_external
+
+logger = logging.getLogger("mkdocs.plugins")
+
+TAG_REGEX = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)")
+CLASS_ATTRIBUTE_REGEX = re.compile(r"""\sclass=(?:"([^"]*)"|'([^']*)')""", flags=re.IGNORECASE)
+ID_ATTRIBUTE_REGEX = re.compile(r"""\sid=(?:"([^"]*)"|'([^']*)')""", flags=re.IGNORECASE)
+
+STYLESHEET_LINK_REGEX = re.compile(r"<link\b[^>]*>", flags=re.IGNORECASE)
+STYLESHEET_REL_REGEX = re.compile(r"""\srel=["']?stylesheet\b""", flags=re.IGNORECASE)
+HREF_REGEX = re.compile(r"""(\shref=)(["'])([^"']*)\2""", flags=re.IGNORECASE)
+
+# At-rules with nested rules, that can be purged as well. Other at-rules (@font-face, @keyframes, @page etc)
+# are kept as they are
+GROUP_AT_RULES = {"@media", "@supports", "@container", "@layer", "@document", "@-moz-document"}
+
+# Whitespace and comments between rules
+SEPARATOR_REGEX = re.compile(r"(?:\s+|/\*.*?\*/)+", flags=re.DOTALL)
+
+SELECTOR_STRING_REGEX = re.compile(r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'""")
+SELECTOR_ATTRIBUTE_REGEX = re.compile(r"\[[^\]]*\]")
+# Functional pseudo-classes like :not(.a) or :is(.a, .b), innermost first
+SELECTOR_FUNCTION_REGEX = re.compile(r":{1,2}[\w-]+\([^()]*\)")
+SELECTOR_CLASS_REGEX = re.compile(r"\.([\w-]+)")
+SELECTOR_ID_REGEX = re.compile(r"#([\w-]+)")
+SELECTOR_TAG_REGEX = re.compile(r"(?:^|[\s>+~])([a-zA-Z][\w-]*)")
+
+# Classes and ids that themes and common extensions add with scripts, kept by default
+SAFELIST = [
+    r"^md-(annotation|clipboard|code__|tooltip|typeset__(scrollwrap|table))",
+    r"^(js|no-js|focus-visible)$",
+    r"^(katex|MathJax|mjx)",
+]
+
+# Tags, classes and ids that are required by a selector
+Requirements = Tuple[FrozenSet[str], FrozenSet[str], FrozenSet[str]]
+
+
+class Vocabulary:
+    """
+    The tags, classes and ids used in HTML.
+    """
+
+    def __init__(self, html: str = ""):
+        """
+        Inits the class.
+
+        Args:
+            html (str): HTML to collect the vocabulary of (optional)
+        """
+        self.tags = {tag.lower() for tag in TAG_REGEX.findall(html)}
+        self.classes = set()
+        for m in CLASS_ATTRIBUTE_REGEX.finditer(html):
+            self.classes.update((m.group(1) if m.group(1) is not None else m.group(2)).split())
+        self.ids = {m.group(1) if m.group(1) is not None else m.group(2) for m in ID_ATTRIBUTE_REGEX.finditer(html)}
+
+    def update(self, other: "Vocabulary") -> None:
+        """
+        Add the vocabulary of other HTML.
+        """
+        self.tags.update(other.tags)
+        self.classes.update(other.classes)
+        self.ids.update(other.ids)
+
+    @property
+    def digest(self) -> str:
+        """
+        Hash of the vocabulary.
+        """
+        sha1 = hashlib.sha1()
+        for names in (self.tags, self.classes, self.ids):
+            sha1.update("\n".join(sorted(names)).encode("utf-8") + b"\0")
+        return sha1.hexdigest()
+
+
+def get_document_vocabulary(document, *html: str) -> Vocabulary:
+    """
+    The vocabulary of the content of a print page (a `PrintDocument`), and other HTML (f.e. the theme).
+    """
+    vocabulary = Vocabulary(document.header_html + document.footer_html + "".join(html))
+    for node in document.walk():
+        vocabulary.update(node.vocabulary)
+    return vocabulary
+
+
+def get_requirements(selector: str) -> Optional[Requirements]:
+    """
+    The tags, classes and ids that must be present for a selector to match.
+
+    Examples
+        get_requirements('.md-typeset a:hover') --> ({'a'}, {'md-typeset'}, set())
+
+    Returns:
+        requirements (tuple): Sets of tags, classes and ids, or None when the selector cannot be checked
+    """
+    if "\\" in selector or "|" in selector:
+        return None
+    selector = SELECTOR_STRING_REGEX.sub("", selector)
+    selector = SELECTOR_ATTRIBUTE_REGEX.sub("[]", selector)
+    n = 1
+    while n:
+        selector, n = SELECTOR_FUNCTION_REGEX.subn("", selector)
+    tags = {tag.lower() for tag in SELECTOR_TAG_REGEX.findall(selector.strip())}
+    # Custom elements are often created by scripts
+    tags = {tag for tag in tags if "-" not in tag}
+    classes = SELECTOR_CLASS_REGEX.findall(selector)
+    ids = SELECTOR_ID_REGEX.findall(selector)
+    return frozenset(tags), frozenset(classes), frozenset(ids)
+
+
+def _find(css: str, position: int, chars: str) -> int:
+    """
+    Position of the first of the given characters, skipping strings, comments and parentheses.
+    Returns the length of the CSS when not found.
+    """
+    depth = 0
+    while position < len(css):
+        char = css[position]
+        if char in "\"'":
+            end = css.find(char, position + 1)
+            while end != -1 and css[end - 1] == "\\":
+                end = css.find(char, end + 1)
+            position = len(css) if end == -1 else end + 1
+            continue
+        if css.startswith("/*", position):
+            end = css.find("*/", position + 2)
+            position = len(css) if end == -1 else end + 2
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0 and char in chars:
+            return position
+        position += 1
+    return position
+
+
+def _find_block_end(css: str, position: int) -> int:
+    """
+    Position after the '}' that closes the block starting at the given '{'.
+    """
+    depth = 0
+    while position < len(css):
+        position = _find(css, position, "{}")
+        if position >= len(css):
+            break
+        depth += 1 if css[position] == "{" else -1
+        position += 1
+        if depth == 0:
+            break
+    return position
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    selectors = []
+    start = 0
+    while start <= len(prelude):
+        end = _find(prelude, start, ",")
+        selectors.append(prelude[start:end].strip())
+        start = end + 1
+    return [selector for selector in selectors if selector]
+
+
+def parse_stylesheet(css: str, start: int = 0, end: Optional[int] = None) -> List[Tuple]:
+    """
+    Split a stylesheet into rules, and determine what the selectors of style rules require.
+
+    Returns:
+        rules (list): Rules in order, either ('raw', text), ('style', [(selector, requirements)], block)
+            or ('group', prelude, rules)
+    """
+    end = len(css) if end is None else end
+    rules: List[Tuple] = []
+    position = start
+    while position < end:
+        # Skip whitespace and comments between rules
+        m = SEPARATOR_REGEX.match(css, position, end)
+        if m:
+            position = m.end()
+            continue
+        stop = min(_find(css, position, "{;}"), end)
+        prelude = css[position:stop].strip()
+        if stop >= end or css[stop] == "}":
+            # Stray text (f.e. an unclosed rule), keep it
+            if prelude:
+                rules.append(("raw", css[position:stop]))
+            position = stop + 1
+            continue
+        if css[stop] == ";":
+            # Statements, like @import and @charset
+            rules.append(("raw", css[position : stop + 1]))
+            position = stop + 1
+            continue
+
+        block_end = min(_find_block_end(css, stop), end)
+        at_keyword = prelude.split(None, 1)[0].lower() if prelude.startswith("@") else None
+        if at_keyword in GROUP_AT_RULES:
+            rules.append(("group", prelude, parse_stylesheet(css, stop + 1, block_end - 1)))
+        elif at_keyword is not None or "{" in css[stop + 1 : block_end - 1]:
+            # Other at-rules and nested style rules are kept as they are
+            rules.append(("raw", css[position:block_end]))
+        else:
+            selectors = [(selector, get_requirements(selector)) for selector in _split_selectors(prelude)]
+            rules.append(("style", selectors, css[stop:block_end]))
+        position = block_end
+    return rules
+
+
+class CssPurger:
+    """
+    Writes copies of stylesheets without the rules that are not used by a print page.
+
+    Usage:
+        purger = CssPurger(safelist=SAFELIST)
+        head, files = purger.purge_links(head, vocabulary, base_dir='site/print_page', site_dir='site')
+    """
+
+    def __init__(self, safelist: Iterable[str] = (), cache_dir: str = ""):
+        """
+        Inits the class.
+
+        Args:
+            safelist (list): Regular expressions of classes and ids to keep, f.e. classes added by scripts
+            cache_dir (str): Directory to cache purged stylesheets in, by the hash of the CSS and vocabulary (optional)
+        """
+        self.safelist = [re.compile(pattern) for pattern in safelist]
+        self.cache_dir = cache_dir
+        # Parsed stylesheets, by the hash of the CSS
+        self._parsed: Dict[str, List[Tuple]] = {}
+
+    def _is_safelisted(self, name: str) -> bool:
+        return any(pattern.search(name) for pattern in self.safelist)
+
+    def _is_used(self, requirements: Optional[Requirements], vocabulary: Vocabulary) -> bool:
+        if requirements is None:
+            return True
+        tags, classes, ids = requirements
+        return (
+            tags <= vocabulary.tags
+            and all(name in vocabulary.classes or self._is_safelisted(name) for name in classes)
+            and all(name in vocabulary.ids or self._is_safelisted(name) for name in ids)
+        )
+
+    def _serialize(self, rules: List[Tuple], vocabulary: Vocabulary) -> str:
+        parts = []
+        for rule in rules:
+            if rule[0] == "raw":
+                parts.append(rule[1])
+            elif rule[0] == "style":
+                selectors = [selector for selector, requirements in rule[1] if self._is_used(requirements, vocabulary)]
+                if selectors:
+                    parts.append(",".join(selectors) + rule[2])
+            else:
+                content = self._serialize(rule[2], vocabulary)
+                if content:
+                    parts.append(f"{rule[1]}{{{content}}}")
+        return "\n".join(parts)
+
+    def purge(self, css: str, vocabulary: Vocabulary) -> str:
+        """
+        Returns the CSS without the style rules that are not used.
+        """
+        css_hash = hashlib.sha1(css.encode("utf-8")).hexdigest()
+        if css_hash not in self._parsed:
+            self._parsed[css_hash] = parse_stylesheet(css)
+        return self._serialize(self._parsed[css_hash], vocabulary)
+
+    def purge_file(self, path: str, vocabulary: Vocabulary) -> Tuple[str, str]:
+        """
+        Purge a stylesheet, using the cache directory.
+
+        Returns:
+            purged_css (str): The CSS without unused rules
+            digest (str): Hash of the CSS, the vocabulary and the safelist, that identifies the purged CSS
+        """
+        with open(path, encoding="utf-8") as f:
+            css = f.read()
+        sha1 = hashlib.sha1(css.encode("utf-8"))
+        sha1.update(vocabulary.digest.encode("utf-8"))
+        sha1.update("\n".join(pattern.pattern for pattern in self.safelist).encode("utf-8"))
+        digest = sha1.hexdigest()
+
+        cache_path = os.path.join(self.cache_dir, "purged-css", f"{digest}.css") if self.cache_dir else ""
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                return f.read(), digest
+
+        purged_css = self.purge(css, vocabulary)
+        if cache_path:
+            # Print pages can purge the same stylesheet at the same time, never read a partial file
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(purged_css)
+            os.replace(temp_path, cache_path)
+        return purged_css, digest
+
+    def purge_links(
+        self, head: str, vocabulary: Vocabulary, base_dir: str, site_dir: str, keep: Iterable[str] = ()
+    ) -> Tuple[str, List]:
+        """
+        Point the stylesheet links in the theme HTML of a print page to purged copies.
+
+        The purged copy of a stylesheet is placed next to it, so relative urls (f.e. of fonts) keep working.
+
+        Args:
+            head (str): The theme HTML before the content of the print page
+            vocabulary (Vocabulary): The vocabulary of the print page
+            base_dir (str): Directory of the print page, that links are relative to
+            site_dir (str): The site directory, only stylesheets in this directory are purged
+            keep (list): Paths of stylesheets to keep as they are (optional)
+
+        Returns:
+            head (str): The theme HTML with links to the purged stylesheets
+            files (list): The purged stylesheets to write, as (path, css) tuples
+        """
+        files = []
+        site_dir = os.path.abspath(site_dir)
+        keep = {os.path.abspath(path) for path in keep}
+
+        def purge_link(m: re.Match) -> str:
+            link = m.group()
+            href_match = HREF_REGEX.search(link)
+            if not STYLESHEET_REL_REGEX.search(link) or not href_match:
+                return link
+            href = href_match.group(3)
+            if is_external(href) or urlparse(href).scheme or href.startswith("//") or not href:
+                return link
+            path = os.path.abspath(os.path.join(base_dir, unquote(urlparse(href).path)))
+            if path in keep or not path.startswith(site_dir + os.sep) or not os.path.isfile(path):
+                return link
+
+            try:
+                purged_css, digest = self.purge_file(path, vocabulary)
+            except (OSError, UnicodeDecodeError) as error:
+                logger.warning(f"[mkdocs-print-site] Could not purge stylesheet '{href}': {error}")
+                return link
+            name = f"{os.path.splitext(os.path.basename(path))[0]}.print-{digest[:12]}.css"
+            files.append((os.path.join(os.path.dirname(path), name), purged_css))
+
+            new_href = urlparse(href).path.rsplit("/", 1)
+            new_href = f"{new_href[0]}/{name}" if len(new_href) == 2 else name
+            start, end = href_match.span(3)
+            return link[:start] + new_href + link[end:]
+
+        head = STYLESHEET_LINK_REGEX.sub(purge_link, head)
+        return head, files
@@ -0,0 +1,276 @@
+"""
+Rebuild the print page from an already built site.
+
+Changing an option of the print page (f.e. `toc_depth`, the cover page or `exclude`) normally requires
+a full `mkdocs build`, which renders the markdown of every page again. This command only loads the
+configuration and the navigation, takes the HTML, title and tags of every page from the built site directory,
+and runs the same renderer as the plugin to write the print page(s). The markdown of the pages is not read.
+The pages are read and rewritten in parallel processes.
+
+Usage:
+    mkdocs-print-site-rebuild [-f mkdocs.yml] [-d site] [-j 8]
+"""
+
+import argparse
+import functools
+import html
+import logging
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from mkdocs_print_site_plugin.utils import get_closing_tag
+
+logger = logging.getLogger("mkdocs.plugins")
+
+# Elements that contain the page content in the supported themes, most specific first
+ARTICLE_CONTAINERS = [
+    # mkdocs-material
+    ("article", re.compile(r"<article\b[^>]*\bclass=\"[^\"]*\bmd-content__inner\b[^>]*>")),
+    # readthedocs
+    ("div", re.compile(r"<div\b[^>]*\bitemprop=\"articleBody\"[^>]*>")),
+    # mkdocs
+    ("div", re.compile(r"<div\b[^>]*\brole=\"main\"[^>]*>")),
+    # Other themes
+    ("main", re.compile(r"<main\b[^>]*>")),
+    ("article", re.compile(r"<article\b[^>]*>")),
+]
+
+# Elements that mkdocs-material adds around the page content.
+# Tags are left out as well, as the plugin adds them itself.
+MATERIAL_DECORATIONS_REGEX = re.compile(
+    r"<a\b[^>]*\bclass=\"md-content__button\b[^>]*>.*?</a>"
+    r"|<nav\b[^>]*\bclass=\"md-tags\"[^>]*>.*?</nav>"
+    r"|<aside\b[^>]*\bclass=\"md-source-file\"[^>]*>.*?</aside>"
+    r"|<form\b[^>]*\bclass=\"md-feedback\"[^>]*>.*?</form>",
+    flags=re.DOTALL,
+)
+
+TITLE_REGEX = re.compile(r"<title>(.*?)</title>", flags=re.DOTALL | re.IGNORECASE)
+H1_REGEX = re.compile(r"<h1\b[^>]*>(.*?)</h1>", flags=re.DOTALL | re.IGNORECASE)
+HEADERLINK_REGEX = re.compile(r"<a\b[^>]*\bclass=\"headerlink\"[^>]*>.*?</a>", flags=re.DOTALL)
+TAGS_REGEX = re.compile(r"<nav\b[^>]*\bclass=\"md-tags\"[^>]*>(.*?)</nav>", flags=re.DOTALL)
+TAG_REGEX = re.compile(r"<(span|a)\b[^>]*\bclass=\"md-tag\b[^>]*>(.*?)</\1>", flags=re.DOTALL)
+HTML_TAG_REGEX = re.compile(r"<[^>]*>")
+
+# mkdocs-material adds a title to pages without a h1 (headings rendered from markdown always have an id)
+THEME_TITLE_REGEX = re.compile(r"^<h1>[^<]*</h1>$")
+
+
+def get_article_html(page_html: str) -> Optional[str]:
+    """
+    The content of a page of a built site, without the theme around it.
+
+    Examples
+        get_article_html('<body><div role="main"><h1>A</h1><div>b</div></div></body>') --> '<h1>A</h1><div>b</div>'
+
+    Returns:
+        html (str): The HTML of the page content, or None when no content element was found
+    """
+    for tag, start_regex in ARTICLE_CONTAINERS:
+        start = start_regex.search(page_html)
+        if not start:
+            continue
+
+        closing_tag = get_closing_tag(page_html, tag, start.end())
+        if closing_tag:
+            article_html = page_html[start.end() : closing_tag[0]]
+            if tag == "article":
+                article_html = MATERIAL_DECORATIONS_REGEX.sub("", article_html)
+            return article_html.strip()
+
+    return None
+
+
+def get_text(html_fragment: str) -> str:
+    """
+    The text of a fragment of HTML.
+    """
+    return html.unescape(HTML_TAG_REGEX.sub("", html_fragment)).strip()
+
+
+def get_page_title(page_html: str, article_html: str, site_name: str) -> Optional[str]:
+    """
+    The title of a page of a built site.
+
+    The supported themes show the title of a page as '<page title> - <site name>', except for the homepage.
+    Falls back to the first h1 of the page content.
+
+    Returns:
+        title (str): The title of the page, or None when it was not found
+    """
+    m = TITLE_REGEX.search(page_html)
+    if m:
+        title = get_text(m.group(1))
+        suffix = f" - {site_name}"
+        if title.endswith(suffix) and title != suffix:
+            return title[: -len(suffix)]
+
+    m = H1_REGEX.search(article_html)
+    if m:
+        return get_text(HEADERLINK_REGEX.sub("", m.group(1))) or None
+    return None
+
+
+def get_page_tags(page_html: str) -> List[str]:
+    """
+    The mkdocs-material tags of a page of a built site.
+    """
+    m = TAGS_REGEX.search(page_html)
+    if not m:
+        return []
+    return [get_text(tag_html) for _, tag_html in TAG_REGEX.findall(m.group(1))]
+
+
+def read_built_page(path: str, site_name: str = "") -> Tuple[Optional[str], Dict]:
+    """
+    Read the content and the metadata of a page of a built site.
+
+    Args:
+        path (str): Path of the page in the site directory
+        site_name (str): The 'site_name' of the configuration, see `get_page_title()`
+
+    Returns:
+        html (str): The content of the page, see `get_article_html()`.
+            None when the page was not built or no content was found.
+        meta (dict): The 'title' and 'tags' of the page, when found
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            page_html = f.read()
+    except FileNotFoundError:
+        return None, {}
+
+    article_html = get_article_html(page_html)
+    if article_html is None:
+        return None, {}
+
+    meta = {}
+    title = get_page_title(page_html, article_html, site_name)
+    if title:
+        meta["title"] = title
+    tags = get_page_tags(page_html)
+    if tags:
+        meta["tags"] = tags
+
+    # Pages without content
+    if THEME_TITLE_REGEX.match(article_html):
+        article_html = ""
+    return article_html, meta
+
+
+def rebuild(config_file: str = "mkdocs.yml", site_dir: Optional[str] = None, jobs: Optional[int] = None) -> None:
+    """
+    Write the print page(s) of an already built site.
+
+    Runs the 'startup', 'config', 'files', 'nav' and 'template_context' events of all plugins,
+    like `mkdocs build` does, but the markdown of the pages is not read: the HTML, title and tags of every page
+    are taken from the site directory. Other plugins are not run after that,
+    only the print-site plugin writes its files.
+
+    Args:
+        config_file (str): Path to the mkdocs.yml of the site
+        site_dir (str): The built site directory. Defaults to the 'site_dir' of the configuration.
+        jobs (int): Number of processes that read and rewrite the pages. Defaults to the number of processors.
+    """
+    from mkdocs.commands.build import get_context
+    from mkdocs.config import load_config
+    from mkdocs.exceptions import PluginError
+    from mkdocs.structure.files import get_files
+    from mkdocs.structure.nav import get_navigation
+
+    config = load_config(config_file=config_file, site_dir=site_dir)
+    plugin = config.plugins.get("print-site")
+    if plugin is None or not plugin.config.get("enabled"):
+        raise PluginError(f"[mkdocs-print-site] The 'print-site' plugin is not enabled in {config_file}.")
+    if not os.path.isdir(config["site_dir"]):
+        raise PluginError(f"[mkdocs-print-site] Site directory '{config['site_dir']}' not found, build the site first.")
+
+    jobs = jobs or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    config.plugins.on_startup(command="build", dirty=False)
+    try:
+        config = config.plugins.on_config(config)
+
+        files = get_files(config)
+        env = config.theme.get_env()
+        files.add_files_from_theme(env, config)
+        files = config.plugins.on_files(files, config=config)
+        nav = get_navigation(files, config)
+        nav = config.plugins.on_nav(nav, config=config, files=files)
+
+        # The pages are read and rewritten in parallel, in chunks to limit the overhead per page
+        map_function = map
+        if executor is not None:
+            map_function = functools.partial(executor.map, chunksize=max(1, len(nav.pages) // (jobs * 4)))
+        renderers = [plugin.build.renderer]
+        renderers += [renderer for renderer, _ in plugin.build.profile_print_pages + plugin.build.section_print_pages]
+        for renderer in renderers:
+            renderer.map_function = map_function
+
+        # The HTML of the pages, as built before (the print pages are not part of the site files)
+        pages = [page for page in nav.pages if page.file.src_uri in files.src_uris]
+        read_page = functools.partial(read_built_page, site_name=config["site_name"])
+        built_pages = list(map_function(read_page, [page.file.abs_dest_path for page in pages]))
+
+        if pages and all(page_html is None for page_html, _ in built_pages):
+            msg = f"[mkdocs-print-site] No page content found in '{config['site_dir']}'. "
+            msg += "Rebuilding the print page is supported for the 'material', 'readthedocs' and 'mkdocs' themes."
+            raise PluginError(msg)
+
+        for page, (page_html, meta) in zip(pages, built_pages):
+            if page_html is None:
+                logger.warning(f"[mkdocs-print-site] No content found for '{page.file.src_uri}', it is left out.")
+                continue
+            # Gives the page its title and metadata, without reading the markdown.
+            # A title set in the navigation is kept.
+            page.meta = meta
+            if page.title is None:
+                page.title = meta.get("title") or ("Home" if page.is_homepage else page.file.name)
+            page.html = page_html
+
+        # The template context of the print page, see the 'on_template_context' event of the plugin
+        context = get_context(nav, files, config, base_url=urlsplit(config.site_url or "/").path)
+        config.plugins.on_template_context(context, template_name="404.html", config=config)
+
+        plugin.on_post_build(config=config)
+    finally:
+        config.plugins.on_shutdown()
+        if executor is not None:
+            executor.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point of `mkdocs-print-site-rebuild`.
+    """
+    parser = argparse.ArgumentParser(
+        prog="mkdocs-print-site-rebuild",
+        description="Rebuild the print page(s) of an already built MkDocs site, without rendering all pages again.",
+    )
+    parser.add_argument("-f", "--config-file", default="mkdocs.yml", help="Path to the mkdocs.yml of the site")
+    parser.add_argument("-d", "--site-dir", default=None, help="The built site directory (default: 'site_dir')")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Number of processes that read and rewrite the pages"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(levelname)-7s -  %(message)s", level=logging.DEBUG if args.verbose else logging.INFO)
+
+    from mkdocs.exceptions import MkDocsException
+
+    try:
+        rebuild(args.config_file, site_dir=args.site_dir, jobs=args.jobs)
+    except MkDocsException as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,107 @@
+import functools
 import logging
+import os
 import re
-from typing import List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import jinja2
 from mkdocs.structure.toc import AnchorLink, TableOfContents
+from mkdocs.utils import get_relative_url
 
+from mkdocs_print_site_plugin.dedup import deduplicate
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
 from mkdocs_print_site_plugin.exclude import exclude
+from mkdocs_print_site_plugin.headings import add_heading_numbers, insert_figure_numbers, insert_heading_numbers
 from mkdocs_print_site_plugin.urls import (
     fix_internal_links,
+    fix_internal_links_linear,
     get_page_key,
+    remove_lazy_loading,
+    wrap_page,
 )
 from mkdocs_print_site_plugin.utils import get_section_id
 
 logger = logging.getLogger("mkdocs.plugins")
 
 
+def load_template(path: str) -> jinja2.Template:
+    """
+    Load a jinja2 template from a file.
+
+    Compiled templates are cached and shared by all renderers in the process,
+    and reloaded only when the file changes.
+    """
+    return _load_template(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=32)
+def _load_template(path: str, mtime: float) -> jinja2.Template:
+    with open(path, "r", encoding="utf-8-sig", errors="strict") as f:
+        return jinja2.Environment().from_string(f.read())
+
+
+def rewrite_page_html(
+    page_html: str,
+    page_url: str,
+    heading_number: str,
+    max_heading_level: int,
+    is_large: bool = False,
+    directory_urls: bool = True,
+    page_keys: Optional[Dict[str, str]] = None,
+    page_hrefs: Optional[Dict[str, Tuple[str, bool]]] = None,
+    eager_images: bool = False,
+    enumerate_in_html: bool = False,
+) -> str:
+    """
+    Rewrite the HTML of a page, so it can be part of the print page.
+
+    Updates internal anchor links, image urls, etc, optionally removes lazy loading and enumerates the headings.
+    Only depends on its arguments, so pages can be rewritten in other processes.
+
+    Args:
+        page_html (str): HTML of the page
+        page_url (str): The MkDocs url of the page
+        heading_number (str): The number of the page in the navigation, f.e. '3.2.1'
+        max_heading_level (int): The deepest heading level to enumerate, see `Renderer._get_max_heading_level()`
+        is_large (bool): Rewrite the page in a single pass that is safe for very large pages
+        directory_urls (bool): Whether the mkdocs sites is using directory urls
+        page_keys (dict): Compact page keys, see `get_compact_page_keys()` (optional)
+        page_hrefs (dict): Where to link to for pages that are not part of the print page (optional)
+        eager_images (bool): Whether to remove lazy loading attributes from images
+        enumerate_in_html (bool): Insert the heading numbers as text, instead of using CSS counters
+
+    Returns:
+        html (str): HTML of the page in the print page
+    """
+    if is_large:
+        page_html = fix_internal_links_linear(
+            page_html,
+            page_url,
+            directory_urls=directory_urls,
+            heading_number=heading_number,
+            page_keys=page_keys,
+            eager_images=eager_images,
+            page_hrefs=page_hrefs,
+        )
+    else:
+        page_html = fix_internal_links(
+            page_html,
+            page_url,
+            directory_urls=directory_urls,
+            heading_number=heading_number,
+            page_keys=page_keys,
+            page_hrefs=page_hrefs,
+        )
+        if eager_images:
+            page_html = remove_lazy_loading(page_html)
+
+    if max_heading_level >= 1 and enumerate_in_html:
+        page_html = insert_heading_numbers(page_html, heading_number, max_level=max_heading_level)
+    elif max_heading_level >= 1:
+        page_html = add_heading_numbers(page_html, heading_number, max_level=max_heading_level)
+    return page_html
+
+
 class Renderer(object):
     """
     Renders the print site page.
@@ -38,6 +125,12 @@ class Renderer(object):
         self.print_page = print_page
 
         self.items = []
+        # Compact page keys, when using the 'compact_anchors' option
+        self.page_keys = None
+        # Where to link to for pages that are not part of this print page (f.e. for the print page of a section)
+        self.page_hrefs = None
+        # Used to rewrite the pages, f.e. `executor.map` of a process pool to rewrite pages in parallel
+        self.map_function: Callable = map
 
     def _get_items(self):
         return [i for i in self.items if not i == self.print_page]
@@ -47,16 +140,30 @@ class Renderer(object):
         Generates the HTML of the page that combines all page into one, while filling
         a table of contents.
         """
+        document = self.build_document()
+        return document.to_html(), document.toc
+
+    def build_document(self, sections: Optional[List[PrintSection]] = None) -> PrintDocument:
+        """
+        Builds the structured representation of the page that combines all pages into one,
+        while filling a table of contents.
+
+        Args:
+            sections (list): Already rewritten pages and sections (see `build_sections()`),
+                which can be shared by multiple print pages. Pages matching the 'exclude' option
+                of this renderer are left out. When None, the pages are rewritten.
+        """
         enabled_classes = []
+        enumerate_in_html = self.plugin_config.get("enumerate_in_html")
 
         # Enable options via CSS
         if self.plugin_config.get("add_full_urls"):
             enabled_classes.append("print-site-add-full-url")
 
-        if self.plugin_config.get("enumerate_headings"):
+        if self.plugin_config.get("enumerate_headings") and not enumerate_in_html:
             enabled_classes.append("print-site-enumerate-headings")
 
-        if self.plugin_config.get("enumerate_figures"):
+        if self.plugin_config.get("enumerate_figures") and not enumerate_in_html:
             enabled_classes.append("print-site-enumerate-figures")
 
         # Wrap entire print page in a div
@@ -73,38 +180,95 @@ class Renderer(object):
         if self.plugin_config.get("add_table_of_contents"):
             html += self._toc()
 
-        def get_html_and_anchor_links_from_items(
-            items: list,
-            dir_urls: bool,
-            excluded_pages: list,
-            level: int = 0,
-            prefix: str = "",
-            heading_styles: List[str] = [],
-        ) -> Tuple[str, List[AnchorLink]]:
+        if sections is None:
+            sections = self.build_sections()
+        sections = self._filter_sections(sections, self.plugin_config.get("exclude", []))
+
+        if self.plugin_config.get("eager_images"):
+            html = remove_lazy_loading(html)
+
+        document = PrintDocument(sections, self._build_toc(sections), header_html=html, footer_html="</div>")
+
+        # Figures are numbered per print page, so only count the figures of pages that are not excluded
+        if self.plugin_config.get("enumerate_figures") and enumerate_in_html:
+            figure_count = 0
+            for node in document.pages():
+                if node.html:
+                    node.html, figure_count = insert_figure_numbers(node.html, start=figure_count)
+
+        # Replace repeated content with a reference to its first occurrence
+        if self.plugin_config.get("deduplicate_blocks"):
+            n_blocks, bytes_saved = deduplicate(
+                document,
+                min_size=self.plugin_config.get("deduplicate_min_size", 200),
+                enumerate_headings=self.plugin_config.get("enumerate_headings"),
+            )
+            name = f" '{self.print_page.file.src_uri}'" if self.print_page is not None else ""
+            logger.info(
+                f"[mkdocs-print-site] Replaced {n_blocks} repeated blocks in print page{name}, "
+                f"saving {bytes_saved / 1e3:.1f} kB"
+            )
+
+        return document
+
+    def build_sections(self, is_excluded: Optional[Callable[[str], bool]] = None) -> List[PrintSection]:
+        """
+        Rewrites all pages in the navigation, so they can be combined into one page.
+
+        The pages are rewritten with `self.map_function`, see `rewrite_page_html()`.
+
+        Args:
+            is_excluded (Callable): Function that takes the source path of a page,
+                and returns whether it should be left out. Defaults to the 'exclude' option.
+
+        Returns:
+            sections (list): Tree of pages and sections, in navigation order
+        """
+        if is_excluded is None:
+            excluded_pages = self.plugin_config.get("exclude", [])
+            is_excluded = lambda src_path: exclude(src_path, excluded_pages)
+
+        enumerate_in_html = self.plugin_config.get("enumerate_in_html")
+        large_page_threshold = self.plugin_config.get("large_page_threshold", 0)
+        large_page_mode = self.plugin_config.get("large_page_mode", "inline")
+
+        # Pages to rewrite, as (section, page HTML, page url, heading number, max heading level, is large) tuples
+        rewrites = []
+
+        # Ids of the sections so far, to keep them unique when sections have the same title
+        section_ids = set()
+
+        def get_sections_from_items(
+            items: list, level: int = 0, prefix: str = "", titles: Tuple[str, ...] = ()
+        ) -> List[PrintSection]:
             """
-            Get all the HTML and anchor links from the pages.
+            Get all the sections from the pages.
             """
-            items_html = ""
-            anchor_links = []
+            sections = []
 
             for i, item in enumerate(items):
                 my_prefix = f"{prefix}{i + 1}"
                 item_id = None
-                title = item.title
-                if self.plugin_config.get("enumerate_headings"):
-                    title = f"{my_prefix} {title}"
+                max_heading_level = self._get_max_heading_level(level)
 
                 if item.is_page:
                     # Do not include page in print page if excluded
-                    if exclude(item.file.src_path, excluded_pages):
+                    if is_excluded(item.file.src_path):
                         logging.debug(f"Excluding page '{item.file.src_path}'")
                         continue
 
-                    item_id = get_page_key(item.url)
-                    anchor_links.append(AnchorLink(title, item_id, level))
-                    heading_styles.append(
-                        f".print-site-enumerate-headings #{item_id} > h1:before {{ content: '{my_prefix} ' }}"
+                    item_id = get_page_key(item.url, self.page_keys)
+                    section = PrintSection(
+                        "page",
+                        key=item_id,
+                        heading_number=my_prefix,
+                        title=item.title,
+                        level=level,
+                        src_path=item.file.src_path,
+                        url=item.url,
                     )
+                    # Pages without content are still part of the table of contents
+                    sections.append(section)
 
                     # If you specify the same page twice in your navigation, it is only rendered once
                     # so we need to check if the html attribute exists
@@ -124,8 +288,6 @@ class Renderer(object):
                                     f"[mkdocs-print-site] '{item.file.src_path}' file is missing a leading h1 tag. Added to the print-page with title '{item.title}'"
                                 )
 
-                        heading_styles.append(self._set_inner_heading_styles(item_id, my_prefix, level))
-
                         # Support mkdocs-material tags
                         # See https://squidfunk.github.io/mkdocs-material/plugins/tags
                         if hasattr(item, "meta") and item.meta.get("tags"):
@@ -136,58 +298,114 @@ class Renderer(object):
                             tags_html += "</nav>"
                             item_html = tags_html + item_html
 
-                        # Update internal anchor links, image urls, etc
-                        items_html += fix_internal_links(
-                            item_html, item.url, directory_urls=dir_urls, heading_number=my_prefix
-                        )
+                        is_large = large_page_threshold and len(item_html) > large_page_threshold
+                        if is_large and large_page_mode == "link":
+                            # Link to the page instead of including it
+                            item_html = self._get_large_page_link_html(item)
+                            section.html = wrap_page(item_html, item_id, heading_number=my_prefix)
+                        else:
+                            is_large = bool(is_large)
+                            rewrites.append((section, item_html, item.url, my_prefix, max_heading_level, is_large))
+
+                        if is_large:
+                            msg = f"[mkdocs-print-site] '{item.file.src_path}' is a large page "
+                            msg += f"({len(item.html) / 1e6:.1f} MB)"
+                            if large_page_mode == "link":
+                                msg += ", the print page links to it instead of including it."
+                            logger.warning(msg)
 
                 if item.is_section:
-                    item_id = get_section_id(my_prefix)
-                    heading_styles.append(
-                        f".print-site-enumerate-headings #{item_id} > h1:before {{ content: '{my_prefix} ' }}"
-                    )
-                    items_html += f"""
+                    item_id = section_id = get_section_id([*titles, item.title or ""])
+                    n = 1
+                    while item_id in section_ids:
+                        n += 1
+                        item_id = f"{section_id}-{n}"
+                    section_ids.add(item_id)
+                    h1_attributes = ""
+                    h1_number = ""
+                    if max_heading_level >= 1 and enumerate_in_html:
+                        h1_number = f"<span class='print-site-heading-number'>{my_prefix} </span>"
+                    elif max_heading_level >= 1:
+                        h1_attributes = f" heading-number='{my_prefix}'"
+                    section = PrintSection(
+                        "section",
+                        key=item_id,
+                        heading_number=my_prefix,
+                        title=item.title,
+                        level=level,
+                        html=f"""
                     <section class='print-page md-section' id='{item_id}' heading-number='{my_prefix}'>
-                        <h1>{item.title}<a class='headerlink' href='#{item_id}' title='Permanent link'></a>
+                        <h1{h1_attributes}>{h1_number}{item.title}<a class='headerlink' href='#{item_id}' title='Permanent link'></a>
                         </h1>
-                    """
-                    section_html, section_links = get_html_and_anchor_links_from_items(
-                        item.children, dir_urls, excluded_pages, level + 1, my_prefix + ".", heading_styles
+                    """,
+                    )
+                    section.children = get_sections_from_items(
+                        item.children, level + 1, my_prefix + ".", (*titles, item.title or "")
                     )
-                    items_html += section_html
-                    section_link = AnchorLink(title, item_id, level)
-                    section_link.children = section_links
-                    anchor_links.append(section_link)
+                    sections.append(section)
 
-                    items_html += "</section>"
+            return sections
 
-            return items_html, anchor_links
+        sections = get_sections_from_items(self._get_items())
 
-        heading_styles: List[str] = []
-        items_html, anchor_links = get_html_and_anchor_links_from_items(
-            self._get_items(),
-            dir_urls=self.mkdocs_config.get("use_directory_urls"),
-            excluded_pages=self.plugin_config.get("exclude", []),
-            heading_styles=heading_styles,
+        # Rewriting the pages is most of the work, and can be done in parallel
+        rewrite = functools.partial(
+            rewrite_page_html,
+            directory_urls=self.mkdocs_config.get("use_directory_urls"),
+            page_keys=self.page_keys,
+            page_hrefs=self.page_hrefs,
+            eager_images=self.plugin_config.get("eager_images"),
+            enumerate_in_html=enumerate_in_html,
         )
+        if rewrites:
+            rewritten_sections, *args = zip(*rewrites)
+            for section, page_html in zip(rewritten_sections, self.map_function(rewrite, *args)):
+                section.html = page_html
 
-        html += items_html
-        html += "</div>"
-        html += "<style>" + "\n".join(heading_styles) + "</style>"
+        return sections
 
-        return html, TableOfContents(anchor_links)
+    def _filter_sections(self, sections: List[PrintSection], excluded_pages: List[str]) -> List[PrintSection]:
+        """
+        Leave out excluded pages.
 
-    def _cover_page(self):
+        Returns copies of the nodes, so that post-processing one print page does not affect others
+        sharing the same sections.
         """
-        Inserts the cover page.
+        filtered = []
+        for section in sections:
+            if section.is_page and exclude(section.src_path, excluded_pages):
+                logging.debug(f"Excluding page '{section.src_path}'")
+                continue
+            copy = section.copy()
+            copy.children = self._filter_sections(section.children, excluded_pages)
+            filtered.append(copy)
+        return filtered
+
+    def _build_toc(self, sections: List[PrintSection]) -> TableOfContents:
+        """
+        Builds the table of contents of the print page.
         """
-        env = jinja2.Environment()
-        env.globals = {"config": self.mkdocs_config, "page": self.print_page}
 
-        with open(self.cover_page_template_path, "r", encoding="utf-8-sig", errors="strict") as f:
-            cover_page_tpl = f.read()
+        def get_anchor_links(sections: List[PrintSection]) -> List[AnchorLink]:
+            anchor_links = []
+            for section in sections:
+                title = section.title
+                if self._get_max_heading_level(section.level) >= 1:
+                    title = f"{section.heading_number} {title}"
+                anchor_link = AnchorLink(title, section.key, section.level)
+                if section.is_section:
+                    anchor_link.children = get_anchor_links(section.children)
+                anchor_links.append(anchor_link)
+            return anchor_links
+
+        return TableOfContents(get_anchor_links(sections))
 
-        cover_page_html = env.from_string(cover_page_tpl).render()
+    def _cover_page(self):
+        """
+        Inserts the cover page.
+        """
+        template = load_template(self.cover_page_template_path)
+        cover_page_html = template.render(config=self.mkdocs_config, page=self.print_page)
 
         return (
             """
@@ -202,13 +420,8 @@ class Renderer(object):
         """
         Inserts the print site banner.
         """
-        env = jinja2.Environment()
-        env.globals = {"config": self.mkdocs_config, "page": self.print_page}
-
-        with open(self.banner_template_path, "r", encoding="utf-8-sig", errors="strict") as f:
-            banner_tpl = f.read()
-
-        banner_html = env.from_string(banner_tpl).render()
+        template = load_template(self.banner_template_path)
+        banner_html = template.render(config=self.mkdocs_config, page=self.print_page)
 
         return f"""
         <div id="print-site-banner">
@@ -230,7 +443,20 @@ class Renderer(object):
         </section>
         """
 
-    def _set_inner_heading_styles(self, id: str, prefix: str, level: int) -> str:
+    def _get_large_page_link_html(self, item) -> str:
+        """
+        HTML that links to a page that is too large to include in the print page.
+        """
+        url = item.url
+        if self.print_page is not None:
+            url = get_relative_url(item.url, self.print_page.file.url)
+        return (
+            f"<h1>{item.title}</h1>"
+            f'<p class="print-site-large-page">This page is too large to include here, '
+            f'see <a href="{url}">{item.title}</a>.</p>'
+        )
+
+    def _get_max_heading_level(self, level: int) -> int:
         """
         By "inner heading" we mean that even if the heading numbers are fully determined by
         the nav's hierarchy, if a page has number 3.2.1, we will add a further numbering
@@ -238,20 +464,14 @@ class Renderer(object):
         3.2.1.1, the next one is 3.2.1.2, etc. In this case we will require that the number
         of items in this index be <= toc_depth, which is not the case in the ToC (as its depth
         is fully determined by the nav's depth).
+
+        Headings are only enumerated up to 'enumerate_headings_depth', counting the levels of the nav.
+
+        Returns the deepest heading level (h1-h6) to enumerate for a page at the given nav level,
+        or 0 when no headings should be enumerated.
         """
-        result = ""
+        if not self.plugin_config.get("enumerate_headings"):
+            return 0
         toc_depth = self.plugin_config.get("toc_depth") or 1
-        # Start from h2's
-        h_level = 2
-        counter_names = [f"counter-{id}-{i}" for i in range(h_level, toc_depth - level + 1)]
-        while h_level <= toc_depth - level:
-            counters_to_reset = " ".join([f"{x} " for x in counter_names[h_level - 1 :]])
-            counter_reset = f" counter-reset: {counters_to_reset}; " if len(counters_to_reset) > 0 else ""
-            counters_to_display = " '.' ".join([f"counter({x})" for x in counter_names[: h_level - 1]])
-            result += f"""
-                .print-site-enumerate-headings #{id} h{h_level}:before {{ content: '{prefix}.' {counters_to_display} ' ' }}
-                .print-site-enumerate-headings #{id} h{h_level} {{ {counter_reset} counter-increment: counter-{id}-{h_level} }}
-            """
-            h_level += 1
-
-        return result
+        enumerate_depth = self.plugin_config.get("enumerate_headings_depth") or 6
+        return max(0, min(max(1, toc_depth - level), enumerate_depth - level))
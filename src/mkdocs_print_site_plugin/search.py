@@ -0,0 +1,110 @@
+"""
+Search index of the print page.
+
+The search index of the theme links to the pages of the site, not to the print page.
+This builds a separate, small search index from the content of the print page:
+an inverted index from words to the headings (anchors) in the print page that contain them.
+It is loaded by `js/print-site-search.js` only when the reader starts searching.
+"""
+
+import html
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List
+
+from mkdocs_print_site_plugin.document import PrintDocument
+
+# The content of a heading can not contain another heading, so an unclosed heading does not make the search
+# scan the rest of the page for every heading after it
+HEADING_REGEX = re.compile(
+    r"<h([1-6])(\s[^>]*)?>([^<]*(?:<(?!/?h[1-6][\s>])[^<]*)*)</h\1\s*>", flags=re.IGNORECASE
+)
+HEADING_ID_REGEX = re.compile(r"\sid=[\"']([^\"']+)[\"']", flags=re.IGNORECASE)
+NON_TEXT_REGEX = re.compile(
+    r"<(script|style|svg)\b.*?</\1\s*>|<span class=\"print-site-heading-number\">.*?</span>|<a [^>]*class=\"headerlink\"[^>]*>.*?</a>",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+TAG_REGEX = re.compile(r"<[^>]*>")
+# Keep in sync with the tokenizer in js/print-site-search.js
+TOKEN_REGEX = re.compile(r"\w{2,}")
+
+
+def get_search_index_path(print_page_path: str) -> str:
+    """
+    Path of the search index, next to the print page.
+
+    Examples
+        get_search_index_path('site/print_page.html') --> 'site/print_page.search.json'
+        get_search_index_path('site/print_page/index.html') --> 'site/print_page/index.search.json'
+    """
+    return os.path.splitext(print_page_path)[0] + ".search.json"
+
+
+def get_text(page_html: str) -> str:
+    """
+    The text in a piece of HTML.
+
+    Examples
+        get_text('<p>Some <b>bold</b> text</p>') --> ' Some  bold  text '
+    """
+    page_html = NON_TEXT_REGEX.sub(" ", page_html)
+    return html.unescape(TAG_REGEX.sub(" ", page_html))
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    The unique words in a text, in lower case.
+    """
+    return list(dict.fromkeys(TOKEN_REGEX.findall(text.lower())))
+
+
+def build_search_index(document: PrintDocument) -> Dict:
+    """
+    Build the search index of the print page.
+
+    Every heading in the print page is a search result, which matches the words in the heading
+    and in the text up to the next heading. Text before the first heading of a page is part
+    of the page itself.
+
+    Returns:
+        index (dict): JSON serializable search index, with the anchor and title of every result in 'docs',
+            and for every word the positions of the results that contain it in 'index'.
+            To keep the index small, positions are stored as the difference with the previous position,
+            f.e. [3, 1, 10] for the results at positions 3, 4 and 14.
+    """
+    docs = []
+    index: Dict[str, List[int]] = defaultdict(list)
+    last_doc_ids: Dict[str, int] = defaultdict(int)
+
+    def add_doc(anchor: str, title: str, text: str):
+        doc_id = len(docs)
+        docs.append([anchor, " ".join(title.split())])
+        for token in tokenize(f"{title} {text}"):
+            index[token].append(doc_id - last_doc_ids[token])
+            last_doc_ids[token] = doc_id
+
+    for node in document.pages():
+        if not node.html:
+            continue
+        # The text before the first heading, and every heading with the text after it
+        position, anchor, title = 0, node.key, node.title
+        for m in HEADING_REGEX.finditer(node.html):
+            text = get_text(node.html[position : m.start()])
+            if position > 0 or text.strip():
+                add_doc(anchor, title, text)
+            heading_id = HEADING_ID_REGEX.search(m.group(2) or "")
+            anchor = heading_id.group(1) if heading_id else anchor
+            title = get_text(m.group(3))
+            position = m.end()
+        add_doc(anchor, title, get_text(node.html[position:]))
+
+    return {"version": 1, "docs": docs, "index": dict(index)}
+
+
+def search_index_to_json(search_index: Dict) -> str:
+    """
+    Serialize the search index as compact JSON.
+    """
+    return json.dumps(search_index, ensure_ascii=False, separators=(",", ":"))
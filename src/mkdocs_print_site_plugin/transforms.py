@@ -0,0 +1,276 @@
+"""
+Post-processing of the pages in the print page, for compatibility with other MkDocs plugins.
+
+Some plugins change the HTML of a page in an event that is not run for the print page
+(f.e. mkdocs-autorefs in 'on_env', mkdocs-drawio in 'on_post_page'). For these plugins,
+a `PageTransform` is registered, which is applied to the HTML of every page in the print page,
+instead of to the entire print page. Pages that are not affected are skipped with a cheap check,
+so a transform costs time proportional to the pages it changes.
+
+Changes to the theme HTML around the content (f.e. adding a script) are made in `PageTransform.finalize()`.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple, Type
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+
+logger = logging.getLogger("mkdocs.plugins")
+
+
+class PageTransform:
+    """
+    A post-processing stage for the pages in the print page, on behalf of another MkDocs plugin.
+    """
+
+    # Names of the MkDocs plugin in the 'plugins' configuration
+    plugin_names: Tuple[str, ...] = ()
+
+    # Whether the result only depends on the HTML of the page, and not on the rest of the print page.
+    # Results of such transforms are cached, and shared between the print pages of a build.
+    cacheable = False
+
+    def __init__(self, plugin, document: PrintDocument, print_page, config):
+        """
+        Inits the class.
+
+        Args:
+            plugin: The instance of the MkDocs plugin
+            document (PrintDocument): The content of the print page
+            print_page (Page): The MkDocs page of the print page
+            config: The MkDocs config
+        """
+        self.plugin = plugin
+        self.document = document
+        self.print_page = print_page
+        self.config = config
+
+    def applies_to(self, page_html: str) -> bool:
+        """
+        Cheap check whether the transform could change the HTML of a page.
+        """
+        return True
+
+    def transform(self, page_html: str, node: PrintSection) -> str:
+        """
+        Returns the new HTML of a page.
+        """
+        return page_html
+
+    def finalize(self, head: str, tail: str) -> Tuple[str, str]:
+        """
+        Returns the new theme HTML before and after the content, after all pages are transformed.
+        """
+        return head, tail
+
+
+# Registered transforms, in the order they are applied
+PAGE_TRANSFORMS: List[Type[PageTransform]] = []
+
+
+def register_page_transform(transform_class: Type[PageTransform]) -> Type[PageTransform]:
+    """
+    Register a page transform. Can be used as a class decorator.
+    """
+    PAGE_TRANSFORMS.append(transform_class)
+    return transform_class
+
+
+def get_page_transforms(document: PrintDocument, print_page, config) -> List[PageTransform]:
+    """
+    The page transforms of the plugins that are enabled in the MkDocs config.
+    """
+    plugins = config.get("plugins", {})
+    transforms = []
+    for transform_class in PAGE_TRANSFORMS:
+        for name in transform_class.plugin_names:
+            if plugins.get(name):
+                transforms.append(transform_class(plugins.get(name), document, print_page, config))
+                break
+    return transforms
+
+
+def apply_page_transforms(
+    document: PrintDocument,
+    transforms: List[PageTransform],
+    cache: Optional[Dict] = None,
+) -> None:
+    """
+    Apply page transforms to the HTML of every page in the print page.
+
+    Args:
+        document (PrintDocument): The content of the print page, updated in place
+        transforms (list): Page transforms, see `get_page_transforms()`
+        cache (dict): Results of cacheable transforms, shared between print pages (optional)
+    """
+    if not transforms:
+        return
+
+    def transform_page(node: PrintSection) -> str:
+        page_html = node.html
+        for transform in transforms:
+            if not transform.applies_to(page_html):
+                continue
+            if cache is None or not transform.cacheable:
+                page_html = transform.transform(page_html, node)
+                continue
+            key = (type(transform).__name__, page_html)
+            if key not in cache:
+                cache[key] = transform.transform(page_html, node)
+            page_html = cache[key]
+        return page_html
+
+    for node in document.pages():
+        node.html = transform_page(node)
+
+
+@register_page_transform
+class AutorefsTransform(PageTransform):
+    """
+    Compatibility with mkdocs-autorefs.
+
+    As this plugin processes cross-references in the on_env event,
+    which happens after the print page is generated, the cross-references
+    are resolved here, to anchors in the print page.
+    """
+
+    plugin_names = ("mkdocs-autorefs", "autorefs")
+
+    def __init__(self, plugin, document, print_page, config):
+        """
+        Inits the class.
+        """
+        super().__init__(plugin, document, print_page, config)
+        # All available anchors in the print page
+        self.available_anchors = document.anchors
+        # Fuzzy matching picks the first match, so use a fixed order for reproducible output
+        self.sorted_anchors = sorted(self.available_anchors)
+        self.unmapped: List[Tuple[str, str]] = []
+
+    def applies_to(self, page_html: str) -> bool:
+        return "autoref" in page_html
+
+    def url_mapper(self, identifier, from_url=None):
+        """
+        Custom URL mapper for print page that converts all cross-references
+        to internal anchors in the same page instead of external URLs.
+        """
+        try:
+            # Get the original URL from autorefs
+            original_url, title = self.plugin.get_item_url(identifier, from_url)
+
+            # Check if identifier directly exists as anchor
+            if identifier in self.available_anchors:
+                return f"#{identifier}", title
+
+            # Extract anchor part from URL if it exists
+            if "#" in original_url:
+                anchor = original_url.split("#")[-1]
+
+                # Check if this anchor actually exists in the HTML
+                if anchor in self.available_anchors:
+                    return f"#{anchor}", title
+
+                # Try to find a similar anchor (case-insensitive, partial match)
+                return f"#{self._find_anchor(anchor) or anchor}", title
+
+            # If no anchor in original URL, try fuzzy matching with identifier
+            return f"#{self._find_anchor(identifier) or identifier}", title
+
+        except Exception:
+            # Fallback: check if identifier exists as anchor or find fuzzy match
+            if identifier in self.available_anchors:
+                return f"#{identifier}", identifier
+            return f"#{self._find_anchor(identifier, partial_match=False) or identifier}", identifier
+
+    def _find_anchor(self, name: str, partial_match: bool = True) -> Optional[str]:
+        """
+        First anchor that matches a name case-insensitively, or contains it,
+        or (with `partial_match`) is contained in it.
+        """
+        name_lower = name.lower()
+        for available_anchor in self.sorted_anchors:
+            anchor_lower = available_anchor.lower()
+            if anchor_lower == name_lower or name_lower in anchor_lower:
+                return available_anchor
+            if partial_match and anchor_lower in name_lower:
+                return available_anchor
+        return None
+
+    def transform(self, page_html: str, node: PrintSection) -> str:
+        from mkdocs_autorefs._internal.references import fix_refs
+
+        page_html, unmapped = fix_refs(
+            page_html,
+            self.url_mapper,
+            link_titles=self.plugin._link_titles,
+            strip_title_tags=self.plugin._strip_title_tags,
+            _legacy_refs=self.plugin.legacy_refs,
+        )
+        self.unmapped.extend(unmapped)
+        return page_html
+
+    def finalize(self, head: str, tail: str) -> Tuple[str, str]:
+        if self.unmapped:
+            logger.warning(f"[mkdocs-print-site] Unmapped autorefs: {[ref for ref, _ in self.unmapped]}")
+        return head, tail
+
+
+@register_page_transform
+class ChartsTransform(PageTransform):
+    """
+    Compatibility with mkdocs-charts-plugin.
+
+    As this plugin adds some javascript to every page,
+    it should be included in the print page also. It does not change the pages.
+    """
+
+    plugin_names = ("charts",)
+
+    def applies_to(self, page_html: str) -> bool:
+        return False
+
+    def finalize(self, head: str, tail: str) -> Tuple[str, str]:
+        return head, self.plugin.add_javascript_variables(tail, self.print_page, self.config)
+
+
+@register_page_transform
+class DrawioTransform(PageTransform):
+    """
+    Compatibility with mkdocs-drawio.
+
+    As this plugin adds renderer html for every drawio diagram
+    referenced in your markdown files. This rendering happens
+    in the on_post_page event, which is skipped by this plugin
+    therefore we need to manual execute the drawio plugin renderer here,
+    for the pages that contain a diagram. The viewer script is added once, at the end of the print page.
+    """
+
+    plugin_names = ("drawio",)
+    cacheable = True
+
+    BODY_REGEX = re.compile(r"^<html><body>(.*?)(?:<script\b[^>]*></script>)?</body></html>$", flags=re.DOTALL)
+
+    def applies_to(self, page_html: str) -> bool:
+        return ".drawio" in page_html.lower()
+
+    def transform(self, page_html: str, node: PrintSection) -> str:
+        # The plugin expects an entire HTML page, and adds the viewer script to it
+        html = self.plugin.render_drawio_diagrams(f"<html><body>{page_html}</body></html>", self.print_page)
+        m = self.BODY_REGEX.match(html)
+        if not m:
+            logger.warning(
+                f"[mkdocs-print-site] Unexpected HTML from mkdocs-drawio for page '{node.src_path or node.title}', "
+                "its diagrams are not rendered in the print page."
+            )
+            return page_html
+        return m.group(1)
+
+    def finalize(self, head: str, tail: str) -> Tuple[str, str]:
+        from mkdocs.utils import normalize_url
+
+        if any('class="mxgraph"' in node.html for node in self.document.pages()):
+            script = '<script src="%s"></script>' % normalize_url(self.plugin.config.viewer_js, self.print_page)
+            tail = tail.replace("</body>", script + "</body>", 1)
+        return head, tail
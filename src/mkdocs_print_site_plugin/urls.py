@@ -30,9 +30,24 @@ So within a page:
 import re
 import os
 import html
+import hashlib
 from os.path import splitext
 from urllib.parse import urlparse
 
+# Matching is bounded by the end of the <img> tag, so no backtracking over long lines
+LAZY_LOADING_IMG = re.compile(r"(<img\b[^>]*?)\s+loading=[\"']?lazy[\"']?(?=[\s/>])", flags=re.IGNORECASE)
+PROTOCOL_RELATIVE_URL = re.compile(r"\b(href|src)=\"//")
+# The tags changed by fix_internal_links_linear(). A tag never contains '<', so matching stops at the next tag
+LINEAR_REWRITE_TAGS = re.compile(r"<(a|img|input|label|h[1-6]|sup|li)(?=[\s>/])[^<>]*>", flags=re.IGNORECASE)
+LINEAR_REWRITE_ATTRIBUTES = {
+    attribute: re.compile(rf"(\s{attribute}=\")([^\"]*)(\")", flags=re.IGNORECASE)
+    for attribute in ("href", "src", "id", "name", "for")
+}
+
+# Minimum number of base-36 characters of a compact page key
+COMPACT_KEY_LENGTH = 4
+BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
 
 def is_external(url):
     """
@@ -59,7 +74,7 @@ def is_attachment(url):
     return ext not in ["", ".html", ".md"]
 
 
-def get_page_key(page_url):
+def get_page_key(page_url, page_keys=None):
     """
     Get the page key.
 
@@ -73,18 +88,54 @@ def get_page_key(page_url):
         get_page_key('/') --> 'index'
         get_page_key('abc/') --> 'abc'
         get_page_key('abc.html') --> 'abc'
+        get_page_key('abc/', {'abc': 'p1x9'}) --> 'p1x9'
 
     Args:
         page_url (str): The MkDocs url of the page
+        page_keys (dict): Compact keys to use instead, see `get_compact_page_keys()` (optional)
     """
     page_key = page_url.lower().strip().rstrip("/").replace(".html", "").replace("/", "-").lstrip("-")
-    if len(page_key) > 0:
-        return page_key
-    else:
-        return "index"
+    if len(page_key) == 0:
+        page_key = "index"
+    if page_keys:
+        return page_keys.get(page_key, page_key)
+    return page_key
+
+
+def get_compact_page_keys(page_urls):
+    """
+    Get short page keys, to use instead of the page keys of deeply nested pages.
 
+    The compact key is derived from a hash of the page key, so it does not change
+    when other pages are added or removed. When the hashes of two pages start the same,
+    the compact key of the second page (in sorted order) is made longer.
 
-def fix_href_links(page_html, page_key, page_url, directory_urls=False):
+    Examples
+        get_compact_page_keys(['index.html', 'reference/api/v2/']) --> {'index': 'p6k3p', 'reference-api-v2': 'pr6qr'}
+
+    Args:
+        page_urls (list): The MkDocs urls of all pages
+
+    Returns:
+        page_keys (dict): Compact key per page key
+    """
+    page_keys = {}
+    used = set()
+    for page_key in sorted({get_page_key(url) for url in page_urls}):
+        number = int(hashlib.sha1(page_key.encode("utf-8")).hexdigest(), 16)
+        digits = ""
+        while number:
+            number, digit = divmod(number, 36)
+            digits += BASE36_DIGITS[digit]
+        length = COMPACT_KEY_LENGTH
+        while "p" + digits[:length] in used:
+            length += 1
+        page_keys[page_key] = "p" + digits[:length]
+        used.add(page_keys[page_key])
+    return page_keys
+
+
+def fix_href_links(page_html, page_key, page_url, directory_urls=False, page_keys=None, page_hrefs=None):
     """
     Changes internal href HTML links to (anchor) links within the print page.
     """
@@ -93,35 +144,11 @@ def fix_href_links(page_html, page_key, page_url, directory_urls=False):
     matches = re.finditer(href_regex, page_html)
 
     for m in matches:
-        url = m.group(2)
-        url = html.unescape(url)
-
-        if is_external(url):
+        url = get_print_page_href(
+            html.unescape(m.group(2)), page_key, page_url, directory_urls, page_keys, page_hrefs
+        )
+        if url is None:
             continue
-        elif is_attachment(url):
-            url = get_url_from_root(url, page_url)
-            if directory_urls:
-                url = os.path.join("..", url)
-            if os.sep != "/":
-                # For windows compat
-                url = url.replace(os.sep, "/")
-        elif url.startswith("#"):
-            # This is an anchor link within a mkdocs page
-            url = "#" + page_key + "-" + url[1:]
-        else:
-            # This is a link to another mkdocs page
-            # url 'a/#anchor-link' becomes '#a-anchor-link'
-            # url '../Section2' with page_url '/Chapter1/Section1/ becomes '/Chapter1/Section2/'
-
-            url_from_root = get_url_from_root(url, page_url)
-
-            # If there is an anchor appended, fix that also
-            url_paths = url_from_root.split("#")
-            assert len(url_paths) <= 2
-            page_url_1 = url_paths[0]
-            url = "#" + get_page_key(page_url_1)
-            if len(url_paths) == 2:
-                url += "-" + url_paths[1]
 
         # Insert back any HTML between '<a' and 'href=', like "class='id'"
         other_html = m.group(1)
@@ -135,6 +162,59 @@ def fix_href_links(page_html, page_key, page_url, directory_urls=False):
     return page_html
 
 
+def get_print_page_href(url, page_key, page_url, directory_urls=False, page_keys=None, page_hrefs=None):
+    """
+    Get the href of an internal link, for use in the print page.
+
+    Examples
+        get_print_page_href('#anchor', 'a', 'a/') --> '#a-anchor'
+        get_print_page_href('../b/#anchor', 'a', 'a/') --> '#b-anchor'
+        get_print_page_href('../b/#anchor', 'a', 'a/', page_hrefs={'b': ('../print_page/', True)})
+        --> '../print_page/#b-anchor'
+
+    Args:
+        page_hrefs (dict): For pages that are not part of the print page, the href to link to instead,
+            as (href, is_print_page) tuples per page key. Either another print page, or the page itself (optional)
+
+    Returns:
+        url (str): The new url, or None when the link should not be changed (external links)
+    """
+    if is_external(url):
+        return None
+    elif is_attachment(url):
+        url = get_url_from_root(url, page_url)
+        if directory_urls:
+            url = os.path.join("..", url)
+        if os.sep != "/":
+            # For windows compat
+            url = url.replace(os.sep, "/")
+    elif url.startswith("#"):
+        # This is an anchor link within a mkdocs page
+        url = "#" + page_key + "-" + url[1:]
+    else:
+        # This is a link to another mkdocs page
+        # url 'a/#anchor-link' becomes '#a-anchor-link'
+        # url '../Section2' with page_url '/Chapter1/Section1/ becomes '/Chapter1/Section2/'
+
+        url_from_root = get_url_from_root(url, page_url)
+
+        # If there is an anchor appended, fix that also
+        url_paths = url_from_root.split("#")
+        assert len(url_paths) <= 2
+        page_url_1 = url_paths[0]
+        anchor = url_paths[1] if len(url_paths) == 2 else ""
+        target_key = get_page_key(page_url_1, page_keys)
+
+        href, is_print_page = (page_hrefs or {}).get(target_key, ("", True))
+        if not is_print_page:
+            # The page is not part of any print page, link to the page on the site
+            return href + ("#" + anchor if anchor else "")
+        url = href + "#" + target_key
+        if anchor:
+            url += "-" + anchor
+    return url
+
+
 def update_anchor_ids(page_html, page_key):
     """
     Changes internal anchors to make sure they are unique within the print page.
@@ -208,27 +288,67 @@ def fix_image_src(page_html, page_url, directory_urls):
 
     for m in matches:
         img_src = m.group(1)
-        if is_external(img_src):
-            continue
-        elif is_base64_image(img_src):
+        new_url = get_print_page_img_src(img_src, page_url, directory_urls)
+        if new_url is None:
             continue
 
         img_text = m.group()
+        new_text = img_text.replace(img_src, new_url)
 
-        new_url = get_url_from_root(img_src, page_url)
+        page_html = page_html.replace(img_text, new_text)
 
-        if directory_urls:
-            new_url = os.path.join("..", new_url)
+    return page_html
 
-        # For windows compat
-        if os.sep != "/":
-            new_url = new_url.replace(os.sep, "/")
 
-        new_text = img_text.replace(img_src, new_url)
+def get_print_page_img_src(img_src, page_url, directory_urls):
+    """
+    Get the src of an image, for use in the print page.
 
-        page_html = page_html.replace(img_text, new_text)
+    Returns:
+        url (str): The new url, or None when the src should not be changed (external and base64 images)
+    """
+    if is_external(img_src) or is_base64_image(img_src):
+        return None
 
-    return page_html
+    new_url = get_url_from_root(img_src, page_url)
+
+    if directory_urls:
+        new_url = os.path.join("..", new_url)
+
+    # For windows compat
+    if os.sep != "/":
+        new_url = new_url.replace(os.sep, "/")
+
+    return new_url
+
+
+def remove_lazy_loading(page_html):
+    """
+    Remove lazy loading attributes from images.
+
+    Otherwise images further down the print page might not be loaded when printing.
+
+    Only looks inside <img> tags, and runs in linear time (no backtracking on long lines).
+
+    Examples
+        remove_lazy_loading('<img loading="lazy" src="a.png">') --> '<img src="a.png">'
+    """
+    if "lazy" not in page_html:
+        return page_html
+    return LAZY_LOADING_IMG.sub(r"\1", page_html)
+
+
+def fix_protocol_relative_urls(head_html, base_url):
+    """
+    Replace links starting with a double slash in the <head> of the page.
+
+    Some plugins insert links like <link href="//assets/css/somecss.css">,
+    which are meant to be relative to the site root.
+    Only the part before '</head>' is changed.
+    """
+    head, separator, body = head_html.partition("</head>")
+    head = PROTOCOL_RELATIVE_URL.sub(lambda m: f'{m.group(1)}="{base_url}', head)
+    return head + separator + body
 
 
 def get_url_from_root(target_link, current_page_url):
@@ -247,7 +367,7 @@ def get_url_from_root(target_link, current_page_url):
     return new_url
 
 
-def fix_internal_links(page_html, page_url, directory_urls, heading_number):
+def fix_internal_links(page_html, page_url, directory_urls, heading_number, page_keys=None, page_hrefs=None):
     """
     Updates links to internal pages to anchor links.
 
@@ -258,14 +378,17 @@ def fix_internal_links(page_html, page_url, directory_urls, heading_number):
         page_html (str): HTML of page
         page_url (str): URL of the page
         directory_urls (bool): Whether the mkdocs sites is using directory urls
+        page_keys (dict): Compact page keys, see `get_compact_page_keys()` (optional)
+        page_hrefs (dict): Where to link to for pages that are not part of the print page,
+            see `get_print_page_href()` (optional)
 
     Returns:
         html (str): HTML of part of the print page with working internal links
     """
-    page_key = get_page_key(page_url)
+    page_key = get_page_key(page_url, page_keys)
 
     try:
-        page_html = fix_href_links(page_html, page_key, page_url, directory_urls)
+        page_html = fix_href_links(page_html, page_key, page_url, directory_urls, page_keys, page_hrefs)
         page_html = update_anchor_ids(page_html, page_key)
         page_html = fix_tabbed_content(page_html, page_key)
         page_html = fix_image_src(page_html, page_url, directory_urls)
@@ -274,10 +397,77 @@ def fix_internal_links(page_html, page_url, directory_urls, heading_number):
         raise
 
     # Finally, wrap the entire page in a section with an anchor ID
-    page_html = (
+    return wrap_page(page_html, page_key, heading_number)
+
+
+def fix_internal_links_linear(
+    page_html, page_url, directory_urls, heading_number, page_keys=None, eager_images=True, page_hrefs=None
+):
+    """
+    Same as `fix_internal_links()`, for very large pages.
+
+    Rewrites the page in a single pass over the relevant tags (links, headings, images, etc),
+    instead of a pass per type of tag that copies the entire page for every change.
+    Runs in linear time, even for f.e. a huge table on a single line.
+    Also removes lazy loading attributes from images, unless `eager_images` is False.
+
+    Args:
+        page_html (str): HTML of page
+        page_url (str): URL of the page
+        directory_urls (bool): Whether the mkdocs sites is using directory urls
+        heading_number (str): The number of the page in the navigation
+        page_keys (dict): Compact page keys, see `get_compact_page_keys()` (optional)
+        eager_images (bool): Whether to remove lazy loading attributes from images
+        page_hrefs (dict): Where to link to for pages that are not part of the print page,
+            see `get_print_page_href()` (optional)
+
+    Returns:
+        html (str): HTML of part of the print page with working internal links
+    """
+    page_key = get_page_key(page_url, page_keys)
+
+    def fix_attribute(tag, attribute, fix):
+        def fix_value(m):
+            new_value = fix(m.group(2))
+            return m.group() if new_value is None else f"{m.group(1)}{new_value}{m.group(3)}"
+
+        return LINEAR_REWRITE_ATTRIBUTES[attribute].sub(fix_value, tag, count=1)
+
+    def fix_tag(m):
+        tag = m.group()
+        name = m.group(1).lower()
+        if name == "a":
+            tag = fix_attribute(
+                tag,
+                "href",
+                lambda url: get_print_page_href(
+                    html.unescape(url), page_key, page_url, directory_urls, page_keys, page_hrefs
+                ),
+            )
+        elif name == "img":
+            tag = fix_attribute(tag, "src", lambda src: get_print_page_img_src(src, page_url, directory_urls))
+            if eager_images:
+                tag = remove_lazy_loading(tag)
+        elif name == "input":
+            tag = fix_attribute(tag, "id", lambda value: f"{page_key}-{value}")
+            tag = fix_attribute(tag, "name", lambda value: f"{page_key}-{value}")
+        elif name == "label":
+            tag = fix_attribute(tag, "for", lambda value: f"{page_key}-{value}")
+        else:
+            # Headings, footnotes
+            tag = fix_attribute(tag, "id", lambda value: f"{page_key}-{value}")
+        return tag
+
+    page_html = LINEAR_REWRITE_TAGS.sub(fix_tag, page_html)
+    return wrap_page(page_html, page_key, heading_number)
+
+
+def wrap_page(page_html, page_key, heading_number):
+    """
+    Wrap a page in a section with an anchor ID, for use in the print page.
+    """
+    return (
         ('<section class="print-page" id="%s" heading-number="%s">' % (page_key, heading_number))
         + page_html
         + "</section>"
     )
-
-    return page_html
@@ -1,4 +1,12 @@
+import functools
 import os
+import re
+import shutil
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from markdown.extensions.toc import slugify_unicode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
 
 
 def get_theme_name(config) -> str:
@@ -26,5 +34,82 @@ def get_theme_name(config) -> str:
         return name
 
 
-def get_section_id(section_number: str) -> str:
-    return f"section-{section_number.replace('.', '-')}"
+def get_section_id(section_titles: List[str]) -> str:
+    """
+    Get the id of a section of the navigation in the print page.
+
+    The id follows from the titles of the section and its parent sections, not from its position,
+    so it stays the same when other sections are added or removed.
+
+    Examples
+        get_section_id(['Guides', 'Getting started']) --> 'section-guides-getting-started'
+
+    Args:
+        section_titles (list): Titles of the parent sections and the section itself
+    """
+    return "section-" + slugify_unicode(" ".join(section_titles), "-")
+
+
+@functools.lru_cache(maxsize=None)
+def get_css_files() -> FrozenSet[str]:
+    """
+    Names of the CSS files shipped with this plugin.
+
+    Cached, so that multiple builds in the same process (f.e. one per language) only list the folder once.
+    """
+    return frozenset(os.listdir(os.path.join(HERE, "css")))
+
+
+def copy_asset(source_path: str, output_path: str) -> None:
+    """
+    Copy a static asset of this plugin to the site directory.
+
+    Skips the copy when the output is already up to date,
+    f.e. when several builds or print pages share the same site directory.
+    """
+    if os.path.exists(output_path):
+        source_stat = os.stat(source_path)
+        output_stat = os.stat(output_path)
+        if source_stat.st_size == output_stat.st_size and source_stat.st_mtime <= output_stat.st_mtime:
+            return
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    shutil.copyfile(source_path, output_path)
+
+
+def get_closing_tag(html: str, tag: str, position: int) -> Optional[Tuple[int, int]]:
+    """
+    Find the closing tag of an element, skipping any nested elements with the same tag.
+
+    Args:
+        html (str): The HTML
+        tag (str): Tag of the element, f.e. 'div'
+        position (int): Position right after the opening tag of the element
+
+    Returns:
+        span (tuple): Start and end of the closing tag, or None when the element is not closed
+    """
+    depth = 1
+    for m in re.finditer(rf"<(/?){tag}\b[^>]*>", html[position:], flags=re.IGNORECASE):
+        depth += -1 if m.group(1) else 1
+        if depth == 0:
+            return position + m.start(), position + m.end()
+    return None
+
+
+def remove_elements_by_class(html: str, class_names: Iterable[str]) -> str:
+    """
+    Remove the first element with each of the classes, including its content.
+
+    Examples
+        remove_elements_by_class('<div class="a b"><div>x</div></div><p>y</p>', ['b']) --> '<p>y</p>'
+    """
+    for class_name in class_names:
+        m = re.search(
+            r"<([a-zA-Z][a-zA-Z0-9-]*)\b[^>]*\bclass=\"(?:[^\"]*\s)?%s(?:\s[^\"]*)?\"[^>]*>" % re.escape(class_name), html
+        )
+        if not m:
+            continue
+        closing_tag = get_closing_tag(html, m.group(1), m.end())
+        if closing_tag:
+            html = html[: m.start()] + html[closing_tag[1] :]
+    return html
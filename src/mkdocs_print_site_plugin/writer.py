@@ -0,0 +1,253 @@
+"""
+Write the output files of the plugin in the background.
+
+Copying the static assets and writing the (large) print pages and their side files
+is mostly waiting on I/O, which can be slow on f.e. network-mounted site directories.
+The `Writer` hands these writes to a small pool of threads, so they overlap with rendering
+the next print page. Only the final `flush()` waits for all writes to finish.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple, Union
+
+from mkdocs_print_site_plugin.utils import copy_asset
+
+MAX_WORKERS = 4
+MAX_PENDING = 16
+
+DIGEST_META = '<meta name="print-site-digest" content="{}">'
+
+
+class Writer:
+    """
+    Bounded thread pool for writing files.
+
+    At most `max_pending` writes are queued or running at the same time.
+    Submitting more blocks until a write is done, which bounds the memory
+    held by content that is waiting to be written.
+
+    Usage:
+        with Writer() as writer:
+            writer.copy(source_path, output_path)
+            writer.write(output_path, html)
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        """
+        Inits the class.
+
+        Args:
+            max_workers (int): Number of threads writing files
+            max_pending (int): Maximum number of writes queued or running
+        """
+        assert max_pending >= max_workers >= 1
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="print-site-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Run a function that writes files in the background.
+
+        Can be called from multiple threads, but not from a function running in the writer itself.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def copy(self, source_path: str, output_path: str) -> Future:
+        """
+        Copy a static asset of the plugin to the site directory in the background.
+        """
+        return self.submit(copy_asset, source_path, output_path)
+
+    def write(self, path: str, content: Union[str, bytes]) -> Future:
+        """
+        Write a file in the background.
+        """
+        return self.submit(write_file, path, content)
+
+    def flush(self) -> None:
+        """
+        Wait for all writes to finish.
+
+        Raises the first error that occurred in any of the writes.
+        """
+        with self._lock:
+            futures, self._futures = self._futures, []
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            raise errors[0]
+
+    def close(self) -> None:
+        """
+        Wait for all writes to finish and stop the threads.
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't hide the original error behind errors of the writes
+            self._executor.shutdown(wait=True)
+
+
+def write_file(path: str, content: Union[str, bytes]) -> None:
+    """
+    Write a file, creating the directory if needed.
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8", errors="xmlcharrefreplace")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def get_digest(chunks: Iterable[str]) -> Tuple[str, int]:
+    """
+    Digest of the content of a file, before it is written.
+
+    Args:
+        chunks (Iterable): The content of the file, as (str) chunks
+
+    Returns:
+        digest (str): sha256 of the UTF-8 encoded content, f.e. 'sha256:9f86d0...'
+        size (int): Size of the encoded content in bytes
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode("utf-8", errors="xmlcharrefreplace")
+        sha256.update(data)
+        size += len(data)
+    return f"sha256:{sha256.hexdigest()}", size
+
+
+def is_unchanged(path: str, start: bytes, size: int) -> bool:
+    """
+    Whether a file already exists with the given size and first bytes.
+
+    Used to skip writing files that contain a digest of their content (in `start`),
+    so unchanged files keep their modification time.
+    """
+    try:
+        if os.path.getsize(path) != size:
+            return False
+        with open(path, "rb") as f:
+            return f.read(len(start)) == start
+    except OSError:
+        return False
+
+
+def get_brotli():
+    """
+    The brotli module, or None when it is not installed.
+
+    Brotli compression is optional, install with `pip install mkdocs-print-site-plugin[brotli]`.
+    """
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+
+class CompressingFile:
+    """
+    Binary file that also writes compressed copies of itself, next to it.
+
+    The copies are compressed while writing, so the (large) file is never read back.
+    A gzip copy is written to `<path>.gz`, a brotli copy to `<path>.br`.
+
+    Usage:
+        with CompressingFile("site/print_page.html", gzip_level=9) as f:
+            f.write(b"<html>...")
+    """
+
+    def __init__(self, path: str, gzip_level: Optional[int] = None, brotli_level: Optional[int] = None):
+        """
+        Inits the class.
+
+        Args:
+            path (str): Path of the file
+            gzip_level (int): Gzip compression level (0-9), or None to not write a gzip copy
+            brotli_level (int): Brotli quality (0-11), or None to not write a brotli copy
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._files = [open(path, "wb")]
+        self._brotli = None
+        if gzip_level is not None:
+            # mtime=0 so the same content always gives the same compressed file
+            self._files.append(gzip.GzipFile(path + ".gz", mode="wb", compresslevel=gzip_level, mtime=0))
+        if brotli_level is not None:
+            self._brotli_file = open(path + ".br", "wb")
+            self._brotli = get_brotli().Compressor(quality=brotli_level)
+
+    def write(self, data: bytes) -> int:
+        """
+        Write to the file and its compressed copies.
+
+        Returns:
+            size (int): Number of (uncompressed) bytes written
+        """
+        for f in self._files:
+            f.write(data)
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.process(data))
+        return len(data)
+
+    def close(self) -> None:
+        if self._brotli is not None:
+            self._brotli_file.write(self._brotli.finish())
+            self._brotli_file.close()
+        for f in self._files:
+            f.close()
+
+    def __enter__(self) -> "CompressingFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class DiscardingFile:
+    """
+    Stand-in for `CompressingFile` that only counts the bytes written.
+
+    Used when the file on disk is already up to date.
+    """
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "DiscardingFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1 @@
+<h1>{{ config.site_name }} for customers</h1>
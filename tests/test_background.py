@@ -0,0 +1,127 @@
+import gzip
+import threading
+import time
+
+import pytest
+
+from mkdocs_print_site_plugin.background import BackgroundBuilder, get_stale_marker_path
+
+
+@pytest.fixture
+def builder():
+    builder = BackgroundBuilder(delay=0.1)
+    yield builder
+    builder.close()
+
+
+def test_debounce(builder):
+    """
+    Test only the last of rapidly submitted jobs runs.
+    """
+    runs = []
+    for i in range(5):
+        builder.submit(lambda job, i=i: runs.append(i))
+    assert builder.wait(timeout=10)
+    assert runs == [4]
+
+    builder.submit(lambda job: runs.append(5))
+    assert builder.wait(timeout=10)
+    assert runs == [4, 5]
+
+
+def test_cancel(builder):
+    """
+    Test a running job is cancelled by a newer build, and does not write anymore.
+    """
+    started = threading.Event()
+    written = []
+
+    def job(job):
+        started.set()
+        while not job.cancelled:
+            time.sleep(0.01)
+        with job.writing():
+            written.append(True)
+
+    builder.submit(job)
+    assert started.wait(timeout=10)
+    builder.cancel()
+    assert builder.wait(timeout=10)
+    assert written == []
+
+    # A pending job is dropped
+    builder.submit(lambda job: written.append(True))
+    builder.cancel()
+    assert builder.wait(timeout=10)
+    assert written == []
+
+
+def test_cancel_waits_for_writes(builder):
+    """
+    Test cancelling waits for a write that already started.
+    """
+    writing = threading.Event()
+    written = []
+
+    def job(job):
+        with job.writing():
+            writing.set()
+            time.sleep(0.2)
+            written.append(True)
+        job.check()
+
+    builder.submit(job)
+    assert writing.wait(timeout=10)
+    builder.cancel()
+    assert written == [True]
+    assert builder.wait(timeout=10)
+
+
+def test_mark_stale(builder, tmp_path):
+    """
+    Test the previous version of a print page is written with a banner.
+    """
+    path = str(tmp_path / "print_page" / "index.html")
+    assert not builder.mark_stale([path])
+
+    (tmp_path / "print_page").mkdir()
+    (tmp_path / "print_page" / "index.html").write_text('<html><body class="a"><p>é</p></body></html>', encoding="utf-8")
+    builder.keep(path)
+    (tmp_path / "print_page" / "index.html").unlink()
+
+    assert builder.mark_stale([path])
+    html = (tmp_path / "print_page" / "index.html").read_text(encoding="utf-8")
+    assert html.startswith('<html><body class="a">\n<div class="print-site-stale-banner"')
+    assert 'fetch("index.html.stale"' in html
+    assert html.endswith("<p>é</p></body></html>")
+    assert (tmp_path / "print_page" / "index.html.stale").exists()
+
+    # Writing the regenerated print page removes the marker
+    builder.keep(path)
+    assert not (tmp_path / "print_page" / "index.html.stale").exists()
+    assert get_stale_marker_path("site/print_page.html") == "site/print_page.html.stale"
+
+
+def test_mark_stale_side_files(builder, tmp_path):
+    """
+    Test the side files of a print page are restored with its stale version.
+    """
+    path = tmp_path / "index.html"
+    path.write_text("<html><body>print page</body></html>")
+    search_index_path = tmp_path / "index.search.json"
+    search_index_path.write_text("{}")
+    gzip_path = tmp_path / "index.html.gz"
+    gzip_path.write_bytes(b"old")
+    side_files = [str(search_index_path), str(gzip_path), str(tmp_path / "missing.json")]
+    builder.keep(str(path), side_files)
+
+    # The site directory is cleaned by a new build
+    for p in [path, search_index_path, gzip_path]:
+        p.unlink()
+
+    assert builder.mark_stale([str(path)])
+    assert search_index_path.read_text() == "{}"
+    assert not (tmp_path / "missing.json").exists()
+    # The compressed copy is of the stale print page
+    assert gzip.decompress(gzip_path.read_bytes()) == path.read_bytes()
+    assert b"print-site-stale-banner" in path.read_bytes()
@@ -22,10 +22,22 @@ os.mkdir(tmp_path)
 
 import re
 import os
+import json
+import zipfile
+from xml.dom import minidom
+import gzip
+import hashlib
 import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from click.testing import CliRunner
 from mkdocs.__main__ import build_command
+from mkdocs.commands.build import build
+from mkdocs.config import load_config
+
+from mkdocs_print_site_plugin.rebuild import main as rebuild_main
+from mkdocs_print_site_plugin.writer import get_brotli
 
 
 def setup_clean_mkdocs_folder(mkdocs_yml_path, output_path):
@@ -166,10 +178,594 @@ def test_basic_build(tmp_path):
 
     # Make sure all 3 pages are combined and present
     assert text_in_page(
-        prj_path, "print_page/index.html", '<h1 id="index-homepage">Homepage'
+        prj_path, "print_page/index.html", '<h1 heading-number="1" id="index-homepage">Homepage'
+    )
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="2" id="a-a">A<')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="8" id="z-z">Z')
+
+    # Heading enumeration is done with a generic stylesheet instead of inline rules per page
+    assert text_in_page(prj_path, "print_page/index.html", "css/print-site-enum-headings.css")
+    assert (prj_path / "site" / "css" / "print-site-enum-headings.css").exists()
+    assert not text_in_page(prj_path, "print_page/index.html", "content: '1 '")
+
+    # Images are not lazy loaded in the print page
+    assert text_in_page(prj_path, "print_page/index.html", 'src="https://dummyimage.com')
+    assert not text_in_page(prj_path, "print_page/index.html", 'loading="lazy"')
+    assert not text_in_page(prj_path, "print_page/index.html", r"load_images_when_printing\(\);")
+
+
+def test_lazy_images(tmp_path):
+    """
+    Test images are lazy loaded until the page is printed, with the 'eager_images' option disabled.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_lazy_images.yml")
+    assert text_in_page(prj_path, "print_page/index.html", 'loading="lazy" src="https://dummyimage.com')
+    assert text_in_page(prj_path, "print_page/index.html", r"load_images_when_printing\(\);")
+
+
+def test_enumerate_in_html(tmp_path):
+    """
+    Test enumeration numbers are inserted in the HTML instead of using CSS counters.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_enumerate_in_html.yml")
+
+    assert text_in_page(
+        prj_path, "print_page/index.html", '<h3 id="a-third-level-heading"><span class="print-site-heading-number">3.1.1 </span>'
     )
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="a-a">A<')
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="z-z">Z')
+    assert text_in_page(prj_path, "print_page/index.html", "<span class='print-site-heading-number'>4 </span>Section")
+    assert not text_in_page(prj_path, "print_page/index.html", "print-site-enumerate-headings")
+    assert not text_in_page(prj_path, "print_page/index.html", "print-site-enum-headings.css")
+
+
+def test_enumerate_figures_profiles(tmp_path):
+    """
+    Test figures are numbered per print page, without counting the figures of excluded pages.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_enumerate_figures_profiles.yml")
+
+    figure = '<figcaption><span class="print-site-figure-number">Figure %d: </span>%s'
+    assert text_in_page(prj_path, "print_page/index.html", figure % (2, "Second figure of Z"))
+    assert text_in_page(prj_path, "print_page/index.html", figure % (3, "Figure of A"))
+    # The customer profile leaves out page Z and its figures
+    assert not text_in_page(prj_path, "print_page_customer/index.html", "figure of Z")
+    assert text_in_page(prj_path, "print_page_customer/index.html", figure % (1, "Figure of A"))
+
+
+def test_manifest(tmp_path):
+    """
+    Test the manifest describes where each page is in the print page.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_manifest.yml")
+
+    manifest_path = prj_path / "site" / "print_page" / "index.manifest.json"
+    assert manifest_path.exists()
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_bytes()
+
+    sections = {s["key"]: s for s in manifest["sections"]}
+    assert [s["key"] for s in manifest["sections"]] == ["index", "z", "a", "section-section", "subsection1", "subsection2"]
+    assert sections["subsection1"]["parent"] == "section-section"
+    assert sections["a"]["heading_number"] == "3"
+    assert "a-sub-one" in sections["a"]["anchors"]
+
+    # Byte offsets point to the right slices of the print page
+    a = sections["a"]
+    assert print_page[a["start"] : a["end"]].startswith(b'<section class="print-page" id="a"')
+    assert print_page[a["start"] : a["end"]].endswith(b"</section>")
+    section = sections["section-section"]
+    assert section["start"] < sections["subsection2"]["end"] <= section["end"]
+    assert print_page[manifest["content"]["start"] :].startswith(b'<div id="print-site-page"')
+
+    assert manifest["toc"][3]["id"] == "section-section"
+    assert manifest["toc"][3]["children"][0]["id"] == "subsection1"
+
+
+def test_manifest_theme_fallback(tmp_path):
+    """
+    Test the manifest of a print page whose theme includes the content more than once.
+    """
+    prj_path = setup_clean_mkdocs_folder("tests/fixtures/projects/basic/mkdocs_manifest_content_twice.yml", tmp_path)
+    result = build_docs_setup(prj_path)
+    assert result.exit_code == 0, result.exception
+    assert "does not include the content of print page 'print_page.md' exactly once" in result.output
+    assert text_in_page(prj_path, "print_page/index.html", '<template id="content-copy">')
+
+    # The sections are described, without byte offsets
+    manifest = json.loads((prj_path / "site" / "print_page" / "index.manifest.json").read_text(encoding="utf-8"))
+    assert [s["key"] for s in manifest["sections"]] == ["index", "z", "a", "section-section", "subsection1", "subsection2"]
+    assert all(s["start"] is None and s["end"] is None for s in manifest["sections"])
+    assert manifest["content"]["start"] is None
+
+
+def test_compact_anchors(tmp_path):
+    """
+    Test the print page uses short page keys, with consistent ids and links.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_compact_anchors.yml")
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+    manifest = json.loads((prj_path / "site" / "print_page" / "index.manifest.json").read_text(encoding="utf-8"))
+
+    # The manifest has the full page keys
+    pages = {s["page_key"]: s for s in manifest["sections"] if s["kind"] == "page"}
+    assert sorted(pages) == ["a", "index", "subsection1", "subsection2", "z"]
+    a_key = pages["a"]["key"]
+    assert a_key.startswith("p") and len(a_key) == 5
+    assert f'<section class="print-page" id="{a_key}"' in print_page
+    assert f"{a_key}-anchor-links" in pages["a"]["anchors"]
+
+    # Every link within the print page points to an id in the print page
+    ids = set(re.findall(r"\sid=[\"']([^\"']*)[\"']", print_page))
+    links = set(re.findall(r"href=[\"']#([^\"']+)[\"']", print_page))
+    assert f"{a_key}-anchor-links" in links
+    assert links - ids == set()
+    assert not re.search(r'id="a-', print_page)
+
+
+def test_minify_print_page(tmp_path):
+    """
+    Test the print page is minified, without changing code blocks.
+    """
+    prj_path = check_build(tmp_path, "with_markdown_ext/mkdocs_minify.yml")
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+    assert "headerlink" not in print_page
+    assert "<!-- " not in print_page
+    assert not re.search(r">\s*\n\s*\n", print_page.split("<pre")[0])
+
+    # Code blocks keep their whitespace
+    prj_path_full = check_build(tmp_path / "full", "with_markdown_ext/mkdocs.yml")
+    print_page_full = (prj_path_full / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+    code_blocks = re.findall(r"<pre\b.*?</pre>", print_page_full, flags=re.DOTALL)
+    assert code_blocks
+    assert re.findall(r"<pre\b.*?</pre>", print_page, flags=re.DOTALL) == code_blocks
+    assert len(print_page) < len(print_page_full)
+
+    # The manifest points to the minified pages
+    manifest = json.loads((prj_path / "site" / "print_page" / "index.manifest.json").read_text(encoding="utf-8"))
+    data = print_page.encode("utf-8")
+    for section in manifest["sections"]:
+        assert data[section["start"] : section["end"]].endswith(b"</section>")
+
+
+def test_epub(tmp_path):
+    """
+    Test an EPUB is written next to the print page, with a chapter per page and section.
+    """
+    prj_path = check_build(tmp_path, "relative_images/mkdocs_epub.yml")
+    epub_path = prj_path / "site" / "print_page" / "index.epub"
+    assert epub_path.exists()
+
+    with zipfile.ZipFile(epub_path) as epub:
+        names = epub.namelist()
+        assert names[0] == "mimetype"
+        chapters = [name for name in names if name.startswith("EPUB/chapter-")]
+        assert len(chapters) == 8
+        for name in chapters + ["EPUB/nav.xhtml", "EPUB/package.opf"]:
+            minidom.parseString(epub.read(name))
+
+        # Every image of the site is packaged once
+        images = [name for name in names if name.startswith("EPUB/images/")]
+        assert len(images) == 5
+        package = epub.read("EPUB/package.opf").decode("utf-8")
+        for image in images:
+            assert package.count(image[len("EPUB/") :]) == 1
+
+        # Links between pages point to the chapter of the page
+        chapter = epub.read("EPUB/chapter-0007.xhtml").decode("utf-8")
+        assert '<a href="chapter-0004.xhtml#chapter1-section1">' in chapter
+
+
+def test_purge_css(tmp_path):
+    """
+    Test the print page links stylesheets without the rules it does not use.
+    """
+    prj_path = check_build(tmp_path, "with_markdown_ext/mkdocs_purge_css.yml")
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+    m = re.search(r'href="\.\./(assets/stylesheets/main\.[0-9a-f]+\.min)\.print-[0-9a-f]{12}\.css"', print_page)
+    assert m
+
+    # Other pages keep the full stylesheet
+    assert text_in_page(prj_path, "index.html", m.group(1) + '.css"')
+    assert not text_in_page(prj_path, "index.html", ".min.print-")
+    # The stylesheets of the plugin are kept as they are
+    assert text_in_page(prj_path, "print_page/index.html", 'href="../css/print-site.css"')
+
+    stylesheets = prj_path / "site" / "assets" / "stylesheets"
+    full_css = (stylesheets / (os.path.basename(m.group(1)) + ".css")).read_text(encoding="utf-8")
+    purged_css = next(stylesheets.glob("*.print-*.css")).read_text(encoding="utf-8")
+    assert len(purged_css) < len(full_css)
+    assert ".md-typeset .admonition" in purged_css
+    assert ".md-search__input" in full_css
+    assert ".md-search__input" not in purged_css
+    assert purged_css.count("{") == purged_css.count("}")
+
+    # The purged stylesheet is cached
+    assert list((prj_path / ".cache" / "plugin" / "print-site" / "purged-css").glob("*.css"))
+
+
+def test_precompress(tmp_path):
+    """
+    Test compressed copies of the print page are written next to it.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_precompress.yml")
+
+    print_page_path = prj_path / "site" / "print_page" / "index.html"
+    print_page = print_page_path.read_bytes()
+    assert gzip.decompress(print_page_path.with_name("index.html.gz").read_bytes()) == print_page
+
+    brotli = get_brotli()
+    if brotli is not None:
+        assert brotli.decompress(print_page_path.with_name("index.html.br").read_bytes()) == print_page
+    else:
+        assert not print_page_path.with_name("index.html.br").exists()
+
+
+def test_digest(tmp_path):
+    """
+    Test the print page is reproducible and has a digest of its content.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_manifest.yml")
+
+    print_page_path = prj_path / "site" / "print_page" / "index.html"
+    manifest_path = prj_path / "site" / "print_page" / "index.manifest.json"
+    print_page = print_page_path.read_bytes().decode("utf-8")
+    digest = re.search(r'<meta name="print-site-digest" content="(sha256:[0-9a-f]{64})">', print_page).group(1)
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["digest"] == digest
+
+    # The digest covers the print page, except the meta tag itself
+    print_page = print_page.replace(f'<meta name="print-site-digest" content="{digest}">', "")
+    assert digest == "sha256:" + hashlib.sha256(print_page.encode("utf-8")).hexdigest()
+
+    # Building again gives exactly the same output
+    prj_path2 = check_build(tmp_path / "again", "basic/mkdocs_manifest.yml")
+    assert (prj_path2 / "site" / "print_page" / "index.html").read_bytes() == print_page_path.read_bytes()
+
+
+def test_track_changes(tmp_path):
+    """
+    Test the manifest lists the sections that changed since the previous build.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_track_changes.yml")
+    manifest_path = prj_path / "site" / "print_page" / "index.manifest.json"
+
+    # The first build has no previous build to compare with
+    changes = json.loads(manifest_path.read_text(encoding="utf-8"))["changes"]
+    assert not changes["previous_build"]
+    assert changes["changed_sections"] == ["index", "z", "a", "section-section"]
+    assert (prj_path / ".cache" / "plugin" / "print-site" / "print_page.json").exists()
+
+    # Nothing changed
+    assert build_docs_setup(prj_path).exit_code == 0
+    changes = json.loads(manifest_path.read_text(encoding="utf-8"))["changes"]
+    assert changes["previous_build"]
+    assert changes["changed_sections"] == []
+    assert changes["changed_pages"] == []
+
+    # Change a page in a section
+    with open(prj_path / "docs" / "subsection2.md", "a", encoding="utf-8") as f:
+        f.write("\nAn extra paragraph.\n")
+    assert build_docs_setup(prj_path).exit_code == 0
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["changes"]["changed_sections"] == ["section-section"]
+    assert manifest["changes"]["changed_pages"] == ["subsection2"]
+    assert manifest["changes"]["removed_sections"] == []
+    assert all(section["digest"].startswith("sha256:") for section in manifest["sections"])
+
+    # The manifest is written without changing the configuration of the plugin
+    with LOAD_CONFIG_LOCK:
+        config = load_config(config_file=str(prj_path / "mkdocs.yml"))
+    config = config.plugins.on_config(config)
+    plugin = config.plugins["print-site"]
+    assert plugin.build.write_manifest
+    assert plugin.config["add_manifest"] is False
+
+
+def test_search_index(tmp_path):
+    """
+    Test a search index of the print page is written, and loaded by the print page.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_search_index.yml")
+
+    search_index_path = prj_path / "site" / "print_page" / "index.search.json"
+    search_index = json.loads(search_index_path.read_text(encoding="utf-8"))
+    assert ["a-sub-one", "sub one"] in search_index["docs"]
+    assert all(anchor for anchor, _ in search_index["docs"])
+    assert text_in_page(prj_path, "print_page/index.html", 'data-index="index.search.json"')
+    assert (prj_path / "site" / "js" / "print-site-search.js").exists()
+    assert not text_in_page(prj_path, "index.html", "print-site-search.js")
+
+
+def test_large_pages(tmp_path):
+    """
+    Test the print page can link to large pages instead of including them.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_large_pages.yml")
+
+    # z.md is larger than the threshold
+    assert text_in_page(prj_path, "print_page/index.html", '<section class="print-page" id="z" heading-number="2">')
+    assert text_in_page(prj_path, "print_page/index.html", 'see <a href="../z/">Page Z</a>')
+    assert not text_in_page(prj_path, "print_page/index.html", 'id="z-lorem-ipsum"')
+    # Other pages are included
+    assert text_in_page(prj_path, "print_page/index.html", '<h2 heading-number="3" id="a-sub-one">')
+
+
+def test_deduplicate_blocks(tmp_path):
+    """
+    Test content included in multiple pages is only once in the print page.
+    """
+    prj_path = check_build(tmp_path, "snippets/mkdocs_deduplicate.yml")
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+
+    assert print_page.count("This documentation is provided as is") == 1
+    assert print_page.count("Some content from include") == 1
+    assert '<div id="print-site-block-2" class="admonition warning">' in print_page
+    # The admonition and the table are replaced by a single reference
+    assert print_page.count('See <a href="#print-site-block-2">section 1 Home</a>.') == 1
+
+    # The pages themselves are not changed
+    assert text_in_page(prj_path, "other/index.html", "This documentation is provided as is")
+
+
+def test_plugin_integrations(tmp_path):
+    """
+    Test pages are post-processed for other plugins that change pages after the print page is rendered.
+    """
+    prj_path = check_build(tmp_path, "integrations/mkdocs.yml")
+    print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+
+    # mkdocs-autorefs: references point to anchors in the print page
+    assert 'title="Installation" href="#index-installation">the installation</a>' in print_page
+    # mkdocs-drawio: the diagram is rendered, and the viewer is loaded once at the end
+    assert '<div class="mxgraph"' in print_page
+    assert print_page.count("viewer-static.min.js") == 1
+    assert print_page.rstrip().endswith('<script src="https://viewer.diagrams.net/js/viewer-static.min.js"></script></body>\n</html>')
+    # mkdocs-charts-plugin
+    assert "var mkdocs_chart_plugin" in print_page
+    # Pages without diagrams are not changed
+    assert '<section class="print-page" id="references" heading-number="3">' in print_page
+
+
+def test_slim_theme_context(tmp_path):
+    """
+    Test the print page is rendered without the site navigation, with the 'slim_theme_context' option.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_slim_theme_context.yml")
+
+    # The pages have the site navigation
+    assert text_in_page(prj_path, "a/index.html", "md-sidebar--primary")
+
+    # The print page only has the table of contents of the print page
+    assert not text_in_page(prj_path, "print_page/index.html", "md-sidebar--primary")
+    assert not text_in_page(prj_path, "print_page/index.html", 'class="md-nav__link" href="../a/"')
+    assert text_in_page(prj_path, "print_page/index.html", "md-sidebar--secondary")
+
+    # The mkdocs theme, without the navigation bar
+    prj_path = check_build(tmp_path / "mkdocs", "basic/mkdocs_slim_theme_context_mkdocs.yml")
+    assert text_in_page(prj_path, "a/index.html", 'class="navbar fixed-top')
+    assert not text_in_page(prj_path, "print_page/index.html", 'class="navbar fixed-top')
+    assert text_in_page(prj_path, "print_page/index.html", 'id="toc-collapse"')
+
+    # By default, the theme is rendered with the full context
+    prj_path = check_build(tmp_path / "default", "basic/mkdocs_manifest.yml")
+    assert text_in_page(prj_path, "print_page/index.html", "md-sidebar--primary")
+
+
+LOAD_CONFIG_LOCK = threading.Lock()
+
+
+def build_docs_api(testproject_path):
+    """
+    Runs a MkDocs build with the python API.
+
+    Unlike `build_docs_setup()`, this does not change the working directory,
+    so it can be used to run builds in parallel threads.
+    Loading the configuration is not thread-safe in MkDocs, so only the builds run in parallel.
+    """
+    with LOAD_CONFIG_LOCK:
+        config = load_config(config_file=str(testproject_path / "mkdocs.yml"))
+    config.plugins.on_startup(command="build", dirty=False)
+    try:
+        build(config)
+    finally:
+        config.plugins.on_shutdown()
+
+
+def test_parallel_builds(tmp_path):
+    """
+    Test builds running in parallel in the same process give the same output as serial builds.
+    """
+    projects = [
+        "basic/mkdocs.yml",
+        "basic/mkdocs_profiles.yml",
+        "basic/mkdocs_section_print_pages.yml",
+        "basic/mkdocs_enumerate_in_html.yml",
+        "basic/mkdocs_manifest.yml",
+        "with_markdown_ext/mkdocs.yml",
+        "nested_sections/mkdocs.yml",
+        "basic/mkdocs_no_directory_urls.yml",
+    ]
+
+    def setup(name, i):
+        return setup_clean_mkdocs_folder(
+            f"tests/fixtures/projects/{projects[i % len(projects)]}", tmp_path / f"{name}-{i}"
+        )
+
+    def outputs(prj_path):
+        # All print pages and their side files
+        site = prj_path / "site"
+        return {
+            str(path.relative_to(site)): path.read_bytes()
+            for path in sorted(site.rglob("*"))
+            if path.is_file() and "print_page" in str(path.relative_to(site))
+        }
+
+    serial = []
+    for i in range(len(projects)):
+        prj_path = setup("serial", i)
+        build_docs_api(prj_path)
+        serial.append(outputs(prj_path))
+
+    # Run every project twice, all at the same time
+    parallel_paths = [setup("parallel", i) for i in range(2 * len(projects))]
+    with ThreadPoolExecutor(max_workers=len(parallel_paths)) as executor:
+        list(executor.map(build_docs_api, parallel_paths))
+
+    for i, prj_path in enumerate(parallel_paths):
+        assert outputs(prj_path) == serial[i % len(projects)], projects[i % len(projects)]
+        assert serial[i % len(projects)]
+
+
+def test_build_in_background(tmp_path):
+    """
+    Test the print pages are regenerated in the background during `mkdocs serve`.
+    """
+    from mkdocs_print_site_plugin.background import get_background_builder
+
+    prj_path = setup_clean_mkdocs_folder("tests/fixtures/projects/basic/mkdocs_build_in_background.yml", tmp_path)
+    site_dir = str(prj_path / "site")
+
+    def serve_build():
+        # Like `mkdocs serve`, which loads the configuration for every build
+        with LOAD_CONFIG_LOCK:
+            config = load_config(config_file=str(prj_path / "mkdocs.yml"), site_dir=site_dir)
+        build(config, serve_url="http://127.0.0.1:8000/")
+        return config
+
+    # The first build writes the print pages, before the server starts
+    config = serve_build()
+    server = object()
+    assert config.plugins.on_serve(server, config=config, builder=serve_build) is server
+    background = get_background_builder(site_dir)
+    try:
+        assert text_in_page(prj_path, "print_page/index.html", "This is page Z")
+        assert not text_in_page(prj_path, "print_page/index.html", "print-site-stale-banner")
+
+        # Later builds show the previous print pages as stale, until they are regenerated
+        z_md = prj_path / "docs" / "z.md"
+        z_md.write_text(z_md.read_text().replace("This is page Z", "This is the new page Z"))
+        background.delay = 10
+        serve_build()
+        for page in ["print_page/index.html", "print_page_customer/index.html"]:
+            assert text_in_page(prj_path, page, "print-site-stale-banner")
+            assert (prj_path / "site" / (page + ".stale")).exists()
+        assert text_in_page(prj_path, "print_page/index.html", "This is page Z")
+        assert text_in_page(prj_path, "z/index.html", "This is the new page Z")
+        # The files the stale print pages link to are still there
+        assert (prj_path / "site" / "print_page" / "index.search.json").exists()
+        print_page = (prj_path / "site" / "print_page" / "index.html").read_text(encoding="utf-8")
+        purged_css = re.findall(r'href="\.\./(assets/stylesheets/[^"]+\.print-[0-9a-f]{12}\.css)"', print_page)
+        assert purged_css
+        assert all((prj_path / "site" / css_path).exists() for css_path in purged_css)
+
+        # Rapid rebuilds supersede the pending regeneration
+        background.delay = 0.1
+        serve_build()
+        assert background.wait(timeout=60)
+        for page in ["print_page/index.html", "print_page_customer/index.html"]:
+            assert not text_in_page(prj_path, page, "print-site-stale-banner")
+            assert not (prj_path / "site" / (page + ".stale")).exists()
+        assert text_in_page(prj_path, "print_page/index.html", "This is the new page Z")
+        assert not text_in_page(prj_path, "print_page_customer/index.html", "page Z")
+        assert (prj_path / "site" / "print_page" / "index.search.json").exists()
+    finally:
+        background.close()
+
+
+def test_rebuild(tmp_path):
+    """
+    Test rebuilding the print page from a built site gives the same print page as a full build.
+    """
+    projects = [
+        "basic/mkdocs.yml",
+        "basic/mkdocs_readthedocs.yml",
+        "basic/mkdocs_weird_nav.yml",
+        "basic/mkdocs_section_print_pages.yml",
+        "mkdocs_material_tags/mkdocs.yml",
+    ]
+    for i, project in enumerate(projects):
+        prj_path = check_build(tmp_path / str(i), project)
+        print_pages = sorted((prj_path / "site").glob("print_page*/index.html"))
+        built = [p.read_bytes() for p in print_pages]
+        for p in print_pages:
+            p.unlink()
+
+        # The markdown of the pages is not needed
+        for md in (prj_path / "docs").rglob("*.md"):
+            md.write_text("")
+
+        assert rebuild_main(["-f", str(prj_path / "mkdocs.yml"), "-j", str(1 + i % 2)]) == 0
+        rebuilt = [p.read_bytes() for p in print_pages]
+        if project.startswith("mkdocs_material_tags"):
+            # The tags are taken from the built page, where mkdocs-material sorts them
+            assert b"<span class='md-tag'>CSS</span><span class='md-tag'>HTML5</span>" in rebuilt[0]
+            tags_regex = re.compile(rb"<nav class='md-tags'>.*?</nav>|<meta name=\"print-site-digest\"[^>]*>")
+            built, rebuilt = [tags_regex.sub(b"", p) for p in built], [tags_regex.sub(b"", p) for p in rebuilt]
+        assert rebuilt == built, project
+
+    # Options of the print page can be changed without building the site again
+    mkdocs_yml = prj_path / "mkdocs.yml"
+    mkdocs_yml.write_text(mkdocs_yml.read_text().replace("print-site:", "print-site:\n        toc_depth: 1"))
+    assert rebuild_main(["-f", str(mkdocs_yml)]) == 0
+    assert text_in_page(prj_path, "print_page/index.html", 'data-toc-depth="1"')
+
+
+def test_rebuild_unsupported_theme(tmp_path):
+    """
+    Test rebuilding fails for themes where the page content cannot be found.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_windmill.yml")
+    assert rebuild_main(["-f", str(prj_path / "mkdocs.yml")]) == 1
+
+
+def test_section_print_pages(tmp_path):
+    """
+    Test a separate print page is created for every top-level section.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_section_print_pages.yml")
+
+    # The print page of the entire site
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="1" id="index-homepage">')
+
+    # Print pages per section are numbered from 1 and only contain the section pages
+    assert text_in_page(prj_path, "print_page_section/index.html", '<h1 heading-number="1" id="subsection1-subsec-1">')
+    assert not text_in_page(prj_path, "print_page_section/index.html", 'id="index-homepage"')
+    assert text_in_page(prj_path, "print_page_other-section/index.html", '<h1 heading-number="1" id="a-a">')
+    assert text_in_page(prj_path, "print_page_other-section/index.html", 'id="print-site-cover-page"')
+
+    # Assets are shared
+    assert text_in_page(prj_path, "print_page_other-section/index.html", 'href="../css/print-site.css"')
+
+    # Links to pages in other sections point to the print page of the entire site
+    section_page = (prj_path / "site" / "print_page_section" / "index.html").read_text(encoding="utf-8")
+    assert 'href="#subsection2"' in section_page
+    m = re.search(r'href="(\.\./print_page/)#(a-sub-one)"', section_page)
+    assert m
+    target = (prj_path / "site" / "print_page_section" / m.group(1) / "index.html").resolve()
+    assert f'id="{m.group(2)}"' in target.read_text(encoding="utf-8")
+    assert 'href="#a-sub-one"' not in section_page
+
+
+def test_profiles(tmp_path):
+    """
+    Test a print page is created for every profile, each with their own excluded pages.
+    """
+    prj_path = check_build(tmp_path, "basic/mkdocs_profiles.yml")
+
+    # Code 'd1231dct9dkqwn2' is in subfolder/anotherpage.md
+    assert not text_in_page(prj_path, "print_page/index.html", "d1231dct9dkqwn2")
+    assert text_in_page(prj_path, "print_page/index.html", 'id="z-z"')
+
+    assert text_in_page(prj_path, "print_page_internal/index.html", "d1231dct9dkqwn2")
+    assert text_in_page(prj_path, "print_page_internal/index.html", 'id="z-z"')
+
+    assert not text_in_page(prj_path, "print_page_customer/index.html", "d1231dct9dkqwn2")
+    assert not text_in_page(prj_path, "print_page_customer/index.html", 'id="z-z"')
+    assert text_in_page(prj_path, "print_page_customer/index.html", "<h1>Test for customers</h1>")
+    assert text_in_page(prj_path, "print_page_customer/index.html", "<title>Customer manual")
+
+    # Headings are numbered the same in every profile
+    assert text_in_page(prj_path, "print_page_customer/index.html", '<h1 heading-number="2" id="a-a">')
+    assert text_in_page(prj_path, "print_page_internal/index.html", '<h1 heading-number="2" id="a-a">')
 
 
 def test_basic_build2(tmp_path):
@@ -186,10 +782,10 @@ def test_basic_build2(tmp_path):
 
     # Make sure all 3 pages are combined and present
     assert text_in_page(
-        prj_path, "print_page.html", '<h1 id="index-homepage">Homepage</h1>'
+        prj_path, "print_page.html", '<h1 heading-number="1" id="index-homepage">Homepage</h1>'
     )
-    assert text_in_page(prj_path, "print_page.html", '<h1 id="a-a">A</h1>')
-    assert text_in_page(prj_path, "print_page.html", '<h1 id="z-z">Z</h1>')
+    assert text_in_page(prj_path, "print_page.html", '<h1 heading-number="3" id="a-a">A</h1>')
+    assert text_in_page(prj_path, "print_page.html", '<h1 heading-number="2" id="z-z">Z</h1>')
 
 
 def test_basic_build3(tmp_path):
@@ -203,10 +799,10 @@ def test_basic_build3(tmp_path):
 
     # Make sure all 3 pages are combined and present
     assert text_in_page(
-        prj_path, "print_page/index.html", '<h1 id="index-homepage">Homepage</h1>'
+        prj_path, "print_page/index.html", '<h1 heading-number="1" id="index-homepage">Homepage</h1>'
     )
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="a-a">A</h1>')
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="z-z">Z</h1>')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="3" id="a-a">A</h1>')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="2" id="z-z">Z</h1>')
 
 
 def test_basic_build4(tmp_path):
@@ -224,10 +820,10 @@ def test_basic_build4(tmp_path):
 
     # Make sure all 3 pages are combined and present
     assert text_in_page(
-        prj_path, "print_page/index.html", '<h1 id="index-homepage">Homepage</h1>'
+        prj_path, "print_page/index.html", '<h1 heading-number="1" id="index-homepage">Homepage</h1>'
     )
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="a-a">A</h1>')
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="z-z">Z</h1>')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="3" id="a-a">A</h1>')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="2" id="z-z">Z</h1>')
 
 
 def test_basic_build5(tmp_path):
@@ -326,7 +922,7 @@ def test_basic_build99(tmp_path):
 
     # Make sure all 3 pages are combined and present
     assert text_in_page(
-        prj_path, "print_page/index.html", '<h1 id="index-homepage">Homepage'
+        prj_path, "print_page/index.html", '<h1 heading-number="1" id="index-homepage">Homepage'
     )
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="a-a">A')
-    assert text_in_page(prj_path, "print_page/index.html", '<h1 id="z-z">Z')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="3" id="a-a">A')
+    assert text_in_page(prj_path, "print_page/index.html", '<h1 heading-number="2" id="z-z">Z')
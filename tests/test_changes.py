@@ -0,0 +1,54 @@
+from mkdocs_print_site_plugin.changes import get_cache_path, get_changes, get_digests, load_digests, save_digests
+from tests.test_document import make_document
+
+
+def test_digests():
+    """
+    Test the digest of a section covers its pages.
+    """
+    document = make_document()
+    digests = get_digests(document)
+    keys = {node.key: digests[node] for node in document.walk()}
+    # Digests only depend on the HTML
+    assert keys == {node.key: digest for node, digest in get_digests(make_document()).items()}
+
+    page_b = document.pages()[1]
+    page_b.html = '<h1 id="b-b">B changed</h1>'
+    changed = {node.key: digest for node, digest in get_digests(document).items()}
+    assert changed["a"] == keys["a"]
+    assert changed["b"] != keys["b"]
+    assert changed["section-2"] != keys["section-2"]
+
+
+def test_changes(tmp_path):
+    """
+    Test.
+    """
+    path = get_cache_path(str(tmp_path / "cache"), "print_page.md")
+    assert path == str(tmp_path / "cache" / "print_page.json")
+    assert load_digests(path) is None
+
+    document = make_document()
+    digests = get_digests(document)
+    changes = get_changes(document, digests, None)
+    assert changes == {
+        "previous_build": False,
+        "changed_sections": ["a", "section-2"],
+        "removed_sections": [],
+        "changed_pages": ["a", "b"],
+    }
+
+    save_digests(document, digests, path)
+    previous = load_digests(path)
+    assert get_changes(document, digests, previous)["changed_sections"] == []
+
+    # Remove a page and change another
+    document.sections = document.sections[1:]
+    document.pages()[0].html = "<h1>B2</h1>"
+    changes = get_changes(document, get_digests(document), previous)
+    assert changes == {
+        "previous_build": True,
+        "changed_sections": ["section-2"],
+        "removed_sections": ["a"],
+        "changed_pages": ["b"],
+    }
@@ -0,0 +1,79 @@
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.dedup import deduplicate, get_blocks
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+
+NOTICE = "<p>This is a notice that is included in many pages. " + "It is long enough to be worth replacing. " * 3 + "</p>"
+TABLE = "<table>" + "<tr><td>Some table</td><td>that is included in many pages</td></tr>" * 3 + "</table>"
+
+
+def make_page(key, heading_number, html):
+    return PrintSection(
+        "page",
+        key=key,
+        heading_number=heading_number,
+        title=key.upper(),
+        level=0,
+        html=f'<section class="print-page" id="{key}">{html}</section>',
+    )
+
+
+def test_get_blocks():
+    """
+    Test.
+    """
+    page_html = '<section><h1 id="a">A</h1>\n<p>b<br>c</p><!-- <p> --><div><div>d</div></div></section>'
+    blocks = get_blocks(page_html)
+    assert [(tag, page_html[start:end]) for start, end, tag in blocks] == [
+        ("h1", '<h1 id="a">A</h1>'),
+        ("p", "<p>b<br>c</p>"),
+        ("div", "<div><div>d</div></div>"),
+    ]
+
+    # The content of scripts is not parsed
+    page_html = '<section><script>var p = "</p><div>";</script><p>a</p></section>'
+    assert [tag for _, _, tag in get_blocks(page_html)] == ["script", "p"]
+
+
+def test_deduplicate():
+    """
+    Test repeated blocks are replaced with a link to the first occurrence.
+    """
+    page_a = make_page("a", "1", f'<h1 id="a-a">A</h1>{NOTICE}\n{TABLE}<p>short</p>')
+    page_b = make_page("b", "2", f'<h1 id="b-b">B</h1>{NOTICE}\n{TABLE}<p>short</p><p id="b-id">{NOTICE}</p>')
+    page_c = make_page("c", "3", f'<h1 id="c-c">C</h1>{TABLE}')
+    document = PrintDocument([page_a, page_b, page_c], TableOfContents([]))
+
+    n_blocks, bytes_saved = deduplicate(document, min_size=20)
+    assert n_blocks == 3
+    assert bytes_saved > 0
+
+    # The first occurrence gets an id
+    assert '<p id="print-site-block-1">This is a notice' in page_a.html
+    assert '<table id="print-site-block-2">' in page_a.html
+
+    # Consecutive repeated blocks are replaced by a single reference, short blocks and blocks with an id are kept
+    reference = '<p class="print-site-duplicate">See <a href="#print-site-block-{}">section 1 A</a>.</p>'
+    assert page_b.html == (
+        f'<section class="print-page" id="b"><h1 id="b-b">B</h1>{reference.format(1)}'
+        f'<p>short</p><p id="b-id">{NOTICE}</p></section>'
+    )
+    assert page_c.html == f'<section class="print-page" id="c"><h1 id="c-c">C</h1>{reference.format(2)}</section>'
+
+
+def test_deduplicate_bytes_saved():
+    """
+    Test.
+    """
+    page_a = make_page("a", "1", NOTICE)
+    page_b = make_page("b", "2", "é" + NOTICE)
+    document = PrintDocument([page_a, page_b], TableOfContents([]))
+    size_before = len(document.to_html().encode("utf-8"))
+
+    n_blocks, bytes_saved = deduplicate(document, min_size=20, enumerate_headings=False)
+    assert n_blocks == 1
+    assert bytes_saved == size_before - len(document.to_html().encode("utf-8"))
+    assert '<a href="#print-site-block-1">A</a>' in page_b.html
+
+    # Nothing to deduplicate
+    assert deduplicate(PrintDocument([make_page("a", "1", NOTICE)], TableOfContents([])), min_size=20) == (0, 0)
@@ -0,0 +1,53 @@
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.document import ContentPlaceholder, PrintDocument, PrintSection
+
+
+def make_document():
+    """
+    A print page with one page and a section containing a page.
+    """
+    page_a = PrintSection(
+        "page", key="a", heading_number="1", title="A", level=0, html='<h1 id="a-a">A</h1><a href="#b-b">to b</a>'
+    )
+    section = PrintSection("section", key="section-2", heading_number="2", title="S", level=0, html="<section><h1>S</h1>")
+    page_b = PrintSection("page", key="b", heading_number="2.1", title="B", level=1, html='<h1 id="b-b">B</h1>')
+    section.children = [page_b]
+    return PrintDocument([page_a, section], TableOfContents([]), header_html="<div>", footer_html="</div>")
+
+
+def test_document_html():
+    """
+    Test.
+    """
+    document = make_document()
+    assert [node.key for node in document.walk()] == ["a", "section-2", "b"]
+    assert [node.key for node in document.pages()] == ["a", "b"]
+    assert document.to_html() == (
+        '<div><h1 id="a-a">A</h1><a href="#b-b">to b</a><section><h1>S</h1><h1 id="b-b">B</h1></section></div>'
+    )
+
+
+def test_document_anchors_and_links():
+    """
+    Test.
+    """
+    document = make_document()
+    page_a = document.sections[0]
+    assert page_a.anchors == {"a-a"}
+    assert page_a.links == ["#b-b"]
+    assert document.anchors == {"a-a", "b-b"}
+
+    # Derived information is updated when a stage changes the HTML
+    document.apply(lambda page_html, node: page_html.replace('id="a-a"', 'id="a-new"'))
+    assert page_a.anchors == {"a-new"}
+
+
+def test_content_placeholder():
+    """
+    Test.
+    """
+    placeholder = ContentPlaceholder(make_document())
+    assert str(placeholder) == ContentPlaceholder.MARKER
+    assert "<h1" in placeholder
+    assert "<h6" not in placeholder
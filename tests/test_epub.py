@@ -0,0 +1,188 @@
+import zipfile
+from xml.dom import minidom
+
+from mkdocs.structure.toc import AnchorLink, TableOfContents
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.epub import XhtmlConverter, get_epub_path, write_epub
+
+
+def test_get_epub_path():
+    """
+    Test.
+    """
+    assert get_epub_path("site/print_page/index.html") == "site/print_page/index.epub"
+    assert get_epub_path("site/print_page.html") == "site/print_page.epub"
+
+
+def test_xhtml_converter():
+    """
+    Test.
+    """
+    convert = lambda html: XhtmlConverter().convert(html)
+
+    assert convert("<p>a&nbsp;b<br>c &amp; d") == "<p>a\xa0b<br/>c &amp; d</p>"
+    assert convert('<input type="checkbox" checked disabled>') == (
+        '<input type="checkbox" checked="checked" disabled="disabled"/>'
+    )
+    assert convert("<div><p>a</div></span>") == "<div><p>a</p></div>"
+    assert convert("<p>a<!-- b --><script>if (a < b) {}</script></p>") == "<p>a</p>"
+
+    # SVG keeps its case sensitive names and gets its namespace
+    converter = XhtmlConverter()
+    assert converter.convert('<svg viewBox="0 0 2 2"><path d="M0"/></svg>') == (
+        '<svg viewBox="0 0 2 2" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">'
+        '<path d="M0"/></svg>'
+    )
+    assert converter.properties == {"svg"}
+
+    # Headings enumerated with CSS counters get their number as text
+    html = (
+        '<h1 heading-number="2">A</h1><h2 heading-number="2">B</h2>'
+        '<h3 heading-number="2">C</h3><h2 heading-number="2">D'
+    )
+    assert convert(html) == (
+        '<h1 data-heading-number="2"><span class="print-site-heading-number">2 </span>A</h1>'
+        '<h2 data-heading-number="2"><span class="print-site-heading-number">2.1 </span>B</h2>'
+        '<h3 data-heading-number="2"><span class="print-site-heading-number">2.1.1 </span>C</h3>'
+        '<h2 data-heading-number="2"><span class="print-site-heading-number">2.2 </span>D</h2>'
+    )
+
+
+def test_xhtml_converter_rewrites():
+    """
+    Test links and images are passed through the rewrite functions.
+    """
+    converter = XhtmlConverter(
+        rewrite_link=lambda href: "chapter.xhtml" + href if href.startswith("#") else href,
+        rewrite_image=lambda src: None if src.startswith("https") else "images/" + src,
+    )
+    html = '<a href="#a">A</a><img src="b.png" srcset="b@2x.png 2x"><img src="https://x.org/c.png" alt="C">'
+    assert converter.convert(html) == (
+        '<a href="chapter.xhtml#a">A</a><img src="images/b.png" alt=""/><a href="https://x.org/c.png">C</a>'
+    )
+
+
+def test_write_epub(tmp_path, monkeypatch):
+    """
+    Test.
+    """
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "a.png").write_bytes(b"png")
+    page_a = PrintSection(
+        "page",
+        key="a",
+        heading_number="1.1",
+        title="A",
+        level=1,
+        html='<section id="a"><h1 id="a-title">A</h1><img src="img/a.png"><a href="#b-part">B</a></section>',
+    )
+    page_b = PrintSection(
+        "page",
+        key="b",
+        heading_number="1.2",
+        title="B & C",
+        level=1,
+        html='<section id="b"><h2 id="b-part">Part</h2><img src="img/a.png"><img src="img/missing.png"></section>',
+    )
+    section = PrintSection(
+        "section",
+        key="s",
+        heading_number="1",
+        title="S",
+        level=0,
+        html='<section id="s" heading-number="1"><h1 heading-number="1">S</h1>',
+    )
+    section.children = [page_a, page_b]
+    toc = AnchorLink("1 S", "s", 0)
+    toc.children = [AnchorLink("1.1 A", "a", 1), AnchorLink("1.2 B & C", "b", 1)]
+    document = PrintDocument([section], TableOfContents([toc]), header_html="<div><h1>Cover</h1>", footer_html="</div>")
+
+    path = tmp_path / "index.epub"
+    assert write_epub(document, str(path), "Docs", base_dir=str(tmp_path), base_url="https://x.org/print_page/") == 3
+
+    with zipfile.ZipFile(path) as epub:
+        names = epub.namelist()
+        assert names[0] == "mimetype"
+        assert epub.getinfo("mimetype").compress_type == zipfile.ZIP_STORED
+        assert epub.read("mimetype") == b"application/epub+zip"
+        for name in names:
+            if name.endswith((".xml", ".xhtml", ".opf")):
+                minidom.parseString(epub.read(name))
+
+        # The image is packaged once
+        images = [name for name in names if name.startswith("EPUB/images/")]
+        assert len(images) == 1
+        assert epub.read(images[0]) == b"png"
+
+        chapter_a = epub.read("EPUB/chapter-0002.xhtml").decode("utf-8")
+        assert '<a href="chapter-0003.xhtml#b-part">B</a>' in chapter_a
+        assert f'src="{images[0][len("EPUB/") :]}"' in chapter_a
+        assert "Cover" not in chapter_a
+        chapter_b = epub.read("EPUB/chapter-0003.xhtml").decode("utf-8")
+        assert "<title>B &amp; C</title>" in chapter_b
+        assert '<a href="https://x.org/print_page/img/missing.png">' in chapter_b
+
+        nav = epub.read("EPUB/nav.xhtml").decode("utf-8")
+        assert '<a href="chapter-0001.xhtml#s">1 S</a><ol><li><a href="chapter-0002.xhtml#a">1.1 A</a>' in nav
+
+        package = epub.read("EPUB/package.opf").decode("utf-8")
+        assert "<dc:title>Docs</dc:title>" in package
+        assert package.count("<itemref ") == 3
+        # Reproducible without SOURCE_DATE_EPOCH
+        assert '<meta property="dcterms:modified">1980-01-01T00:00:00Z</meta>' in package
+
+        # 'heading-number' is not a valid attribute in XHTML
+        chapter_s = epub.read("EPUB/chapter-0001.xhtml").decode("utf-8")
+        assert '<section id="s" data-heading-number="1">' in chapter_s
+        assert " heading-number=" not in chapter_s
+
+    write_epub(document, str(path), "Docs", base_dir=str(tmp_path), modified=86400)
+    with zipfile.ZipFile(path) as epub:
+        package = epub.read("EPUB/package.opf").decode("utf-8")
+        assert '<meta property="dcterms:modified">1970-01-02T00:00:00Z</meta>' in package
+
+
+def test_write_epub_images(tmp_path):
+    """
+    Test only images in the site directory are packaged, each with its own manifest id.
+    """
+    site_dir = tmp_path / "site"
+    (site_dir / "assets").mkdir(parents=True)
+    (site_dir / "print_page").mkdir()
+    for name in ["a.png", "b.png", "c.png"]:
+        (site_dir / "assets" / name).write_bytes(b"png")
+    (tmp_path / "secret.txt").write_text("secret")
+
+    html = (
+        '<section id="a"><img src="../assets/a.png"><img src="/docs/assets/b.png"><img src="../assets/c.png">'
+        f'<img src="../../secret.txt"><img src="{tmp_path / "secret.txt"}"><img src="/other/assets/a.png"></section>'
+    )
+    page = PrintSection("page", key="a", heading_number="1", title="A", level=0, html=html)
+    document = PrintDocument([page], TableOfContents([]))
+
+    path = tmp_path / "index.epub"
+    write_epub(
+        document,
+        str(path),
+        "Docs",
+        base_dir=str(site_dir / "print_page"),
+        site_dir=str(site_dir),
+        site_url="https://x.org/docs/",
+    )
+
+    with zipfile.ZipFile(path) as epub:
+        images = [name for name in epub.namelist() if name.startswith("EPUB/images/")]
+        assert len(images) == 3
+        assert all(epub.read(name) == b"png" for name in images)
+
+        package = minidom.parseString(epub.read("EPUB/package.opf"))
+        ids = [item.getAttribute("id") for item in package.getElementsByTagName("item")]
+        assert len(ids) == len(set(ids))
+        assert len([item_id for item_id in ids if item_id.startswith("image-")]) == 3
+
+        # Images outside the site directory are not packaged
+        chapter = epub.read("EPUB/chapter-0001.xhtml").decode("utf-8")
+        assert '<a href="../../secret.txt">' in chapter
+        assert '<a href="/other/assets/a.png">' in chapter
@@ -0,0 +1,86 @@
+import re
+from pathlib import Path
+
+import mkdocs_print_site_plugin
+from mkdocs_print_site_plugin.headings import add_heading_numbers, insert_figure_numbers, insert_heading_numbers
+from mkdocs_print_site_plugin.urls import wrap_page
+
+ENUM_HEADINGS_CSS = Path(mkdocs_print_site_plugin.__file__).parent / "css" / "print-site-enum-headings.css"
+
+
+def get_css_heading_numbers(html):
+    """
+    The heading numbers shown by the enumeration stylesheet, with a simple model of CSS counters.
+    """
+    css = re.sub(r"/\*.*?\*/", "", ENUM_HEADINGS_CSS.read_text(encoding="utf-8"), flags=re.DOTALL)
+    rules = {}
+    for selector, body in re.findall(r"([^{}]+)\{([^}]*)\}", css):
+        rules[selector.split()[-1]] = dict(re.findall(r"([\w-]+)\s*:\s*([^;]+);", body))
+
+    counters = {}
+    numbers = []
+    for m in re.finditer(r'<(section class="print-page"|h[1-6] heading-number="([^"]*)")', html):
+        element = "section.print-page" if m.group(1).startswith("section") else m.group(1)[:2] + "[heading-number]"
+        rule = rules.get(element, {})
+        for name in rule.get("counter-reset", "").split():
+            counters[name] = 0
+        for name in rule.get("counter-increment", "").split():
+            counters[name] += 1
+        content = rules.get(element + ":before", {}).get("content")
+        if content:
+            number = ""
+            for attr, counter, text in re.findall(r'(attr)\(heading-number\)|counter\(([\w-]+)\)|"([^"]*)"', content):
+                number += m.group(2) if attr else str(counters[counter]) if counter else text
+            numbers.append(number.strip())
+    return numbers
+
+
+def test_add_heading_numbers():
+    """
+    Test.
+    """
+    html = '<h1 id="a">A</h1><h2 id="b">B</h2><h3>C</h3><header>D</header>'
+    assert (
+        add_heading_numbers(html, "1.2", max_level=2)
+        == '<h1 heading-number="1.2" id="a">A</h1><h2 heading-number="1.2" id="b">B</h2><h3>C</h3><header>D</header>'
+    )
+    assert add_heading_numbers(html, "3", max_level=1).count("heading-number") == 1
+    assert add_heading_numbers("<H2>x</H2>", "3", max_level=6) == '<H2 heading-number="3">x</H2>'
+
+
+def test_insert_heading_numbers():
+    """
+    Test.
+    """
+    html = '<h1 id="a">A</h1><h2>B</h2><h3>C</h3><h2>D</h2><h4>E</h4>'
+    result = insert_heading_numbers(html, "3.2", max_level=3)
+    numbers = [
+        '<h1 id="a"><span class="print-site-heading-number">3.2 </span>A</h1>',
+        '<h2><span class="print-site-heading-number">3.2.1 </span>B</h2>',
+        '<h3><span class="print-site-heading-number">3.2.1.1 </span>C</h3>',
+        '<h2><span class="print-site-heading-number">3.2.2 </span>D</h2>',
+        "<h4>E</h4>",
+    ]
+    assert result == "".join(numbers)
+
+
+def test_insert_figure_numbers():
+    """
+    Test.
+    """
+    html = "<figure><img src='a.png'><figcaption>A</figcaption></figure><figcaption class='x'>B</figcaption>"
+    result, count = insert_figure_numbers(html, start=2)
+    assert count == 4
+    assert '<figcaption><span class="print-site-figure-number">Figure 3: </span>A' in result
+    assert "<figcaption class='x'><span class=\"print-site-figure-number\">Figure 4: </span>B" in result
+
+
+def test_enum_headings_css():
+    """
+    Test the counters of the enumeration stylesheet start again on every page.
+    """
+    page_1 = add_heading_numbers("<h1>A</h1><h2>B</h2><h3>C</h3><h3>D</h3>", "1", max_level=6)
+    # A page that starts at h3, after a page with h3s
+    page_2 = add_heading_numbers("<h1>E</h1><h3>F</h3><h4>G</h4>", "2", max_level=6)
+    html = wrap_page(page_1, "a", "1") + wrap_page(page_2, "e", "2")
+    assert get_css_heading_numbers(html) == ["1", "1.1", "1.1.1", "1.1.2", "2", "2.0.1", "2.0.1.1"]
@@ -0,0 +1,76 @@
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.minify import Minifier, minify, minify_document
+
+
+def test_minify():
+    """
+    Test.
+    """
+    assert minify("<p>a  <!-- b -->\n  c</p>") == "<p>a c</p>"
+    assert minify("<div>\n    <p>a  b</p>\n</div>") == "<div>\n<p>a  b</p>\n</div>"
+
+    # Conditional comments are kept
+    assert minify("<!--[if IE]><p>a</p><![endif]-->  ") == "<!--[if IE]><p>a</p><![endif]--> "
+
+    # The content of some elements is kept as it is, and tags are never changed
+    html = '<pre><code>a  \n   <span class="x">b</span>\n</code></pre>  <textarea>\n  c</textarea>'
+    assert minify(html) == '<pre><code>a  \n   <span class="x">b</span>\n</code></pre> <textarea>\n  c</textarea>'
+    html = '<script>\nvar a = "<p>  </p>";\n</script>\n\n<p title="a  b">c</p>'
+    assert minify(html) == '<script>\nvar a = "<p>  </p>";\n</script>\n<p title="a  b">c</p>'
+    assert minify("<p>a <code>b  c</code></p><br/>  <code/>  d") == "<p>a <code>b  c</code></p><br/> <code/> d"
+
+
+def test_minify_headerlinks():
+    """
+    Test.
+    """
+    html = '<h2 id="a">A<a class="headerlink" href="#a" title="Permanent link">&para;</a></h2>'
+    assert minify(html) == html
+    assert minify(html, remove_headerlinks=True) == '<h2 id="a">A</h2>'
+    html = "<h1>S<a class='md-icon headerlink' href='#s'></a>\n</h1><a href='#s'>link</a>"
+    assert minify(html, remove_headerlinks=True) == "<h1>S\n</h1><a href='#s'>link</a>"
+
+
+def test_minifier_streaming():
+    """
+    Test elements can span multiple chunks.
+    """
+    minifier = Minifier()
+    chunks = ["<div>\n  <pre>a\n", "   b</pre>  \n", "  <!-- c -->  <p>  d</p>"]
+    assert [minifier.feed(chunk) for chunk in chunks] == ["<div>\n<pre>a\n", "   b</pre>\n", "<p> d</p>"]
+    assert minifier.size_before == sum(len(chunk) for chunk in chunks)
+    assert minifier.size_after == len("<div>\n<pre>a\n   b</pre>\n<p> d</p>")
+
+
+def test_minify_document():
+    """
+    Test.
+    """
+    page = PrintSection(
+        "page", key="a", heading_number="1.1", title="A", level=1, html='<section id="a">\n  <p>a</p>\n</section>'
+    )
+    section = PrintSection("section", key="s", heading_number="1", title="S", level=0, html="<section>\n  <h1>S</h1>\n")
+    section.children = [page]
+    document = PrintDocument([section], TableOfContents([]), header_html="<div>\n  ", footer_html="\n</div>")
+
+    minify_document(document, Minifier())
+    assert document.to_html() == (
+        '<div>\n<section>\n<h1>S</h1>\n<section id="a">\n<p>a</p>\n</section></section>\n</div>'
+    )
+
+
+def test_minify_document_spanning_nodes():
+    """
+    Test comments and <pre> elements that span the boundaries between nodes.
+    """
+    page_a = PrintSection("page", key="a", heading_number="1", title="A", level=0, html="<p>a</p>\n  <!-- a  \n")
+    page_b = PrintSection("page", key="b", heading_number="2", title="B", level=0, html="  b -->  <pre>b  \n")
+    section = PrintSection("section", key="s", heading_number="3", title="S", level=0, html="   c</pre>  <section>")
+    page_c = PrintSection("page", key="c", heading_number="3.1", title="C", level=1, html="  <p>c</p>")
+    section.children = [page_c]
+    document = PrintDocument([page_a, page_b, section], TableOfContents([]), header_html="", footer_html="  d")
+
+    minify_document(document, Minifier())
+    assert document.to_html() == "<p>a</p>\n<!-- a  \n  b --> <pre>b  \n   c</pre> <section> <p>c</p></section> d"
@@ -0,0 +1,108 @@
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.purge import CssPurger, Vocabulary, get_document_vocabulary, get_requirements
+
+
+def test_vocabulary():
+    """
+    Test.
+    """
+    vocabulary = Vocabulary("<DIV class='a  b' id=\"c\"><svg class=\"\"><path/></svg></DIV>")
+    assert vocabulary.tags == {"div", "svg", "path"}
+    assert vocabulary.classes == {"a", "b"}
+    assert vocabulary.ids == {"c"}
+
+    page = PrintSection("page", key="p", heading_number="1", title="P", level=0, html='<p class="x">a</p>')
+    document = PrintDocument([page], TableOfContents([]), header_html='<div id="h">', footer_html="</div>")
+    vocabulary = get_document_vocabulary(document, "<html><body>")
+    assert vocabulary.tags == {"html", "body", "div", "p"}
+    assert vocabulary.classes == {"x"}
+    assert vocabulary.ids == {"h"}
+
+    # Changing the HTML of a node updates its vocabulary
+    page.html = '<p class="y">a</p>'
+    assert page.vocabulary.classes == {"y"}
+
+
+def test_get_requirements():
+    """
+    Test.
+    """
+    assert get_requirements(".md-typeset a:hover") == ({"a"}, {"md-typeset"}, set())
+    assert get_requirements("#toc > ul li::before") == ({"ul", "li"}, set(), {"toc"})
+    assert get_requirements('a[href$=".pdf"], .b') == ({"a"}, {"b"}, set())
+    # Arguments of pseudo-classes are not required
+    assert get_requirements(".a:not(.b) :is(.c, .d)") == (set(), {"a"}, set())
+    # Custom elements and escaped names are never required
+    assert get_requirements("mjx-container") == (set(), set(), set())
+    assert get_requirements(".md\\:flex") is None
+
+
+def test_purge():
+    """
+    Test.
+    """
+    css = """
+    @charset "utf-8";
+    /* comment */
+    p, .used, .unused { color: red }
+    .unused .used { color: blue }
+    #id { content: "}" }
+    @media print { .unused { display: none } .used:hover { color: green } }
+    @media screen { .unused { display: none } }
+    @font-face { font-family: x; src: url(x.woff2) }
+    @keyframes spin { from { opacity: 0 } to { opacity: 1 } }
+    .safe { color: black }
+    """
+    vocabulary = Vocabulary('<p class="used" id="id">')
+    purged = CssPurger(safelist=["^sa"]).purge(css, vocabulary)
+    assert purged == "\n".join(
+        [
+            '@charset "utf-8";',
+            "p,.used{ color: red }",
+            '#id{ content: "}" }',
+            "@media print{.used:hover{ color: green }}",
+            "@font-face { font-family: x; src: url(x.woff2) }",
+            "@keyframes spin { from { opacity: 0 } to { opacity: 1 } }",
+            ".safe{ color: black }",
+        ]
+    )
+
+
+def test_purge_links(tmp_path):
+    """
+    Test.
+    """
+    site_dir = tmp_path / "site"
+    (site_dir / "assets").mkdir(parents=True)
+    (site_dir / "assets" / "main.css").write_text(".a { color: red } .b { color: blue }")
+    (site_dir / "assets" / "keep.css").write_text(".b { color: blue }")
+    head = (
+        '<link rel="stylesheet" href="../assets/main.css?v=1">'
+        '<link rel="stylesheet" href="../assets/keep.css">'
+        '<link rel="stylesheet" href="https://fonts.googleapis.com/css">'
+        '<link rel="icon" href="../assets/main.css">'
+    )
+
+    purger = CssPurger(cache_dir=str(tmp_path / "cache"))
+    new_head, files = purger.purge_links(
+        head,
+        Vocabulary('<p class="a">'),
+        base_dir=str(site_dir / "print_page"),
+        site_dir=str(site_dir),
+        keep=[str(site_dir / "assets" / "keep.css")],
+    )
+    assert len(files) == 1
+    path, css = files[0]
+    assert css == ".a{ color: red }"
+    assert path.startswith(str(site_dir / "assets" / "main.print-"))
+    name = path.split("/")[-1]
+    assert new_head == head.replace("main.css?v=1", name, 1)
+
+    # The purged stylesheet is cached by the hash of the CSS and the vocabulary
+    assert len(list((tmp_path / "cache" / "purged-css").iterdir())) == 1
+    _, files_again = CssPurger(cache_dir=str(tmp_path / "cache")).purge_links(
+        head, Vocabulary('<p class="a">'), base_dir=str(site_dir / "print_page"), site_dir=str(site_dir)
+    )
+    assert files_again[0] == files[0]
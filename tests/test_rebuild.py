@@ -0,0 +1,73 @@
+from mkdocs_print_site_plugin.rebuild import get_article_html, get_page_tags, get_page_title, read_built_page
+
+
+def test_get_article_html():
+    """
+    Test.
+    """
+    # mkdocs theme, with nested divs
+    page_html = '<body><div role="main"><h1>A</h1><div><div>b</div></div></div><footer></footer></body>'
+    assert get_article_html(page_html) == "<h1>A</h1><div><div>b</div></div>"
+
+    # readthedocs theme
+    page_html = """
+    <div role="main" class="document">
+        <div class="section" itemprop="articleBody">
+            <h1>A</h1>
+        </div>
+        <footer></footer>
+    </div>
+    """
+    assert get_article_html(page_html) == "<h1>A</h1>"
+
+    # mkdocs-material, without the buttons, tags and source file information it adds
+    page_html = """
+    <article class="md-content__inner md-typeset">
+        <a href="https://github.com/edit/a.md" title="Edit this page" class="md-content__button md-icon"><svg></svg></a>
+        <nav class="md-tags"><span class="md-tag">CSS</span></nav>
+        <h1>A</h1>
+        <article>b</article>
+        <aside class="md-source-file"><span>Last update</span></aside>
+    </article>
+    """
+    assert get_article_html(page_html) == "<h1>A</h1>\n        <article>b</article>"
+
+    # Unknown theme
+    assert get_article_html("<body><h1>A</h1></body>") is None
+
+
+def test_get_page_title():
+    """
+    Test.
+    """
+    page_html = "<head><title>A &amp; B - Site</title></head>"
+    assert get_page_title(page_html, "<h1>Other</h1>", "Site") == "A & B"
+    # The homepage only has the site name as title
+    article_html = '<h1 id="home">Home <code>page</code><a class="headerlink" href="#home">&para;</a></h1>'
+    assert get_page_title("<title>Site</title>", article_html, "Site") == "Home page"
+    assert get_page_title("<title>Site</title>", "<p>a</p>", "Site") is None
+
+
+def test_get_page_tags():
+    """
+    Test.
+    """
+    page_html = (
+        '<nav class="md-tags"><a href="../tags/#css" class="md-tag">CSS</a><span class="md-tag">A &amp; B</span></nav>'
+    )
+    assert get_page_tags(page_html) == ["CSS", "A & B"]
+    assert get_page_tags("<p>a</p>") == []
+
+
+def test_read_built_page(tmp_path):
+    """
+    Test.
+    """
+    path = tmp_path / "index.html"
+    path.write_text('<title>A - Site</title><div role="main"><p>é</p></div>', encoding="utf-8")
+    assert read_built_page(str(path), "Site") == ("<p>é</p>", {"title": "A"})
+    assert read_built_page(str(tmp_path / "does_not_exist.html")) == (None, {})
+
+    # mkdocs-material adds a title to pages without content
+    path.write_text('<title>A - Site</title><article class="md-content__inner"><h1>A</h1></article>', encoding="utf-8")
+    assert read_built_page(str(path), "Site") == ("", {"title": "A"})
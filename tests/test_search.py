@@ -0,0 +1,57 @@
+from mkdocs.structure.toc import TableOfContents
+
+from mkdocs_print_site_plugin.document import PrintDocument, PrintSection
+from mkdocs_print_site_plugin.search import build_search_index, get_search_index_path, get_text, tokenize
+
+
+def test_search_index_path():
+    """
+    Test.
+    """
+    assert get_search_index_path("site/print_page.html") == "site/print_page.search.json"
+    assert get_search_index_path("site/print_page/index.html") == "site/print_page/index.search.json"
+
+
+def test_get_text():
+    """
+    Test.
+    """
+    assert get_text("<p>Some <b>bold</b> &amp; text</p>").split() == ["Some", "bold", "&", "text"]
+    assert get_text('<h2 id="x">Title<a class="headerlink" href="#x">¶</a></h2>').split() == ["Title"]
+    assert get_text("<p>Code</p><script>var x = 1;</script>").split() == ["Code"]
+    assert tokenize("A Python, python and Pythons!") == ["python", "and", "pythons"]
+
+
+def test_build_search_index():
+    """
+    Test every heading is a search result.
+    """
+    page_a = PrintSection(
+        "page",
+        key="a",
+        heading_number="1",
+        title="A",
+        level=0,
+        html='<p>Intro text</p><h1 id="a-title">Page <em>title</em></h1><p>Lorem ipsum</p><h2 id="a-sub">Sub</h2>ipsum',
+    )
+    page_b = PrintSection("page", key="b", heading_number="2", title="B", level=0, html="<p>No headings</p>")
+    empty = PrintSection("page", key="c", heading_number="3", title="C", level=0, html="")
+    search_index = build_search_index(PrintDocument([page_a, page_b, empty], TableOfContents([])))
+
+    assert search_index["docs"] == [["a", "A"], ["a-title", "Page title"], ["a-sub", "Sub"], ["b", "B"]]
+    # Positions are stored as the difference with the previous position
+    assert search_index["index"]["ipsum"] == [1, 1]
+    assert search_index["index"]["intro"] == [0]
+    assert search_index["index"]["title"] == [1]
+    assert search_index["index"]["headings"] == [3]
+
+
+def test_build_search_index_unclosed_headings():
+    """
+    Test a heading that is not closed does not swallow the headings after it.
+    """
+    html = '<h2 id="x">Broken<p>text</p><h2 id="y">Ok <code>b</code></h2>' + "<h3>" * 50000
+    page = PrintSection("page", key="a", heading_number="1", title="A", level=0, html=html)
+    search_index = build_search_index(PrintDocument([page], TableOfContents([])))
+
+    assert search_index["docs"] == [["a", "A"], ["y", "Ok b"]]
@@ -0,0 +1,95 @@
+import logging
+
+from mkdocs_print_site_plugin.transforms import (
+    PAGE_TRANSFORMS,
+    DrawioTransform,
+    PageTransform,
+    apply_page_transforms,
+    get_page_transforms,
+    register_page_transform,
+)
+from tests.test_document import make_document
+
+
+class UpperTransform(PageTransform):
+    """
+    Transform for testing, that changes the pages containing 'to b'.
+    """
+
+    plugin_names = ("upper",)
+    cacheable = True
+
+    def __init__(self, plugin, document, print_page, config):
+        super().__init__(plugin, document, print_page, config)
+        self.transformed = []
+
+    def applies_to(self, page_html):
+        return "to b" in page_html
+
+    def transform(self, page_html, node):
+        self.transformed.append(node.key)
+        return page_html.upper()
+
+    def finalize(self, head, tail):
+        return head, tail.replace("</body>", "<script></script></body>")
+
+
+def test_get_page_transforms():
+    """
+    Test transforms are only used for plugins that are enabled.
+    """
+    register_page_transform(UpperTransform)
+    try:
+        document = make_document()
+        assert get_page_transforms(document, None, {"plugins": {}}) == []
+        transforms = get_page_transforms(document, None, {"plugins": {"upper": object()}})
+        assert [type(t) for t in transforms] == [UpperTransform]
+    finally:
+        PAGE_TRANSFORMS.remove(UpperTransform)
+
+
+def test_apply_page_transforms():
+    """
+    Test only affected pages are transformed.
+    """
+    document = make_document()
+    transform = UpperTransform(None, document, None, {})
+    apply_page_transforms(document, [transform])
+
+    assert transform.transformed == ["a"]
+    assert document.sections[0].html == '<H1 ID="A-A">A</H1><A HREF="#B-B">TO B</A>'
+    assert document.sections[1].children[0].html == '<h1 id="b-b">B</h1>'
+    assert transform.finalize("<head></head>", "</body>") == ("<head></head>", "<script></script></body>")
+
+
+def test_apply_page_transforms_cache():
+    """
+    Test results of cacheable transforms are shared between print pages.
+    """
+    cache = {}
+    for _ in range(2):
+        document = make_document()
+        transform = UpperTransform(None, document, None, {})
+        apply_page_transforms(document, [transform], cache=cache)
+        assert document.sections[0].html.startswith("<H1")
+
+    # The second print page used the cached result
+    assert transform.transformed == []
+    assert len(cache) == 1
+
+
+def test_drawio_transform_unexpected_html(caplog):
+    """
+    Test a page is kept as it is, with a warning, when mkdocs-drawio returns HTML that is not recognized.
+    """
+
+    class DrawioPlugin:
+        def render_drawio_diagrams(self, html, page):
+            return "<!DOCTYPE html>" + html
+
+    document = make_document()
+    node = document.sections[0]
+    transform = DrawioTransform(DrawioPlugin(), document, None, {})
+    with caplog.at_level(logging.WARNING):
+        assert transform.transform(node.html, node) == node.html
+    assert "mkdocs-drawio for page 'A'" in caplog.text
@@ -7,6 +7,12 @@ from mkdocs_print_site_plugin.urls import (
     get_page_key,
     is_external,
     is_attachment,
+    remove_lazy_loading,
+    fix_protocol_relative_urls,
+    fix_internal_links,
+    fix_internal_links_linear,
+    get_compact_page_keys,
+    get_print_page_href,
 )
 
 
@@ -19,6 +25,35 @@ def test_get_page_key():
     assert get_page_key("abc/") == "abc"
     assert get_page_key("abc.html") == "abc"
     assert get_page_key("/folder/subfolder/index.html") == "folder-subfolder-index"
+    assert get_page_key("abc/", {"abc": "p1x9a"}) == "p1x9a"
+    assert get_page_key("def/", {"abc": "p1x9a"}) == "def"
+
+
+def test_get_compact_page_keys():
+    """
+    Test compact page keys are short, unique and stable.
+    """
+    urls = ["", "reference/api/v2/services/billing/invoices/"] + [f"page{i}/" for i in range(2000)]
+    page_keys = get_compact_page_keys(urls)
+    assert len(page_keys) == len(urls)
+    assert len(set(page_keys.values())) == len(urls)
+    assert page_keys["index"] == "p6k3p"
+    assert len(page_keys["reference-api-v2-services-billing-invoices"]) == 5
+
+    # Adding pages does not change the keys of other pages
+    keys = ["index", "reference-api-v2-services-billing-invoices"]
+    assert get_compact_page_keys(urls[:2]) == {key: page_keys[key] for key in keys}
+
+    # Links use the compact keys as well
+    html = '<h2 id="b">B</h2><a href="#b">b</a><a href="../reference/api/v2/services/billing/invoices/#c">c</a>'
+    page_keys["a"] = "pa"
+    result = fix_internal_links(html, "a/", directory_urls=True, heading_number="1", page_keys=page_keys)
+    expected = '<h2 id="pa-b">B</h2><a href="#pa-b">b</a><a href="#{}-c">c</a>'.format(
+        page_keys["reference-api-v2-services-billing-invoices"]
+    )
+    assert result == f'<section class="print-page" id="pa" heading-number="1">{expected}</section>'
+    result = fix_internal_links_linear(html, "a/", directory_urls=True, heading_number="1", page_keys=page_keys)
+    assert result == f'<section class="print-page" id="pa" heading-number="1">{expected}</section>'
 
 
 def test_is_external():
@@ -87,6 +122,19 @@ def test_fix_href_links():
     assert result == html
 
 
+def test_get_print_page_href_other_print_page():
+    """
+    Test links to pages that are not part of the print page.
+    """
+    page_hrefs = {"b": ("../print_page/", True), "c": ("../c/", False)}
+    assert get_print_page_href("../b/#x", "a", "a/", True, page_hrefs=page_hrefs) == "../print_page/#b-x"
+    assert get_print_page_href("../c/#x", "a", "a/", True, page_hrefs=page_hrefs) == "../c/#x"
+    assert get_print_page_href("../c/", "a", "a/", True, page_hrefs=page_hrefs) == "../c/"
+    # Pages in the print page itself
+    assert get_print_page_href("../d/#x", "a", "a/", True, page_hrefs=page_hrefs) == "#d-x"
+    assert get_print_page_href("#x", "a", "a/", True, page_hrefs=page_hrefs) == "#a-x"
+
+
 def test_update_anchor_ids_noupdate():
     """
     Test.
@@ -175,3 +223,69 @@ def test_fix_image_src():
 
     result = '<img src="../../appendix/table.png">'
     assert fix_image_src(html, "this_page", True) == result
+
+
+def test_remove_lazy_loading():
+    """
+    Test.
+    """
+    html = '<img alt="a" loading="lazy" src="a.png"><p>lazy</p><img loading=lazy src="b.png"/><img src="c.png">'
+    assert remove_lazy_loading(html) == '<img alt="a" src="a.png"><p>lazy</p><img src="b.png"/><img src="c.png">'
+    # Multiple images on the same line are all fixed
+    html = '<p><img loading="lazy" src="a.png"> and <img loading="lazy" src="b.png"></p>'
+    assert "loading" not in remove_lazy_loading(html)
+    # Only img tags are changed
+    assert remove_lazy_loading('<iframe loading="lazy"></iframe>') == '<iframe loading="lazy"></iframe>'
+
+
+def test_fix_protocol_relative_urls():
+    """
+    Test.
+    """
+    html = '<head><link href="//assets/a.css"><script src="//b.js"></script></head><body><a href="//c">c</a>'
+    assert fix_protocol_relative_urls(html, "../") == (
+        '<head><link href="../assets/a.css"><script src="../b.js"></script></head><body><a href="//c">c</a>'
+    )
+    assert fix_protocol_relative_urls('<link href="//a.css">', "") == '<link href="a.css">'
+
+
+def test_fix_internal_links_linear():
+    """
+    Test the single pass rewrite for large pages gives the same result.
+    """
+    page_html = "\n".join(
+        [
+            '<h1 id="title">Title</h1>',
+            '<p>Links to <a href="#title">an anchor</a>, <a class="x" href="../b/#sub">another page</a>,',
+            '<a href="https://example.com">an external page</a> and <a href="files/doc.pdf">an attachment</a>.</p>',
+            '<p><img alt="img" loading="lazy" src="img/a.png"> <img src="data:image/png;base64,abc"></p>',
+            '<input checked="checked" id="__tabbed_1_1" name="__tabbed_1" type="radio">',
+            '<label for="__tabbed_1_1">Tab</label>',
+            "<ol>",
+            '<li id="fn:1">Footnote</li>',
+            "</ol>",
+            "<table>" + "<tr><td>cell</td></tr>" * 100 + "</table>",
+        ]
+    )
+    expected = remove_lazy_loading(fix_internal_links(page_html, "a/", True, "1.2"))
+    assert fix_internal_links_linear(page_html, "a/", True, "1.2") == expected
+    assert fix_internal_links_linear(page_html, "a.html", False, "3") == remove_lazy_loading(
+        fix_internal_links(page_html, "a.html", False, "3")
+    )
+
+    # Keep lazy loading
+    expected = fix_internal_links(page_html, "a/", True, "1.2")
+    assert fix_internal_links_linear(page_html, "a/", True, "1.2", eager_images=False) == expected
+
+
+def test_fix_internal_links_linear_one_line():
+    """
+    Test ids are only changed in the tag they belong to, also when everything is on one line.
+    """
+    page_html = '<p>Text<sup id="fnref:1"><a href="#fn:1">1</a></sup></p><div id="x"><h2 id="y">Y</h2></div>'
+    assert fix_internal_links_linear(page_html, "a/", True, "1") == (
+        '<section class="print-page" id="a" heading-number="1">'
+        '<p>Text<sup id="a-fnref:1"><a href="#a-fn:1">1</a></sup></p><div id="x"><h2 id="a-y">Y</h2></div>'
+        "</section>"
+    )
+
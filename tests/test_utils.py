@@ -0,0 +1,31 @@
+from mkdocs_print_site_plugin.utils import get_closing_tag, get_section_id, remove_elements_by_class
+
+
+def test_get_closing_tag():
+    """
+    Test.
+    """
+    html = '<div class="a"><div>b</div></div><div>c</div>'
+    assert get_closing_tag(html, "div", len('<div class="a">')) == (27, 33)
+    assert get_closing_tag("<div><p>unclosed</p>", "div", 5) is None
+
+
+def test_remove_elements_by_class():
+    """
+    Test.
+    """
+    html = '<body><nav class="md-tabs" aria-label="Tabs"><ul><li>a</li></ul></nav><div class="md-tabs-other">b</div></body>'
+    assert remove_elements_by_class(html, ["md-tabs"]) == '<body><div class="md-tabs-other">b</div></body>'
+
+    # Nested elements with the same tag
+    html = '<div class="navbar fixed-top"><div class="container"><div>x</div></div></div><div class="row">y</div>'
+    assert remove_elements_by_class(html, ["navbar", "does-not-exist"]) == '<div class="row">y</div>'
+
+
+def test_get_section_id():
+    """
+    Test.
+    """
+    assert get_section_id(["Section"]) == "section-section"
+    assert get_section_id(["Guides", "Getting started"]) == "section-guides-getting-started"
+    assert get_section_id(["Über", "日本語"]) == "section-über-日本語"
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import threading
+
+import pytest
+
+from mkdocs_print_site_plugin.writer import CompressingFile, Writer, get_brotli, get_digest, is_unchanged
+
+
+def test_writer(tmp_path):
+    """
+    Test.
+    """
+    source = tmp_path / "source.css"
+    source.write_text("body {}")
+
+    with Writer() as writer:
+        writer.copy(str(source), str(tmp_path / "site" / "css" / "copy.css"))
+        writer.write(str(tmp_path / "site" / "page.html"), "<p>é</p>")
+        writer.write(str(tmp_path / "site" / "data.bin"), b"\x00\x01")
+
+    assert (tmp_path / "site" / "css" / "copy.css").read_text() == "body {}"
+    assert (tmp_path / "site" / "page.html").read_text(encoding="utf-8") == "<p>é</p>"
+    assert (tmp_path / "site" / "data.bin").read_bytes() == b"\x00\x01"
+
+
+def test_writer_errors(tmp_path):
+    """
+    Test errors in writes are raised when flushing.
+    """
+    writer = Writer()
+    writer.copy(str(tmp_path / "does_not_exist.css"), str(tmp_path / "site" / "copy.css"))
+    with pytest.raises(FileNotFoundError):
+        writer.close()
+
+
+def test_writer_bounded():
+    """
+    Test there are never more than `max_pending` writes queued.
+    """
+    release = threading.Event()
+    writer = Writer(max_workers=1, max_pending=2)
+    writer.submit(release.wait)
+    writer.submit(release.wait)
+
+    # A third write blocks until one of the others is done
+    third = threading.Thread(target=writer.submit, args=(lambda: None,))
+    third.start()
+    third.join(timeout=0.2)
+    assert third.is_alive()
+
+    release.set()
+    third.join(timeout=5)
+    assert not third.is_alive()
+    writer.close()
+
+
+def test_compressing_file(tmp_path):
+    """
+    Test compressed copies are written while writing the file.
+    """
+    path = tmp_path / "site" / "print_page.html"
+    brotli = get_brotli()
+    with CompressingFile(str(path), gzip_level=1, brotli_level=1 if brotli else None) as f:
+        assert f.write(b"<html>") == 6
+        f.write(b"</html>")
+
+    assert path.read_bytes() == b"<html></html>"
+    assert gzip.decompress((tmp_path / "site" / "print_page.html.gz").read_bytes()) == b"<html></html>"
+    if brotli:
+        assert brotli.decompress((tmp_path / "site" / "print_page.html.br").read_bytes()) == b"<html></html>"
+
+
+def test_compressing_file_none(tmp_path):
+    """
+    Test no compressed copies are written by default.
+    """
+    path = tmp_path / "print_page.html"
+    with CompressingFile(str(path)) as f:
+        f.write(b"<html></html>")
+    assert [p.name for p in tmp_path.iterdir()] == ["print_page.html"]
+
+
+def test_digest(tmp_path):
+    """
+    Test.
+    """
+    digest, size = get_digest(["<html>", "é", "</html>"])
+    assert digest == "sha256:" + hashlib.sha256("<html>é</html>".encode("utf-8")).hexdigest()
+    assert size == 15
+
+    path = tmp_path / "print_page.html"
+    assert not is_unchanged(str(path), b"<html>", 15)
+    path.write_bytes("<html>é</html>".encode("utf-8"))
+    assert is_unchanged(str(path), b"<html>", 15)
+    assert not is_unchanged(str(path), b"<html>", 16)
+    assert not is_unchanged(str(path), b"<body>", 15)